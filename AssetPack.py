@@ -0,0 +1,238 @@
+"""
+Prebuilt sprite pack for the Shooter games.
+- build() decodes every sprite once, scales it to each size the games draw it at
+  and stores the pixels in display byte order (BGRA, 32-bit ARGB) in one .shap file
+- AssetPack maps the file and makes a sprite on first use with no decoding and
+  no copy; sprites missing from the pack, or changed since it was built, are
+  decoded from the sprites folder as before
+- Run as a script to build or check the pack, or to time game startup with and without it
+"""
+
+import mmap
+import os
+import struct
+import subprocess
+import sys
+import time
+
+import pygame
+
+SPRITES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sprites')
+DEFAULT_PACK = os.path.join(SPRITES_DIR, 'sprites.shap')
+
+MAGIC = b"SHAP"
+VERSION = 1
+PIXEL_FORMAT = "BGRA"   # Byte order of SDL's ARGB8888, the usual window format
+
+# magic, version, sprite count
+HEADER = struct.Struct("<4sHI")
+# name, width, height, source mtime (ns), source size, pixel offset, pixel length
+ENTRY = struct.Struct("<48sHHQQII")
+ALIGN = 64
+
+# Every (file, size) the games load; None keeps the original size
+SPRITES = (
+    # Shooter.py: PLAYER_SIZE, ENEMY_SIZE, BULLET_SIZE, and the wall scaled per obstacle
+    ('Spiller.png', (40, 40)),
+    ('fjende.png', (50, 50)),
+    ('skud.png', (60, 60)),
+    ('vaeg.jpg', None),
+    # Shooter3D.py textures
+    ('vaeg.jpg', (256, 256)),
+    ('skud.png', (128, 128)),
+    ('fjende.png', (128, 128)),
+    ('Spiller.png', (128, 128)),
+)
+
+
+def sprite_name(filename, size=None):
+    return f"{filename}@{size[0]}x{size[1]}" if size else filename
+
+
+def decode(filename, size=None, sprites_dir=SPRITES_DIR):
+    """Load a sprite from its image file the slow way, scaled to size"""
+    image = pygame.image.load(os.path.join(sprites_dir, filename))
+    if size:
+        image = pygame.transform.scale(image, size)
+    return image
+
+
+def build(path=DEFAULT_PACK, sprites=SPRITES, sprites_dir=SPRITES_DIR):
+    start = time.perf_counter()
+    entries, blobs = [], []
+    offset = HEADER.size + ENTRY.size * len(sprites)
+    for filename, size in sprites:
+        source = os.stat(os.path.join(sprites_dir, filename))
+        image = decode(filename, size, sprites_dir)
+        pixels = pygame.image.tostring(image, PIXEL_FORMAT)
+        offset += -offset % ALIGN
+        blobs.append((offset, pixels))
+        entries.append(ENTRY.pack(sprite_name(filename, size).encode(), *image.get_size(),
+                                  source.st_mtime_ns, source.st_size, offset, len(pixels)))
+        offset += len(pixels)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(sprites)) + b"".join(entries))
+        for offset, pixels in blobs:
+            f.seek(offset)
+            f.write(pixels)
+    print(f"{len(sprites)} sprites written to {path} ({os.path.getsize(path) / 1024:.0f} KiB) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+class AssetPack:
+    """Sprites by file and size, from the pack when it has them"""
+    def __init__(self, path=DEFAULT_PACK, sprites_dir=SPRITES_DIR):
+        self.path = path
+        self.sprites_dir = sprites_dir
+        self.images = {}
+        self.index = {}
+        self.data = None
+        self.loaded_from_pack = 0
+        self.decoded = 0
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                # Copy-on-write, so a sprite surface drawn on never touches the file
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            magic, version, count = HEADER.unpack_from(self.data)
+            if magic != MAGIC or version != VERSION:
+                print(f"{path} is not a version {VERSION} sprite pack; decoding sprites instead")
+                self.data = None
+            else:
+                for i in range(count):
+                    name, *entry = ENTRY.unpack_from(self.data, HEADER.size + ENTRY.size * i)
+                    self.index[name.rstrip(b"\0").decode()] = entry
+
+    def get(self, filename, size=None):
+        """The sprite, loaded on first use; None if it cannot be loaded"""
+        name = sprite_name(filename, size)
+        if name in self.images:
+            return self.images[name]
+        try:
+            image = self.from_pack(name, filename)
+            if image is None:
+                image = decode(filename, size, self.sprites_dir)
+                if pygame.display.get_surface() is not None:
+                    image = image.convert_alpha()
+                self.decoded += 1
+            else:
+                self.loaded_from_pack += 1
+        except Exception as e:
+            print(f"Error loading image {filename}: {e}")
+            image = None
+        self.images[name] = image
+        return image
+
+    def from_pack(self, name, filename):
+        entry = self.index.get(name)
+        if entry is None:
+            return None
+        width, height, mtime, size, offset, length = entry
+        try:
+            source = os.stat(os.path.join(self.sprites_dir, filename))
+            if (source.st_mtime_ns, source.st_size) != (mtime, size):
+                return None  # Edited since the pack was built
+        except OSError:
+            pass  # Only the pack was shipped
+        # A view of the mapped pixels, not a copy
+        image = pygame.image.frombuffer(memoryview(self.data)[offset:offset + length], (width, height), PIXEL_FORMAT)
+        display = pygame.display.get_surface()
+        if display is not None and display.get_masks()[:3] != image.get_masks()[:3]:
+            image = image.convert_alpha()
+        return image
+
+    def sprites(self, **names):
+        """A namespace of lazily loaded sprites, e.g. sprites(player=('Spiller.png', (40, 40)))"""
+        return Sprites(self, names)
+
+
+class Sprites:
+    """Attribute access to sprites that are only loaded when first used"""
+    def __init__(self, pack, names):
+        self._pack = pack
+        self._names = names
+
+    def __getattr__(self, attr):
+        try:
+            filename, size = self._names[attr]
+        except KeyError:
+            raise AttributeError(attr) from None
+        image = self._pack.get(filename, size)
+        setattr(self, attr, image)
+        return image
+
+
+# Shared by both games
+assets = AssetPack(os.environ.get("SHOOTER_SPRITE_PACK", DEFAULT_PACK))
+
+
+def check(path=DEFAULT_PACK):
+    """Compare every packed sprite with a fresh decode of its image file"""
+    pack = AssetPack(path)
+    for filename, size in SPRITES:
+        name = sprite_name(filename, size)
+        packed = pack.from_pack(name, filename)
+        if packed is None:
+            print(f"{name}: missing or out of date")
+            continue
+        same = pygame.image.tostring(packed, "RGBA") == pygame.image.tostring(decode(filename, size), "RGBA")
+        print(f"{name}: {'ok' if same else 'DIFFERS'}")
+
+
+STARTUP = """
+import time
+start = time.perf_counter()
+import pygame
+import {module} as game_module
+game = game_module.{factory}
+{first_frame}
+print(time.perf_counter() - start)
+"""
+
+GAMES = {
+    "shooter": ("Shooter", "Game(seed=1)", "game.draw()"),
+    "shooter3d": ("Shooter3D", "Shooter3D()", "game.render_scene()"),
+}
+
+
+def startup(game="shooter", runs=5, path=DEFAULT_PACK):
+    """Median time from a fresh interpreter to the first drawn frame, with and without the pack"""
+    module, factory, first_frame = GAMES[game]
+    code = STARTUP.format(module=module, factory=factory, first_frame=first_frame)
+    env = dict(os.environ)
+    env.setdefault("SDL_VIDEODRIVER", "dummy")
+    env.setdefault("SDL_AUDIODRIVER", "dummy")
+    env.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    results = {}
+    for label, pack in (("decode sprites", ""), ("sprite pack", path)):
+        env["SHOOTER_SPRITE_PACK"] = pack
+        times = []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__)))
+            if out.returncode != 0:
+                raise RuntimeError(out.stderr.strip().splitlines()[-1])
+            times.append(float(out.stdout.strip().splitlines()[-1]))
+        results[label] = sorted(times)[len(times) // 2]
+        print(f"{game} {label}: {results[label] * 1000:.0f} ms to the first frame (median of {runs})")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Shooter sprite pack")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="decode and scale every sprite into the pack").add_argument(
+        "--path", default=DEFAULT_PACK)
+    sub.add_parser("check", help="compare the pack with the image files").add_argument(
+        "--path", default=DEFAULT_PACK)
+    timing = sub.add_parser("startup", help="time game startup with and without the pack")
+    timing.add_argument("--game", choices=GAMES, default="shooter")
+    timing.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.path)
+    elif args.command == "check":
+        check(args.path)
+    else:
+        startup(args.game, args.runs)
@@ -0,0 +1,146 @@
+"""
+Sound playback shared by Shooter.py and Shooter3D.py.
+- AudioManager: every sound gets its own preallocated mixer channels, so
+  its voice cap is the number of channels it owns; a sound at its cap
+  restarts its oldest voice instead of queueing more
+- The same sound triggered again in one tick plays once
+- Without a mixer or sound files every call is a silent no-op
+"""
+
+import time
+
+import pygame
+
+
+class AudioManager:
+    """Named sounds on reserved channels, coalesced per tick"""
+    def __init__(self):
+        self.enabled = False
+        self.sounds = {}        # name -> Sound
+        self.voices = {}        # name -> [Channel, ...] it may play on
+        self.started = {}       # Channel -> time it last started
+        self.channel_count = 0
+        self.tick_played = set()
+        self.requested = 0
+        self.played = 0
+        self.coalesced = 0
+        self.stolen = 0
+
+    def init(self):
+        """Open the mixer if it is not open yet; False when there is no audio"""
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            self.enabled = True
+        except pygame.error as e:
+            print(f"Audio unavailable: {e}")
+            self.enabled = False
+        return self.enabled
+
+    def load(self, name, path, voices=2, volume=1.0):
+        """Load a sound file as name; missing files leave name silent"""
+        if not self.enabled:
+            return None
+        try:
+            sound = pygame.mixer.Sound(path)
+        except (pygame.error, FileNotFoundError):
+            return None
+        return self.add(name, sound, voices, volume)
+
+    def add(self, name, sound, voices=2, volume=1.0):
+        """Give sound its own voices channels, reserved so nothing else plays on them"""
+        if not self.enabled:
+            return None
+        sound.set_volume(volume)
+        first = self.channel_count
+        self.channel_count += voices
+        if pygame.mixer.get_num_channels() < self.channel_count:
+            pygame.mixer.set_num_channels(self.channel_count)
+        pygame.mixer.set_reserved(self.channel_count)
+        channels = [pygame.mixer.Channel(i) for i in range(first, self.channel_count)]
+        self.sounds[name] = sound
+        self.voices[name] = channels
+        for channel in channels:
+            self.started[channel] = 0.0
+        return sound
+
+    def new_tick(self):
+        # Called once per simulation tick, before anything can play
+        self.tick_played.clear()
+
+    def play(self, name):
+        self.requested += 1
+        sound = self.sounds.get(name)
+        if sound is None:
+            return
+        if name in self.tick_played:
+            self.coalesced += 1
+            return
+        self.tick_played.add(name)
+        channels = self.voices[name]
+        for channel in channels:
+            if not channel.get_busy():
+                break
+        else:
+            # Every voice busy: cut the one that has played longest
+            channel = min(channels, key=self.started.__getitem__)
+            self.stolen += 1
+        channel.play(sound)
+        self.started[channel] = time.perf_counter()
+        self.played += 1
+
+    def stop(self):
+        if self.enabled:
+            pygame.mixer.stop()
+
+    def stats(self):
+        return {"requested": self.requested, "played": self.played,
+                "coalesced": self.coalesced, "stolen": self.stolen}
+
+
+# Shared by both games
+audio = AudioManager()
+
+
+def _tone(frequency=440, ms=150):
+    # A short square wave, so the demo needs no sound files
+    rate, size, channels = pygame.mixer.get_init()
+    samples = rate * ms // 1000
+    period = max(1, rate // frequency)
+    width = abs(size) // 8
+    high = (2 ** (abs(size) - 2)).to_bytes(width, "little", signed=True)
+    low = (-(2 ** (abs(size) - 2))).to_bytes(width, "little", signed=True)
+    frame = [(high if (i // (period // 2 or 1)) % 2 else low) * channels for i in range(samples)]
+    return pygame.mixer.Sound(buffer=b"".join(frame))
+
+
+def flood_check(ticks=3000, seed=1):
+    """Run a machine gun game against a crowd and count the sounds asked for and played"""
+    from Shooter import Game, startup
+    from Controllers import ScriptedController
+    # The instance the game imports, not this script's own copy when run as __main__
+    from Audio import audio
+    startup(headless=True)
+    if not audio.init():
+        return
+    audio.add("shoot", _tone(880, 80), voices=4, volume=0.5)
+    audio.add("hit", _tone(220, 120), voices=4, volume=0.6)
+    audio.add("powerup", _tone(660, 200), voices=1)
+    audio.add("gameover", _tone(110, 600), voices=1)
+    game = Game(controller=ScriptedController.patrol(), headless=True, seed=seed)
+    game.player.health = game.player.max_health = 10**9
+    game.player.weapons_owned.append("machine_gun")
+    game.player.weapon = "machine_gun"
+    game.spawn_enemies(200)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        game.update()
+    elapsed = time.perf_counter() - start
+    stats = audio.stats()
+    print(f"{ticks} ticks ({elapsed:.1f}s): {stats['requested']} sounds requested, {stats['played']} played "
+          f"on {audio.channel_count} channels, {stats['coalesced']} coalesced in the same tick, "
+          f"{stats['stolen']} voices cut at their cap")
+
+
+if __name__ == "__main__":
+    flood_check()
@@ -0,0 +1,209 @@
+"""
+Headless benchmark suite for the Shooter simulation.
+- Named scenarios build a Game with a fixed seed and scripted input
+- Each scenario reports ticks/s, mean time per update phase and peak traced memory
+- Results can be saved as a baseline JSON; later runs fail on regressions past a threshold
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+from Controllers import ScriptedController
+from FrameTimer import FrameTimer
+from MapLibrary import random_map_rects, validate_map
+from NavGrid import NO_STEP
+from Shooter import Game, UPDATE_PHASES, SCREEN_WIDTH, SCREEN_HEIGHT
+
+DENSE_GRID = 100  # Placement grid of the max obstacles map, a quarter of the normal cell
+
+
+def idle():
+    return ScriptedController([])
+
+
+def machine_gun_spam():
+    # Turn in place with the trigger held
+    return ScriptedController([{pygame.K_SPACE, pygame.K_LEFT}] * 90 + [{pygame.K_SPACE, pygame.K_RIGHT}] * 90)
+
+
+def invulnerable(game):
+    # Scenarios measure one steady game, so the player never dies and nothing restarts
+    game.player.health = game.player.max_health = 10**9
+
+
+def setup_idle(game):
+    invulnerable(game)
+
+
+def setup_crowd(game, enemies=200):
+    invulnerable(game)
+    game.player.weapons_owned.append("machine_gun")
+    game.player.weapon = "machine_gun"
+    for _ in range(enemies - len(game.enemies)):
+        game.spawn_enemy()
+
+
+def dense_map(rng, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+    """As many obstacles as fit on a fine placement grid while the map still passes validate_map"""
+    cells = (width // DENSE_GRID) * (height // DENSE_GRID)
+    candidates = random_map_rects(width, height, cells, cells, min_size=40, max_size=100, rng=rng,
+                                  grid_size=DENSE_GRID)
+    rects = []
+    for rect in candidates:
+        # Greedy: keep each obstacle unless it closes off part of the map or the spawn
+        if validate_map(rects + [rect], width, height)[0]:
+            rects.append(rect)
+    return rects
+
+
+def setup_max_obstacles(game):
+    state = game.save_state()
+    state["obstacles"] = dense_map(game.rng)
+    game.load_state(state)
+
+    # Everyone moves off the old map: the player to the validated spawn square,
+    # the enemies to open navigation cells the player can be reached from
+    game.player.x, game.player.y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
+    grid, flow = game.nav_grid, game.flow_field
+    flow.set_goal(game.player.x, game.player.y)
+    free = [cell for cell, step in enumerate(flow.steps) if step != NO_STEP and not grid.blocked[cell]]
+    half = grid.cell_size / 2
+    for enemy, cell in zip(game.enemies, game.rng.sample(free, len(game.enemies))):
+        row, col = divmod(cell, grid.cols)
+        enemy.x, enemy.y = col * grid.cell_size + half, row * grid.cell_size + half
+    assert not any(game.obstacle_index.collides(e.x, e.y, e.radius) for e in [game.player] + game.enemies)
+    invulnerable(game)
+
+
+def setup_level_10(game):
+    while game.level < 10:
+        game.score = game.next_level_score
+        game.check_level_up()
+    invulnerable(game)
+
+
+# name -> (setup, controller factory, Game keyword arguments)
+SCENARIOS = {
+    "5 enemies idle": (setup_idle, idle, {}),
+    "200 enemies + machine_gun spam": (setup_crowd, machine_gun_spam, {}),
+    "200 enemies + machine_gun spam, numpy": (setup_crowd, machine_gun_spam,
+                                              {"use_projectiles": True, "batch_enemies": True}),
+    "max obstacles": (setup_max_obstacles, ScriptedController.patrol, {}),
+    "level 10 difficulty": (setup_level_10, ScriptedController.patrol, {}),
+}
+
+
+def build(name, seed):
+    setup, controller, options = SCENARIOS[name]
+    game = Game(controller=controller(), headless=True, seed=seed, **options)
+    setup(game)
+    return game
+
+
+def timed_run(name, ticks, warmup, seed):
+    game = build(name, seed)
+    for _ in range(warmup):
+        game.update()
+
+    timer = game.timer = FrameTimer(UPDATE_PHASES, window=ticks)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        timer.begin_frame()
+        game.update()
+        timer.end_frame()
+    return time.perf_counter() - start, game, timer
+
+
+def run_scenario(name, ticks=2000, warmup=200, seed=1, repeat=3, memory_ticks=None):
+    """Time ticks updates after a warmup, keeping the fastest of repeat identical runs,
+    then measure peak memory on a fresh copy of the scenario"""
+    elapsed, game, timer = min((timed_run(name, ticks, warmup, seed) for _ in range(repeat)),
+                               key=lambda run: run[0])
+
+    # Tracing slows the game down several times, so memory gets its own shorter run
+    memory_ticks = memory_ticks if memory_ticks is not None else max(100, ticks // 5)
+    tracemalloc.start()
+    traced = build(name, seed)
+    for _ in range(warmup + memory_ticks):
+        traced.update()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "ticks": ticks,
+        "ticks_per_second": ticks / elapsed,
+        "phase_ms": {phase: sum(timer.history[phase]) / ticks for phase in UPDATE_PHASES},
+        "p99_tick_ms": timer.percentile("total", 0.99),
+        "peak_memory_mib": peak / 2**20,
+        "enemies": len(game.enemies),
+        "obstacles": len(game.obstacles),
+        "bullets": len(game.bullets) + len(game.enemy_bullets),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Names of the scenarios that got slower or bigger than the baseline by more than threshold"""
+    failed = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name}: no baseline")
+            continue
+        speed = result["ticks_per_second"] / base["ticks_per_second"] - 1
+        memory = result["peak_memory_mib"] / base["peak_memory_mib"] - 1
+        regressed = speed < -threshold or memory > threshold
+        print(f"{name}: {speed:+.1%} ticks/s, {memory:+.1%} peak memory"
+              f"{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            failed.append(name)
+    return failed
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the Shooter benchmark scenarios")
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run (default all): {', '.join(SCENARIOS)}")
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario; the fastest counts")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a saved baseline JSON")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed slowdown or memory growth before a scenario fails (default 0.10)")
+    args = parser.parse_args(argv)
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    results = {}
+    for name in names:
+        result = results[name] = run_scenario(name, args.ticks, args.warmup, args.seed, args.repeat)
+        phases = ", ".join(f"{phase} {ms:.3f}" for phase, ms in result["phase_ms"].items())
+        print(f"{name}: {result['ticks_per_second']:.0f} ticks/s, p99 tick {result['p99_tick_ms']:.2f} ms, "
+              f"peak {result['peak_memory_mib']:.1f} MiB, {result['enemies']} enemies, {result['obstacles']} obstacles, "
+              f"{result['bullets']} bullets\n    ms/tick: {phases}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failed = compare(results, baseline, args.threshold)
+        if failed:
+            print(f"{len(failed)} scenario(s) regressed more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Input controllers for the Shooter game.
+- Game.update asks the controller of each player for the pressed keys once per tick
+- KeyboardController reads the real keyboard, the others drive headless runs
+- Input for one tick packs into a bitmask of the keys the game reads (replays)
+"""
+
+import math
+
+import pygame
+
+# Every key Shooter.Game looks at, in bit order
+KEY_BITS = [pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN, pygame.K_SPACE,
+            pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4, pygame.K_RETURN]
+
+
+def keys_to_mask(keys):
+    mask = 0
+    for bit, key in enumerate(KEY_BITS):
+        if keys[key]:
+            mask |= 1 << bit
+    return mask
+
+
+def mask_to_keys(mask):
+    return KeyState(key for bit, key in enumerate(KEY_BITS) if mask & (1 << bit))
+
+
+class KeyState:
+    """Stand-in for pygame.key.get_pressed() backed by a set of key codes"""
+    def __init__(self, pressed=()):
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+    def __eq__(self, other):
+        return isinstance(other, KeyState) and self.pressed == other.pressed
+
+    def __hash__(self):
+        return hash(self.pressed)
+
+
+class Controller:
+    """Base class: return the keys held down for this tick"""
+    def get_keys(self, game):
+        return KeyState()
+
+
+class KeyboardController(Controller):
+    def get_keys(self, game):
+        return pygame.key.get_pressed()
+
+
+class RemoteController(Controller):
+    """Holds the keys last reported from outside the game loop, e.g. by a network client"""
+    def __init__(self):
+        self.mask = 0
+        self.keys = KeyState()
+
+    def set_mask(self, mask):
+        if mask != self.mask:
+            self.mask = mask
+            self.keys = mask_to_keys(mask)
+
+    def get_keys(self, game):
+        return self.keys
+
+
+class ScriptedController(Controller):
+    """Plays back a list of key sets, one per tick, looping at the end"""
+    def __init__(self, frames, loop=True):
+        self.frames = [KeyState(frame) for frame in frames] or [KeyState()]
+        self.loop = loop
+        self.index = 0
+
+    def get_keys(self, game):
+        if self.index >= len(self.frames):
+            if not self.loop:
+                return KeyState()
+            self.index = 0
+        keys = self.frames[self.index]
+        self.index += 1
+        return keys
+
+    @classmethod
+    def patrol(cls):
+        # Sweep around while firing, then push forward, then restart after game over
+        frames = ([{pygame.K_SPACE, pygame.K_LEFT}] * 36 +
+                  [{pygame.K_SPACE, pygame.K_UP}] * 24 +
+                  [{pygame.K_RETURN}])
+        return cls(frames)
+
+
+# Number keys that select each weapon
+WEAPON_KEYS = {"pistol": pygame.K_1, "shotgun": pygame.K_2, "machine_gun": pygame.K_3, "sniper": pygame.K_4}
+
+
+class BotController(Controller):
+    """Scripted Shooter player: aims at the nearest enemy, dodges incoming bullets
+    and picks up powerups. It reads only the game state, so seeded games replay exactly."""
+    def __init__(self, keep_away=180, engage_range=450, aim_tolerance=6, danger=60,
+                 dodge_horizon=20, threat_range=300, bounds=(1200, 900), restart=False):
+        self.keep_away = keep_away          # Back off from enemies closer than this
+        self.engage_range = engage_range    # Close in on enemies further than this
+        self.aim_tolerance = aim_tolerance  # Degrees off target the bot still fires at
+        self.danger = danger                # Predicted bullet miss distance that counts as a hit
+        self.dodge_horizon = dodge_horizon  # Ticks ahead moves, enemies and bullets are predicted
+        self.threat_range = threat_range
+        self.bounds = bounds                # Shooter's screen, which is the map
+        self.restart = restart              # Press Enter after game over
+
+    def get_keys(self, game):
+        if game.game_over:
+            return KeyState([pygame.K_RETURN] if self.restart else [])
+        player = game.player
+        pressed = set()
+
+        target, distance = self.nearest_enemy(game)
+        weapon = self.choose_weapon(player, distance)
+        if weapon != player.weapon:
+            pressed.add(WEAPON_KEYS[weapon])
+
+        # Fetch powerups when no enemy is pressing, otherwise fight
+        moving = None
+        powerup = self.nearest_powerup(game)
+        if powerup and (target is None or distance > self.keep_away):
+            off = self.turn(pressed, player, powerup.x, powerup.y)
+            if abs(off) < 30:
+                moving = pygame.K_UP
+        elif target:
+            off = self.turn(pressed, player, target.x, target.y)
+            if distance < self.keep_away:
+                moving = pygame.K_DOWN
+            elif distance > self.engage_range:
+                moving = pygame.K_UP
+            if (abs(off) < self.aim_tolerance and distance < self.engage_range + 200
+                    and game.sight.visible(player.x, player.y, target.x, target.y)):
+                pressed.add(pygame.K_SPACE)
+
+        moving = self.evade(game, moving, pressed)
+        if moving:
+            pressed.add(moving)
+        return KeyState(pressed)
+
+    def nearest_enemy(self, game):
+        # Enemies in sight first; one behind a wall only when nothing is in sight
+        player, sight = game.player, game.sight
+        best, best_distance, best_visible = None, math.inf, False
+        for enemy in game.enemies:
+            distance = math.hypot(enemy.x - player.x, enemy.y - player.y)
+            visible = sight.visible(player.x, player.y, enemy.x, enemy.y)
+            if (visible, -distance) > (best_visible, -best_distance):
+                best, best_distance, best_visible = enemy, distance, visible
+        return best, best_distance
+
+    def nearest_powerup(self, game):
+        player = game.player
+        return min(game.powerups, key=lambda p: math.hypot(p.x - player.x, p.y - player.y), default=None)
+
+    def choose_weapon(self, player, distance):
+        # Shotgun up close, sniper far away, machine gun in between
+        if distance < 150:
+            wanted = ("shotgun", "machine_gun", "pistol", "sniper")
+        elif distance > 350:
+            wanted = ("sniper", "machine_gun", "pistol", "shotgun")
+        else:
+            wanted = ("machine_gun", "pistol", "shotgun", "sniper")
+        return next(w for w in wanted if w in player.weapons_owned)
+
+    def turn(self, pressed, player, x, y):
+        """Press LEFT or RIGHT towards (x, y); returns how many degrees off the heading is"""
+        heading = math.degrees(math.atan2(y - player.y, x - player.x))
+        off = (heading - player.angle + 180) % 360 - 180
+        if off < -player.turn_speed / 2:
+            pressed.add(pygame.K_LEFT)
+        elif off > player.turn_speed / 2:
+            pressed.add(pygame.K_RIGHT)
+        return off
+
+    def threats(self, game):
+        """(x, y, vx, vy) of the enemy bullets within threat_range"""
+        player, bullets = game.player, game.enemy_bullets
+        reach = self.threat_range ** 2
+        if hasattr(bullets, "vx"):
+            # ProjectileSystem: filter the arrays, then read the few near ones
+            n = bullets.count
+            dx = bullets.x[:n] - player.x
+            dy = bullets.y[:n] - player.y
+            near = ((dx * dx + dy * dy) < reach) & bullets.alive[:n]
+            return [(float(bullets.x[i]), float(bullets.y[i]), float(bullets.vx[i]), float(bullets.vy[i]))
+                    for i in near.nonzero()[0].tolist()]
+        found = []
+        for b in bullets:
+            if (b.x - player.x) ** 2 + (b.y - player.y) ** 2 < reach:
+                rad = math.radians(b.angle)
+                found.append((b.x, b.y, b.speed * math.cos(rad), b.speed * math.sin(rad)))
+        return found
+
+    def evade(self, game, moving, pressed):
+        """Keep the planned move unless it ends up within reach of an enemy or a
+        bullet's path; then take whichever of forward, back or standing still is
+        safest. Cornered on all three, turn away from the enemies instead of aiming."""
+        player = game.player
+        near = [e for e in game.enemies
+                if math.hypot(e.x - player.x, e.y - player.y) < self.keep_away + 100]
+        threats = self.threats(game)
+        if not near and not threats:
+            return moving
+        rad = math.radians(player.angle)
+        fx, fy = player.speed * math.cos(rad), player.speed * math.sin(rad)
+        horizon = self.dodge_horizon
+
+        def safety(key):
+            sign = {pygame.K_UP: 1, pygame.K_DOWN: -1}.get(key, 0)
+            x, y = self.slide(player, sign * fx, sign * fy, horizon)
+            margin = math.inf
+            for e in near:
+                # Enemies are assumed to close in at full speed meanwhile
+                gap = math.hypot(x - e.x, y - e.y) - e.speed * horizon - e.radius - player.radius
+                margin = min(margin, gap)
+            for bx, by, bvx, bvy in threats:
+                # Closest approach of the bullet relative to the moving player
+                px, py = bx - player.x, by - player.y
+                vx, vy = bvx - sign * fx, bvy - sign * fy
+                speed2 = vx * vx + vy * vy
+                t = min(max(-(px * vx + py * vy) / speed2, 0), horizon) if speed2 else 0
+                margin = min(margin, math.hypot(px + vx * t, py + vy * t) - self.danger)
+            return margin
+
+        if safety(moving) >= 0:
+            return moving
+        best = max((moving, pygame.K_UP, pygame.K_DOWN, None), key=safety)
+        if near and safety(best) < 0:
+            # Run: face away from the enemies, weighted by how close they are
+            ax = sum((player.x - e.x) / max(1.0, math.hypot(player.x - e.x, player.y - e.y)) ** 2 for e in near)
+            ay = sum((player.y - e.y) / max(1.0, math.hypot(player.x - e.x, player.y - e.y)) ** 2 for e in near)
+            pressed.discard(pygame.K_LEFT)
+            pressed.discard(pygame.K_RIGHT)
+            self.turn(pressed, player, player.x + ax, player.y + ay)
+        return best
+
+    def slide(self, player, dx, dy, ticks):
+        # Where the player ends up moving by (dx, dy) per tick, stopping at walls and edges
+        x, y = player.x, player.y
+        r = player.radius
+        for _ in range(ticks):
+            nx = min(max(x + dx, r), self.bounds[0] - r)
+            ny = min(max(y + dy, r), self.bounds[1] - r)
+            if (nx, ny) == (x, y) or player.obstacles.collides(nx, ny, r):
+                break
+            x, y = nx, ny
+        return x, y
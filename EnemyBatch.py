@@ -0,0 +1,295 @@
+"""
+Vectorized enemy AI for the Shooter game.
+- EnemyBatch keeps the AI state of every enemy in parallel NumPy arrays
+- Targets, steering, obstacle tests and shot decisions for the chaser,
+  flanker and ambusher behaviors run as a few array passes per tick
+"""
+
+import math
+import random
+import time
+
+from NavGrid import NO_STEP, STEP_X, STEP_Y
+from SpatialIndex import obstacle_index
+
+# NumPy is optional; Shooter falls back to Enemy.update without it
+try:
+    import numpy as np
+    has_numpy = True
+except ImportError:
+    np = None
+    has_numpy = False
+
+BEHAVIORS = ("chaser", "flanker", "ambusher")
+CHASER, FLANKER, AMBUSHER = range(3)
+FLANK_DISTANCE = 200   # Same numbers as Enemy.update
+AMBUSH_RANGE = 300
+SHOOT_RANGE = 400
+ENEMY_MARGIN = 25      # Largest radius the obstacle cells are widened for; grows if needed
+
+if has_numpy:
+    FIELD_X = np.array(STEP_X)
+    FIELD_Y = np.array(STEP_Y)
+
+
+class EnemyBatch:
+    """Runs Enemy.update for a whole list of enemies in array passes.
+
+    While an enemy is in the batch its position, angle and last shot live in
+    the arrays and are written back to the Enemy after every update, so the
+    collision, drawing and save code keep working on Enemy objects."""
+    def __init__(self, obstacles=()):
+        if not has_numpy:
+            raise ImportError("EnemyBatch requires numpy")
+        self.members = []
+        self.set_obstacles(obstacles)
+
+    def set_obstacles(self, obstacles, margin=ENEMY_MARGIN):
+        # Same cells as ObstacleIndex, but every cell lists the obstacles a
+        # circle of up to margin radius centered in it could touch, so one
+        # lookup per enemy finds all its candidates. Packed into a dense
+        # (cols, rows, slots) table of obstacle numbers padded with -1
+        index = obstacle_index(obstacles)
+        self.obstacles = index
+        self.margin = margin
+        rects = [obs.rect for obs in index]
+        self.obs_cx = np.array([r.centerx for r in rects], dtype=float)
+        self.obs_cy = np.array([r.centery for r in rects], dtype=float)
+        self.obs_hw = np.array([r.width / 2 for r in rects], dtype=float)
+        self.obs_hh = np.array([r.height / 2 for r in rects], dtype=float)
+        size = self.cell_size = index.cell_size
+        # Positions past the edges are clamped to the edge cells, which reach every obstacle they could touch
+        cols = max([int(r.right + margin + 1) // size + 1 for r in rects] or [1])
+        rows = max([int(r.bottom + margin + 1) // size + 1 for r in rects] or [1])
+        cells = [[[] for _ in range(rows)] for _ in range(cols)]
+        for i, r in enumerate(rects):
+            for cx in range(max(0, int(r.left - margin - 1) // size), int(r.right + margin + 1) // size + 1):
+                for cy in range(max(0, int(r.top - margin - 1) // size), int(r.bottom + margin + 1) // size + 1):
+                    cells[cx][cy].append(i)
+        slots = max([len(bucket) for column in cells for bucket in column] or [0])
+        self.cell_table = np.full((cols, rows, max(1, slots)), -1, dtype=np.int32)
+        for cx, column in enumerate(cells):
+            for cy, bucket in enumerate(column):
+                self.cell_table[cx, cy, :len(bucket)] = bucket
+
+    def sync(self, enemies):
+        # The arrays are rebuilt only when enemies were spawned, killed or reloaded
+        if enemies == self.members:
+            return
+        self.members = list(enemies)
+        self.x = np.array([e.x for e in enemies], dtype=float)
+        self.y = np.array([e.y for e in enemies], dtype=float)
+        self.angle = np.array([e.angle for e in enemies], dtype=float)
+        self.speed = np.array([e.speed for e in enemies], dtype=float)
+        self.radius = np.array([e.radius for e in enemies], dtype=float)
+        self.aggression = np.array([e.aggression for e in enemies], dtype=float)
+        self.last_shot = np.array([e.last_shot for e in enemies], dtype=np.int64)
+        self.shot_cooldown = np.array([e.shot_cooldown for e in enemies], dtype=float)
+        self.behavior = np.array([BEHAVIORS.index(e.behavior_type) for e in enemies], dtype=np.int8)
+
+    def collides(self, x, y, radius):
+        """Obstacle.collides for many circles at once, against the obstacles listed in their cells"""
+        hit = np.zeros(len(x), dtype=bool)
+        if len(self.obs_cx) == 0 or len(x) == 0:
+            return hit
+        if radius.max() > self.margin:
+            self.set_obstacles(self.obstacles, margin=float(radius.max()))
+        cols, rows, _ = self.cell_table.shape
+        cx = np.clip(x // self.cell_size, 0, cols - 1).astype(np.int64)
+        cy = np.clip(y // self.cell_size, 0, rows - 1).astype(np.int64)
+        circle, slot = np.nonzero(self.cell_table[cx, cy] >= 0)
+        if len(circle) == 0:
+            return hit
+
+        # The exact circle-rectangle test, only on (circle, nearby obstacle) pairs
+        obs = self.cell_table[cx[circle], cy[circle], slot]
+        r = radius[circle]
+        dist_x = np.abs(x[circle] - self.obs_cx[obs])
+        dist_y = np.abs(y[circle] - self.obs_cy[obs])
+        hw, hh = self.obs_hw[obs], self.obs_hh[obs]
+        near = (dist_x <= hw + r) & (dist_y <= hh + r)
+        inside = (dist_x <= hw) | (dist_y <= hh)
+        corner = (dist_x - hw) ** 2 + (dist_y - hh) ** 2 <= r ** 2
+        hit[circle[near & (inside | corner)]] = True
+        return hit
+
+    def field_steps(self, flow):
+        """Flow field step index of every enemy's cell (NO_STEP without a field)"""
+        if flow is None:
+            return np.full(len(self.x), NO_STEP, dtype=np.uint8)
+        grid = flow.grid
+        col = np.clip((self.x // grid.cell_size).astype(np.int64), 0, grid.cols - 1)
+        row = np.clip((self.y // grid.cell_size).astype(np.int64), 0, grid.rows - 1)
+        steps = flow.step_array[row * grid.cols + col]
+        # Only chasers and flankers use the field
+        steps[self.behavior == AMBUSHER] = NO_STEP
+        return steps
+
+    def step(self, indices, dx, dy):
+        """Move the given enemies by (dx, dy) where that is clear; returns the moved mask"""
+        new_x = self.x[indices] + dx
+        new_y = self.y[indices] + dy
+        free = ~self.collides(new_x, new_y, self.radius[indices])
+        self.x[indices[free]] = new_x[free]
+        self.y[indices[free]] = new_y[free]
+        return free
+
+    def update(self, enemies, players, game_time, rng=random, flow=None, sight=None):
+        """Move every enemy one tick towards the nearest of players and return the
+        ones that shoot, in list order"""
+        self.sync(enemies)
+        if not self.members:
+            return []
+        x, y = self.x, self.y
+
+        # Face the nearest player
+        player_x = np.array([p.x for p in players], dtype=float)
+        player_y = np.array([p.y for p in players], dtype=float)
+        nearest = np.argmin(np.hypot(player_x - x[:, None], player_y - y[:, None]), axis=1)
+        px, py = player_x[nearest], player_y[nearest]
+        dx = px - x
+        dy = py - y
+        dist = np.hypot(dx, dy)
+        facing = dist > 0
+        self.angle[facing] = np.degrees(np.arctan2(dy[facing], dx[facing]))
+
+        # Targets: chasers go for the player, flankers for a point to the side,
+        # ambushers hold still once the player is close, unless they are seen
+        target_x = px.copy()
+        target_y = py.copy()
+        flank = self.behavior == FLANKER
+        perp = np.radians(self.angle[flank] + 90)
+        target_x[flank] = px[flank] + FLANK_DISTANCE * np.cos(perp)
+        target_y[flank] = py[flank] + FLANK_DISTANCE * np.sin(perp)
+        hold = (self.behavior == AMBUSHER) & (dist < AMBUSH_RANGE)
+        if sight:
+            waiting = np.flatnonzero(hold)
+            hold[waiting] = ~self.visible(sight, waiting, nearest, players)
+        target_x[hold] = x[hold]
+        target_y[hold] = y[hold]
+
+        # Step towards the target unless that runs into an obstacle. Chasers
+        # follow the flow field, flankers only fall back to it when blocked
+        tx = target_x - x
+        ty = target_y - y
+        target_dist = np.hypot(tx, ty)
+        field = self.field_steps(flow)
+        on_field = field != NO_STEP
+        speed = self.speed
+
+        follow = np.flatnonzero(on_field & (self.behavior == CHASER))
+        self.step(follow, speed[follow] * FIELD_X[field[follow]], speed[follow] * FIELD_Y[field[follow]])
+
+        direct = np.flatnonzero(~(on_field & (self.behavior == CHASER)) & (target_dist > 0))
+        moved = self.step(direct, speed[direct] * tx[direct] / target_dist[direct],
+                          speed[direct] * ty[direct] / target_dist[direct])
+        retry = direct[~moved & on_field[direct]]
+        self.step(retry, speed[retry] * FIELD_X[field[retry]], speed[retry] * FIELD_Y[field[retry]])
+
+        # Shots: one random roll per enemy that is ready, in range and in sight,
+        # drawn in list order so the RNG stream is the same as the per-enemy path
+        ready = np.flatnonzero((game_time - self.last_shot > self.shot_cooldown) & (dist < SHOOT_RANGE))
+        if sight:
+            # No shots through walls
+            ready = ready[self.visible(sight, ready, nearest, players)]
+        rolls = np.array([rng.random() for _ in range(len(ready))])
+        firing = ready[rolls < self.aggression[ready]]
+        self.last_shot[firing] = game_time
+
+        for enemy, ex, ey, angle in zip(self.members, x.tolist(), y.tolist(), self.angle.tolist()):
+            enemy.x, enemy.y, enemy.angle = ex, ey, angle
+        shooters = [self.members[i] for i in firing.tolist()]
+        for enemy in shooters:
+            enemy.last_shot = game_time
+        return shooters
+
+    def visible(self, sight, members, nearest, players):
+        # Line of sight from each of members to the player it goes for
+        seen = np.zeros(len(members), dtype=bool)
+        for i, player in enumerate(players):
+            mine = nearest[members] == i
+            if mine.any():
+                seen[mine] = sight.visible_many(self.x[members[mine]], self.y[members[mine]], player.x, player.y)
+        return seen
+
+
+def benchmark(counts=(10, 100, 1000, 5000, 10000), ticks=50, seed=1):
+    """Compare Enemy.update in a loop with EnemyBatch.update, and check they agree"""
+    import copy
+    from Shooter import Enemy, Player, generate_random_map, SCREEN_WIDTH, SCREEN_HEIGHT, ENEMY_SIZE
+    from SpatialIndex import ObstacleIndex
+    from NavGrid import NavGrid, FlowField, LineOfSight
+
+    rng = random.Random(seed)
+    obstacles = generate_random_map(rng=rng)
+    index = ObstacleIndex(obstacles)
+    grid = NavGrid(obstacles, SCREEN_WIDTH, SCREEN_HEIGHT, clearance=ENEMY_SIZE[0] // 2)
+    flow, sight = FlowField(grid), LineOfSight(grid)
+    print(f"{'enemies':>8} {'object ms/tick':>15} {'batch ms/tick':>14} {'max drift':>10} {'shot diffs':>10}")
+    for n in counts:
+        player = Player(index, rng)
+        enemies = [Enemy(index, rng=rng) for _ in range(n)]
+        twins = [copy.copy(e) for e in enemies]
+        batch = EnemyBatch(index)
+        object_rng, batch_rng = random.Random(seed), random.Random(seed)
+        for e in enemies:
+            e.rng = object_rng
+
+        object_time = batch_time = 0.0
+        shot_diffs = 0
+        for tick in range(1, ticks + 1):
+            # The player circles the map so every behavior branch gets exercised
+            player.x = 600 + 300 * math.cos(tick / 10)
+            player.y = 450 + 250 * math.sin(tick / 10)
+            flow.set_goal(player.x, player.y)
+            sight.clear()
+
+            start = time.perf_counter()
+            shot = [e for e in enemies if e.update(player, tick * 10, flow, sight)]
+            object_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            batch_shot = batch.update(twins, [player], tick * 10, batch_rng, flow, sight)
+            batch_time += time.perf_counter() - start
+
+            shot_diffs += [enemies.index(e) for e in shot] != [twins.index(e) for e in batch_shot]
+
+        drift = max(max(abs(a.x - b.x), abs(a.y - b.y)) for a, b in zip(enemies, twins))
+        print(f"{n:>8} {object_time * 1000 / ticks:15.3f} {batch_time * 1000 / ticks:14.3f} "
+              f"{drift:10.2g} {shot_diffs:>10}")
+
+
+def benchmark_obstacles(counts=(10, 50, 200, 800), circles=10000, width=1200, height=900, seed=1):
+    """Compare EnemyBatch.collides with testing every circle against every obstacle"""
+    import types
+    import pygame
+    rng = random.Random(seed)
+    x = np.array([rng.uniform(-50, width + 50) for _ in range(circles)])
+    y = np.array([rng.uniform(-50, height + 50) for _ in range(circles)])
+    radius = np.full(circles, 25.0)
+    print(f"{'obstacles':>9} {'all pairs ms':>13} {'grid ms':>8}")
+    for n in counts:
+        obstacles = [types.SimpleNamespace(rect=pygame.Rect(rng.randint(0, width - 40), rng.randint(0, height - 40),
+                                                            rng.randint(10, 60), rng.randint(10, 60)))
+                     for _ in range(n)]
+        batch = EnemyBatch(obstacles)
+
+        start = time.perf_counter()
+        dist_x = np.abs(x[:, None] - batch.obs_cx)
+        dist_y = np.abs(y[:, None] - batch.obs_cy)
+        hw, hh, r = batch.obs_hw, batch.obs_hh, radius[:, None]
+        expected = (((dist_x <= hw + r) & (dist_y <= hh + r)) &
+                    ((dist_x <= hw) | (dist_y <= hh) | ((dist_x - hw) ** 2 + (dist_y - hh) ** 2 <= r ** 2))).any(axis=1)
+        pairs_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        hit = batch.collides(x, y, radius)
+        grid_ms = (time.perf_counter() - start) * 1000
+        assert (hit == expected).all(), "grid lookup disagrees with the all pairs test"
+        print(f"{n:>9} {pairs_ms:13.2f} {grid_ms:8.2f}")
+
+
+if __name__ == "__main__":
+    benchmark()
+    print()
+    benchmark_obstacles()
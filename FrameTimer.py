@@ -0,0 +1,142 @@
+"""
+Per-phase frame timing for the Shooter game.
+- FrameTimer.lap(name) charges the time since the previous lap to a phase
+- Rolling p50/p99 per phase, drawn as a toggleable bar chart overlay
+- Every frame can be streamed to a CSV file for offline analysis
+- DetailLevels picks how much detail a crowd can be drawn with from what
+  drawing it has cost in recent frames
+"""
+
+import csv
+import time
+from collections import deque
+
+import pygame
+
+from TextCache import text_cache
+
+
+class FrameTimer:
+    """Accumulates phase times within a frame and keeps the last `window` frames"""
+    def __init__(self, phases, window=300, budget_ms=1000 / 60):
+        self.phases = list(phases)
+        self.window = window
+        self.budget_ms = budget_ms
+        self.history = {name: deque(maxlen=window) for name in self.phases + ["total"]}
+        self.current = dict.fromkeys(self.phases, 0.0)
+        self.frame = 0
+        self.last = time.perf_counter()
+        self.frame_start = self.last
+        self.csv_file = None
+        self.csv_writer = None
+
+        # Overlay panel, rebuilt a few times per second rather than every frame
+        self.visible = False
+        self.panel = None
+        self.panel_frame = -1
+        self.panel_interval = 15
+
+    def begin_frame(self):
+        self.current = dict.fromkeys(self.phases, 0.0)
+        self.last = self.frame_start = time.perf_counter()
+
+    def start(self):
+        # Restart the lap clock without charging the gap to any phase
+        self.last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.current[name] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        total = time.perf_counter() - self.frame_start
+        for name, seconds in self.current.items():
+            self.history[name].append(seconds * 1000)
+        self.history["total"].append(total * 1000)
+        if self.csv_writer:
+            self.csv_writer.writerow([self.frame] + [f"{self.current[name] * 1000:.4f}" for name in self.phases]
+                                     + [f"{total * 1000:.4f}"])
+        self.frame += 1
+
+    def percentile(self, name, q):
+        samples = sorted(self.history[name])
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def summary(self):
+        """{phase: (p50, p99)} in milliseconds over the rolling window"""
+        return {name: (self.percentile(name, 0.5), self.percentile(name, 0.99))
+                for name in self.phases + ["total"]}
+
+    def open_csv(self, path):
+        self.csv_file = open(path, "w", newline="")
+        self.csv_writer = csv.writer(self.csv_file)
+        self.csv_writer.writerow(["frame"] + [f"{name}_ms" for name in self.phases] + ["total_ms"])
+
+    def close(self):
+        if self.csv_file:
+            self.csv_file.close()
+            self.csv_file = self.csv_writer = None
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.panel = None
+
+    def draw(self, surface, pos, font):
+        """Bar chart of p50 (bar) and p99 (tick mark) per phase against the frame budget"""
+        if not self.visible:
+            return None
+        if self.panel is None or self.frame - self.panel_frame >= self.panel_interval:
+            self.panel = self.build_panel(font)
+            self.panel_frame = self.frame
+        return surface.blit(self.panel, pos)
+
+    def build_panel(self, font, bar_width=160, row_height=18):
+        names = self.phases + ["total"]
+        width = 130 + bar_width + 110
+        panel = pygame.Surface((width, row_height * (len(names) + 1) + 8), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        scale = bar_width / self.budget_ms
+
+        title = text_cache.render(font, f"frame budget {self.budget_ms:.1f} ms  (p50 / p99)", (255, 255, 255))
+        panel.blit(title, (4, 4))
+        for i, name in enumerate(names):
+            y = 4 + row_height * (i + 1)
+            p50, p99 = self.percentile(name, 0.5), self.percentile(name, 0.99)
+            panel.blit(text_cache.render(font, name, (200, 200, 200)), (4, y))
+            color = (80, 200, 80) if p99 < self.budget_ms / 4 else (230, 180, 40) if p99 < self.budget_ms else (230, 60, 60)
+            pygame.draw.rect(panel, color, (130, y + 3, min(bar_width, int(p50 * scale)) or 1, row_height - 8))
+            marker = 130 + min(bar_width, int(p99 * scale))
+            pygame.draw.line(panel, (255, 255, 255), (marker, y + 1), (marker, y + row_height - 4))
+            # Numbers change every rebuild, so they bypass the shared text cache
+            label = font.render(f"{p50:6.2f} / {p99:6.2f}", True, (255, 255, 255))
+            panel.blit(label, (130 + bar_width + 6, y))
+        return panel
+
+
+class DetailLevels:
+    """Ways to draw a crowd, most detailed first, each used while n things fit the time budget.
+
+    The cost per thing of each level starts out as budget_ms / its default limit
+    and then follows the measured cost, so the limits settle where this
+    machine can afford them. The last level is the fallback and has no limit."""
+    def __init__(self, budget_ms, limits, smoothing=0.2):
+        self.budget_ms = budget_ms
+        self.cost = [budget_ms / limit for limit in limits]  # ms per thing drawn
+        self.smoothing = smoothing
+
+    def choose(self, n):
+        for level, cost in enumerate(self.cost):
+            if n * cost <= self.budget_ms:
+                return level
+        return len(self.cost)
+
+    def limits(self):
+        return [int(self.budget_ms / cost) for cost in self.cost]
+
+    def measured(self, level, n, seconds):
+        # Tiny crowds say little about the cost per thing; they stay at full detail anyway
+        if level < len(self.cost) and n >= 20:
+            self.cost[level] += self.smoothing * (seconds * 1000 / n - self.cost[level])
@@ -0,0 +1,307 @@
+"""
+Leaderboard for the Shooter games, replacing highscore.txt.
+- SQLite in WAL mode, so many game processes can write while others read
+- submit() only queues the result; a background thread writes queued
+  results in batches, one transaction each, off the game loop
+- top() and best() are served from an in-memory cache that the writer
+  thread refreshes after each batch and every few seconds
+- A batch that cannot be written is reported and dropped; flush() raises its error
+- highscore.txt is imported once, into an empty default database only
+- Run as a script to load-test it with many concurrent writer processes
+"""
+
+import atexit
+import multiprocessing.util
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+DEFAULT_PATH = "leaderboard.db"
+LEGACY_PATH = "highscore.txt"
+GAMES = ("shooter", "shooter3d")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    game TEXT NOT NULL,
+    map TEXT NOT NULL DEFAULT '',
+    score INTEGER NOT NULL,
+    level INTEGER,
+    ticks INTEGER,
+    seed INTEGER,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_game_top ON results (game, score DESC);
+CREATE INDEX IF NOT EXISTS results_map_top ON results (game, map, score DESC);
+CREATE TABLE IF NOT EXISTS map_best (
+    game TEXT NOT NULL,
+    map TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    PRIMARY KEY (game, map)
+);
+"""
+
+INSERT_RESULT = ("INSERT INTO results (game, map, score, level, ticks, seed, created) "
+                 "VALUES (?, ?, ?, ?, ?, ?, ?)")
+UPSERT_MAP_BEST = ("INSERT INTO map_best (game, map, score, games) VALUES (?, ?, ?, 1) "
+                   "ON CONFLICT (game, map) DO UPDATE SET score = max(score, excluded.score), games = games + 1")
+
+
+def connect(path, timeout=30.0):
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+    # WAL lets readers run alongside the single writer; NORMAL sync is safe in WAL mode
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class Leaderboard:
+    """Scores of finished games, per game and per map"""
+    def __init__(self, path=DEFAULT_PATH, top_n=10, batch_size=256, flush_interval=0.5, refresh=5.0,
+                 migrate=None):
+        self.path = path
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval    # Seconds a batch may wait for more results
+        self.refresh = refresh                  # Seconds between cache reloads when idle
+        self.cache = {}                         # (game, map) -> [(score, level, created)], best first
+        # Guards the reader connection and the cache, which the game and the writer
+        # thread both update; reentrant so a cache update can hold it around _load
+        self.lock = threading.RLock()
+        self.reader = connect(path)
+        with self.reader:
+            self.reader.executescript(SCHEMA)
+        # Only the game's own board takes over highscore.txt; scratch and self-play boards start empty
+        if migrate is None:
+            migrate = path == DEFAULT_PATH
+        if migrate:
+            self.import_legacy()
+        self.pending = queue.Queue()
+        self.written = 0
+        self.dropped = 0
+        self.error = None    # Last write error, raised by flush()
+        self.writer = threading.Thread(target=self._write_loop, name="leaderboard", daemon=True)
+        self.writer.start()
+
+    def import_legacy(self, path=LEGACY_PATH):
+        # The old single high score becomes the first result of both games
+        try:
+            with open(path) as f:
+                score = int(f.read().strip())
+        except (OSError, ValueError):
+            return
+        if score <= 0:
+            return
+        with self.lock:
+            # Immediate, so two games starting at once cannot both import it
+            self.reader.execute("BEGIN IMMEDIATE")
+            try:
+                if self.reader.execute("SELECT 1 FROM results LIMIT 1").fetchone() is None:
+                    now = time.time()
+                    self.reader.executemany(INSERT_RESULT, [(game, "", score, None, None, None, now)
+                                                            for game in GAMES])
+            finally:
+                self.reader.execute("COMMIT")
+
+    def submit(self, game, score, map="", level=None, ticks=None, seed=None):
+        """Queue a finished game's result; returns at once"""
+        row = (game, map or "", int(score), level, ticks, seed, time.time())
+        self.pending.put(row)
+        # Shown straight away, before it reaches the database
+        with self.lock:
+            for key in ((game, None), (game, row[1])):
+                entries = self.cache.get(key)
+                if entries is not None:
+                    self.cache[key] = sorted(entries + [(row[2], level, row[6])], reverse=True)[:self.top_n]
+
+    def top(self, game, map=None, n=None):
+        """Best results of a game, or of one map of it, as (score, level, created)"""
+        key = (game, map)
+        entries = self.cache.get(key)
+        if entries is None:
+            # First request for this board: read it now, the writer keeps it fresh from here
+            with self.lock:
+                entries = self.cache.get(key)
+                if entries is None:
+                    entries = self.cache[key] = self._load(self.reader, key)
+        return entries[:n or self.top_n]
+
+    def best(self, game, map=None):
+        entries = self.top(game, map, 1)
+        return entries[0][0] if entries else 0
+
+    def _load(self, conn, key):
+        game, map = key
+        with self.lock:
+            if map is None:
+                rows = conn.execute("SELECT score, level, created FROM results WHERE game = ? "
+                                    "ORDER BY score DESC LIMIT ?", (game, self.top_n))
+            else:
+                rows = conn.execute("SELECT score, level, created FROM results WHERE game = ? AND map = ? "
+                                    "ORDER BY score DESC LIMIT ?", (game, map, self.top_n))
+            return rows.fetchall()
+
+    def _write_loop(self):
+        conn = connect(self.path)
+        while True:
+            try:
+                row = self.pending.get(timeout=self.refresh)
+            except queue.Empty:
+                self._refresh(conn)  # Pick up results from other processes
+                continue
+            if row is None:
+                break
+            batch = [row]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    row = self.pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+            try:
+                self._write(conn, batch)
+            except sqlite3.Error as e:
+                # Keep the thread alive for later results; flush() tells the caller
+                self.dropped += len(batch)
+                self.error = e
+                print(f"leaderboard: {len(batch)} result(s) not written to {self.path}: {e}", file=sys.stderr)
+            for _ in batch:
+                self.pending.task_done()
+            self._refresh(conn)
+            if stop:
+                break
+        conn.close()
+
+    def _write(self, conn, batch):
+        while True:
+            try:
+                with conn:
+                    conn.executemany(INSERT_RESULT, batch)
+                    conn.executemany(UPSERT_MAP_BEST, [(row[0], row[1], row[2]) for row in batch])
+                break
+            except sqlite3.OperationalError as e:
+                # Busy beyond the timeout under heavy contention; the batch stays whole
+                if "locked" not in str(e) and "busy" not in str(e):
+                    raise
+                time.sleep(0.05)
+        self.written += len(batch)
+
+    def _refresh(self, conn):
+        # Under the lock, so a result submitted meanwhile is not overwritten by an older read
+        with self.lock:
+            for key in list(self.cache):
+                self.cache[key] = self._load(conn, key)
+
+    def map_bests(self, game):
+        """Best score and games played on every map of a game"""
+        with self.lock:
+            return self.reader.execute("SELECT map, score, games FROM map_best WHERE game = ? "
+                                       "ORDER BY map", (game,)).fetchall()
+
+    def flush(self):
+        """Wait until every submitted result is written; raises the last write error if a batch was dropped"""
+        self.pending.join()
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        if self.writer.is_alive():
+            self.pending.put(None)
+            self.writer.join()
+        self.reader.close()
+
+
+_boards = {}
+
+
+def leaderboard(path=DEFAULT_PATH):
+    """Shared Leaderboard per database file, written out at exit"""
+    board = _boards.get(path)
+    if board is None:
+        board = _boards[path] = Leaderboard(path)
+        atexit.register(board.close)
+        # Process pool workers skip atexit but run multiprocessing's finalizers
+        multiprocessing.util.Finalize(board, board.close, exitpriority=10)
+    return board
+
+
+def _writer_process(path, worker, results, start):
+    board = Leaderboard(path)
+    start.wait()
+    for i in range(results):
+        board.submit("shooter", (worker * 7919 + i * 104729) % 10000, map=f"library:{i % 20}",
+                     level=1 + i % 10, ticks=i * 60, seed=worker)
+        time.sleep(0.001)
+    board.close()
+
+
+def load_test(path, processes=100, results=50):
+    """Many processes submitting results at once; checks none is lost"""
+    import multiprocessing
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    board = Leaderboard(path)
+    before = board.reader.execute("SELECT count(*) FROM results").fetchone()[0]
+    board.close()
+    start = multiprocessing.Event()
+    workers = [multiprocessing.Process(target=_writer_process, args=(path, w, results, start))
+               for w in range(processes)]
+    for process in workers:
+        process.start()
+    began = time.perf_counter()
+    start.set()
+    for process in workers:
+        process.join()
+    elapsed = time.perf_counter() - began
+    failed = sum(process.exitcode != 0 for process in workers)
+
+    board = Leaderboard(path)
+    count = board.reader.execute("SELECT count(*) FROM results").fetchone()[0] - before
+    print(f"{processes} processes x {results} results: {count} of {processes * results} written "
+          f"in {elapsed:.2f}s ({count / elapsed:.0f} results/s), {failed} processes failed")
+
+    n = 2000
+    begin = time.perf_counter()
+    for _ in range(n):
+        board._load(board.reader, ("shooter", "library:3"))
+    sql_us = (time.perf_counter() - begin) * 1e6 / n
+    board.top("shooter", "library:3")
+    begin = time.perf_counter()
+    for _ in range(n):
+        board.top("shooter", "library:3")
+    cache_us = (time.perf_counter() - begin) * 1e6 / n
+    print(f"top {board.top_n} per map: {sql_us:.1f} us from SQLite, {cache_us:.2f} us from the cache")
+    print("best: " + ", ".join(str(score) for score, _, _ in board.top("shooter", n=5)))
+    board.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Shooter leaderboard")
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument("--game", default="shooter", choices=GAMES)
+    parser.add_argument("--map", default=None, help="one map's board, e.g. library:3")
+    parser.add_argument("--load-test", type=int, metavar="PROCESSES",
+                        help="hammer a scratch database with this many writer processes")
+    parser.add_argument("--results", type=int, default=50, help="results per load test process")
+    args = parser.parse_args()
+
+    if args.load_test:
+        load_test(args.path if args.path != DEFAULT_PATH else "leaderboard-load.db", args.load_test, args.results)
+    else:
+        board = Leaderboard(args.path)
+        for rank, (score, level, created) in enumerate(board.top(args.game, args.map), 1):
+            print(f"{rank:>3}. {score:>7}  level {level if level is not None else '-':>3}  "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(created))}")
+        board.close()
@@ -0,0 +1,243 @@
+"""
+Pregenerated map library for the Shooter game.
+- random_map_rects is the map generator, free of pygame so worker processes can run it
+- validate_map flood-fills the open space and checks the centre spawn area
+- MapLibrary reads an indexed .shml file and returns any map in constant time
+- Run as a script to build a library in a process pool, or to inspect one
+"""
+
+import math
+import mmap
+import os
+import random
+import struct
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+MAGIC = b"SHML"
+VERSION = 1
+
+# magic, version, map count, map width, map height
+HEADER = struct.Struct("<4sHIHH")
+ENTRY = struct.Struct("<IIB")    # seed, offset of the first rect, rect count
+RECT = struct.Struct("<4H")      # x, y, w, h
+
+VALIDATION_CELL = 25    # Pixels per flood-fill cell
+CLEARANCE = 25          # Radius that must fit through the open space (an enemy)
+SPAWN_CLEARANCE = 60    # Half-size of the obstacle-free square around the centre spawn
+MIN_CONNECTED = 0.98    # Share of the open cells that must be reachable from the spawn
+ACCEPTANCE_GUESS = 0.5  # Share of generated maps that pass validate_map, until build has measured it
+
+
+def random_map_rects(width, height, min_obstacles=5, max_obstacles=10, min_size=50, max_size=250, rng=None,
+                     grid_size=200):
+    """Genererer en tilfældig bane med forhindringer, as (x, y, w, h) tuples"""
+    rng = rng or random
+    rects = []
+    num_obstacles = rng.randint(min_obstacles, max_obstacles)
+
+    # Grid-based placement to avoid complete overlap, at most one obstacle per grid cell
+    grid_cols = width // grid_size
+    grid_rows = height // grid_size
+
+    # Create a grid to track used cells
+    used_cells = set()
+
+    # Ensure center area is clear for player spawn
+    center_x = width // 2
+    center_y = height // 2
+    center_cell_x = center_x // grid_size
+    center_cell_y = center_y // grid_size
+    used_cells.add((center_cell_x, center_cell_y))
+
+    for _ in range(num_obstacles):
+        attempts = 0
+        while attempts < 10:  # Prøv 10 gange at placere en forhindring
+            cell_x = rng.randint(0, grid_cols-1)
+            cell_y = rng.randint(0, grid_rows-1)
+
+            # Skip if cell is already used
+            if (cell_x, cell_y) in used_cells:
+                attempts += 1
+                continue
+
+            # Randomize obstacle properties
+            w = rng.randint(min_size, max_size)
+            h = rng.randint(min_size, max_size)
+            x = cell_x * grid_size + rng.randint(0, grid_size - min_size)
+            y = cell_y * grid_size + rng.randint(0, grid_size - min_size)
+
+            # Constrain to screen
+            x = min(max(0, x), width - w)
+            y = min(max(0, y), height - h)
+
+            # Add obstacle and mark cell as used
+            rects.append((x, y, w, h))
+            used_cells.add((cell_x, cell_y))
+            break
+
+        attempts += 1
+
+    return rects
+
+
+def _circle_hits_rect(x, y, radius, rect):
+    # Same circle-rectangle test as Shooter.Obstacle.collides
+    rx, ry, rw, rh = rect
+    dist_x = abs(x - (rx + rw // 2))
+    dist_y = abs(y - (ry + rh // 2))
+    if dist_x > rw / 2 + radius or dist_y > rh / 2 + radius:
+        return False
+    if dist_x <= rw / 2 or dist_y <= rh / 2:
+        return True
+    return (dist_x - rw / 2) ** 2 + (dist_y - rh / 2) ** 2 <= radius ** 2
+
+
+def validate_map(rects, width, height, cell=VALIDATION_CELL, clearance=CLEARANCE,
+                 spawn_clearance=SPAWN_CLEARANCE, min_connected=MIN_CONNECTED):
+    """Return (ok, reason). A map is ok when the square around the centre spawn
+    is free and nearly all open cells are reachable from it."""
+    cx, cy = width // 2, height // 2
+    for x, y, w, h in rects:
+        if (x < cx + spawn_clearance and x + w > cx - spawn_clearance and
+                y < cy + spawn_clearance and y + h > cy - spawn_clearance):
+            return False, "spawn"
+
+    # Rasterize: a cell is open when a circle of the clearance radius fits at its center
+    cols, rows = math.ceil(width / cell), math.ceil(height / cell)
+    half = cell / 2
+    open_cells = bytearray([1]) * (cols * rows)
+    for rect in rects:
+        x, y, w, h = rect
+        for row in range(max(0, int((y - clearance) // cell)), min(rows, int((y + h + clearance) // cell) + 1)):
+            for col in range(max(0, int((x - clearance) // cell)), min(cols, int((x + w + clearance) // cell) + 1)):
+                if open_cells[row * cols + col] and _circle_hits_rect(col * cell + half, row * cell + half,
+                                                                      clearance, rect):
+                    open_cells[row * cols + col] = 0
+
+    start = (cy // cell) * cols + cx // cell
+    seen = bytearray(cols * rows)
+    seen[start] = 1
+    queue = deque([start])
+    reached = 0
+    while queue:
+        cell_index = queue.popleft()
+        reached += 1
+        row, col = divmod(cell_index, cols)
+        for ncol, nrow in ((col + 1, row), (col - 1, row), (col, row + 1), (col, row - 1)):
+            if 0 <= ncol < cols and 0 <= nrow < rows:
+                n = nrow * cols + ncol
+                if open_cells[n] and not seen[n]:
+                    seen[n] = 1
+                    queue.append(n)
+
+    if reached < min_connected * sum(open_cells):
+        return False, "connectivity"
+    return True, ""
+
+
+def _generate(seed, width, height):
+    # Worker: one candidate map, or None if it fails validation
+    rects = random_map_rects(width, height, rng=random.Random(seed))
+    ok, reason = validate_map(rects, width, height)
+    return seed, rects if ok else None, reason
+
+
+def build(path, count, width=1200, height=900, first_seed=0, workers=None, chunksize=64):
+    """Generate and validate maps in a process pool until count of them pass, then write the library"""
+    start = time.perf_counter()
+    maps, rejected = [], {}
+    seed = first_seed
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while len(maps) < count:
+            # The generator only keeps the centre grid cell free, so most rejections are
+            # rects reaching into the spawn square; about half the candidates pass.
+            # Size each batch by the acceptance rate seen so far, with some margin
+            tried = seed - first_seed
+            acceptance = len(maps) / tried if maps else ACCEPTANCE_GUESS
+            batch = range(seed, seed + max(chunksize, math.ceil((count - len(maps)) / acceptance * 1.1)))
+            seed = batch.stop
+            for map_seed, rects, reason in pool.map(_generate, batch, [width] * len(batch),
+                                                    [height] * len(batch), chunksize=chunksize):
+                if rects is None:
+                    rejected[reason] = rejected.get(reason, 0) + 1
+                elif len(maps) < count:
+                    maps.append((map_seed, rects))
+    write(path, maps, width, height)
+    elapsed = time.perf_counter() - start
+    print(f"{count} maps written to {path} ({os.path.getsize(path) / 1024:.1f} KiB) in {elapsed:.2f}s, "
+          f"{seed - first_seed} candidates, rejected: {rejected or 'none'}")
+
+
+def write(path, maps, width, height):
+    header = HEADER.pack(MAGIC, VERSION, len(maps), width, height)
+    index, body = [], []
+    offset = HEADER.size + ENTRY.size * len(maps)
+    for seed, rects in maps:
+        index.append(ENTRY.pack(seed, offset, len(rects)))
+        body.extend(RECT.pack(*rect) for rect in rects)
+        offset += RECT.size * len(rects)
+    with open(path, "wb") as f:
+        f.write(header + b"".join(index) + b"".join(body))
+
+
+class MapLibrary:
+    """Read-only view of a map library file; get(i) is one index lookup and one read"""
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.width, self.height = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} Shooter map library")
+
+    def __len__(self):
+        return self.count
+
+    def entry(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(f"map {index} out of range (library has {self.count})")
+        return ENTRY.unpack_from(self.data, HEADER.size + ENTRY.size * index)
+
+    def get(self, index):
+        """The obstacle rects of map number index"""
+        seed, offset, n = self.entry(index)
+        return [RECT.unpack_from(self.data, offset + RECT.size * i) for i in range(n)]
+
+    def seed(self, index):
+        return self.entry(index)[0]
+
+    def close(self):
+        self.data.close()
+
+
+def info(path, samples=1000):
+    library = MapLibrary(path)
+    start = time.perf_counter()
+    rng = random.Random(0)
+    for _ in range(samples):
+        library.get(rng.randrange(len(library)))
+    elapsed = time.perf_counter() - start
+    obstacles = sum(library.entry(i)[2] for i in range(len(library)))
+    print(f"{path}: {len(library)} maps of {library.width}x{library.height}, "
+          f"{obstacles / len(library):.1f} obstacles per map, "
+          f"{elapsed * 1e6 / samples:.1f} us per random map load")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Build or inspect a Shooter map library")
+    sub = parser.add_subparsers(dest="command", required=True)
+    make = sub.add_parser("build", help="generate and validate maps in a process pool")
+    make.add_argument("path")
+    make.add_argument("--count", type=int, default=5000)
+    make.add_argument("--seed", type=int, default=0, help="first seed to try")
+    make.add_argument("--workers", type=int, default=None)
+    sub.add_parser("info", help="summarize a library and time random loads").add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.path, args.count, first_seed=args.seed, workers=args.workers)
+    else:
+        info(args.path)
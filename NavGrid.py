@@ -0,0 +1,276 @@
+"""
+Navigation grid for the Shooter game.
+- NavGrid rasterizes the map obstacles into walkable and blocked cells
+- FlowField runs one Dijkstra pass out from the players' cells and stores a
+  step direction for every cell, which all enemies then read in O(1)
+- LineOfSight walks the grid between two cells (DDA), cached per cell pair
+"""
+
+import heapq
+import math
+import random
+import time
+from collections import OrderedDict
+
+from SpatialIndex import obstacle_index
+
+# NumPy is optional; it only backs the array view EnemyBatch reads
+try:
+    import numpy as np
+    has_numpy = True
+except ImportError:
+    np = None
+    has_numpy = False
+
+NAV_CELL = 25  # Pixels per grid cell, half an enemy
+
+# The eight neighbour steps and their cost; index 8 means "no direction"
+STEPS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, -1), (1, -1), (-1, 1)]
+STEP_COST = [1.0] * 4 + [math.sqrt(2)] * 4
+NO_STEP = 8
+STEP_X = [dx / math.hypot(dx, dy) for dx, dy in STEPS] + [0.0]
+STEP_Y = [dy / math.hypot(dx, dy) for dx, dy in STEPS] + [0.0]
+
+
+class NavGrid:
+    """Obstacles rasterized to cells an entity of the given clearance can stand in,
+    plus the cells the obstacles themselves cover (for line of sight)"""
+    def __init__(self, obstacles, width, height, cell_size=NAV_CELL, clearance=0):
+        self.cell_size = cell_size
+        self.cols = math.ceil(width / cell_size)
+        self.rows = math.ceil(height / cell_size)
+        self.clearance = clearance
+
+        # A cell is blocked when a circle of the clearance radius at its
+        # center would touch an obstacle, so paths keep enemies off the walls
+        index = obstacle_index(obstacles)
+        self.blocked = bytearray(self.cols * self.rows)
+        half = cell_size / 2
+        for row in range(self.rows):
+            for col in range(self.cols):
+                if index.collides(col * cell_size + half, row * cell_size + half, clearance):
+                    self.blocked[row * self.cols + col] = 1
+        self.neighbours = [self._neighbours(cell) for cell in range(self.cols * self.rows)]
+
+        # Cells that overlap an obstacle at all block sight
+        self.solid = bytearray(self.cols * self.rows)
+        for obs in obstacles:
+            rect = obs.rect
+            for row in range(max(rect.top // cell_size, 0), min((rect.bottom - 1) // cell_size, self.rows - 1) + 1):
+                for col in range(max(rect.left // cell_size, 0), min((rect.right - 1) // cell_size, self.cols - 1) + 1):
+                    self.solid[row * self.cols + col] = 1
+
+    def _neighbours(self, cell):
+        # (neighbour, cost, step from the neighbour back to this cell), precomputed
+        # once per map so flow field passes do no bounds or corner checks
+        cols, rows, blocked = self.cols, self.rows, self.blocked
+        row, col = divmod(cell, cols)
+        found = []
+        for i, (dx, dy) in enumerate(STEPS):
+            ncol, nrow = col + dx, row + dy
+            if not (0 <= ncol < cols and 0 <= nrow < rows):
+                continue
+            # No cutting corners: both side cells of a diagonal must be open
+            if dx and dy and (blocked[row * cols + ncol] or blocked[nrow * cols + col]):
+                continue
+            # STEPS pairs up opposite directions by index ^ 1
+            found.append((nrow * cols + ncol, STEP_COST[i], i ^ 1))
+        return found
+
+    def cell_of(self, x, y):
+        col = min(max(int(x // self.cell_size), 0), self.cols - 1)
+        row = min(max(int(y // self.cell_size), 0), self.rows - 1)
+        return row * self.cols + col
+
+
+class FlowField:
+    """Step directions towards the nearest goal cell, recomputed only when a goal changes cell"""
+    def __init__(self, grid, cache_size=64):
+        self.grid = grid
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # goal cells -> steps
+        self.goal = None
+        self.steps = None
+        self.step_array = None
+        self.computed = 0
+
+    def set_goal(self, x, y):
+        self.set_goals([(x, y)])
+
+    def set_goals(self, points):
+        # One goal per player; each cell then steps towards the closest of them
+        cell_of = self.grid.cell_of
+        goal = tuple(sorted({cell_of(x, y) for x, y in points}))
+        if goal == self.goal:
+            return
+        self.goal = goal
+        steps = self.cache.get(goal)
+        if steps is None:
+            steps = self.compute(goal)
+            self.cache[goal] = steps
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(goal)
+        self.steps = steps
+        self.step_array = np.frombuffer(steps, dtype=np.uint8) if has_numpy else None
+
+    def compute(self, goals):
+        """Dijkstra from the goal cells; each reached cell points at its parent towards the
+        nearest goal. Blocked cells next to open ones get a direction too, so enemies pressed
+        against a wall still know which way to go, but paths never run through them."""
+        grid = self.grid
+        blocked, neighbours = grid.blocked, grid.neighbours
+        dist = [math.inf] * len(blocked)
+        steps = bytearray([NO_STEP]) * len(blocked)
+        for goal in goals:
+            dist[goal] = 0.0
+        heap = [(0.0, goal) for goal in goals]
+        self.computed += 1
+
+        while heap:
+            d, cell = heapq.heappop(heap)
+            if d > dist[cell] or (blocked[cell] and cell not in goals):
+                continue
+            for neighbour, cost, step in neighbours[cell]:
+                nd = d + cost
+                if nd < dist[neighbour]:
+                    dist[neighbour] = nd
+                    steps[neighbour] = step
+                    heapq.heappush(heap, (nd, neighbour))
+        for goal in goals:
+            steps[goal] = NO_STEP
+        return steps
+
+    def direction(self, x, y):
+        """Unit step towards the goal from (x, y), or None in the goal cell or out of reach"""
+        step = self.steps[self.grid.cell_of(x, y)]
+        if step == NO_STEP:
+            return None
+        return STEP_X[step], STEP_Y[step]
+
+
+class LineOfSight:
+    """Visibility between points on a NavGrid, cached per (cell, cell) pair.
+
+    Rays run between cell centers, so every point in a cell shares one answer.
+    Call clear() once per tick; the cache then bounds the cost of many enemies
+    asking about the same player cell to one walk per enemy cell."""
+    def __init__(self, grid):
+        self.grid = grid
+        self.cache = {}
+        self.queries = 0
+        self.walks = 0
+
+    def clear(self):
+        self.cache.clear()
+
+    def visible(self, x1, y1, x2, y2):
+        a = self.grid.cell_of(x1, y1)
+        b = self.grid.cell_of(x2, y2)
+        key = (a, b) if a <= b else (b, a)
+        self.queries += 1
+        result = self.cache.get(key)
+        if result is None:
+            result = self.cache[key] = self.walk(*key)
+        return result
+
+    def visible_many(self, xs, ys, x, y):
+        """visible() from many points (NumPy arrays) to one, walking each distinct cell once"""
+        grid = self.grid
+        cols = np.clip((xs // grid.cell_size).astype(np.int64), 0, grid.cols - 1)
+        rows = np.clip((ys // grid.cell_size).astype(np.int64), 0, grid.rows - 1)
+        cells, inverse = np.unique(rows * grid.cols + cols, return_inverse=True)
+        target = grid.cell_of(x, y)
+        self.queries += len(xs)
+        cache = self.cache
+        seen = []
+        for a in cells.tolist():
+            key = (a, target) if a <= target else (target, a)
+            result = cache.get(key)
+            if result is None:
+                result = cache[key] = self.walk(*key)
+            seen.append(result)
+        return np.array(seen, dtype=bool)[inverse]
+
+    def walk(self, start, end):
+        # Integer DDA from the center of start to the center of end. The end
+        # cells themselves never block, so entities hugging a wall can still see.
+        self.walks += 1
+        cols, solid = self.grid.cols, self.grid.solid
+        row, col = divmod(start, cols)
+        end_row, end_col = divmod(end, cols)
+        step_x = 1 if end_col > col else -1
+        step_y = 1 if end_row > row else -1
+        nx, ny = abs(end_col - col), abs(end_row - row)
+        ix = iy = 0
+        while ix < nx or iy < ny:
+            # Which cell border the ray crosses next: compare (ix + 0.5) / nx with (iy + 0.5) / ny
+            side = (1 + 2 * ix) * ny - (1 + 2 * iy) * nx
+            if side == 0:
+                # Exactly through a corner: only blocked if both side cells are solid
+                if solid[row * cols + col + step_x] and solid[(row + step_y) * cols + col]:
+                    return False
+                col += step_x
+                row += step_y
+                ix += 1
+                iy += 1
+            elif side < 0:
+                col += step_x
+                ix += 1
+            else:
+                row += step_y
+                iy += 1
+            cell = row * cols + col
+            if cell != end and solid[cell]:
+                return False
+        return True
+
+
+def benchmark(enemies=(10, 100, 1000, 10000), ticks=300, seed=1):
+    """Time flow field upkeep against a moving goal, and the per-enemy lookups"""
+    from Shooter import generate_random_map, SCREEN_WIDTH, SCREEN_HEIGHT, ENEMY_SIZE
+
+    rng = random.Random(seed)
+    obstacles = generate_random_map(rng=rng)
+    start = time.perf_counter()
+    grid = NavGrid(obstacles, SCREEN_WIDTH, SCREEN_HEIGHT, clearance=ENEMY_SIZE[0] // 2)
+    print(f"grid {grid.cols}x{grid.rows}, {sum(grid.blocked)} blocked cells, "
+          f"built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    for n in enemies:
+        field = FlowField(grid)
+        points = [(rng.uniform(0, SCREEN_WIDTH), rng.uniform(0, SCREEN_HEIGHT)) for _ in range(n)]
+        goal_time = lookup_time = 0.0
+        for tick in range(ticks):
+            # The goal walks around the map at player speed
+            start = time.perf_counter()
+            field.set_goal(600 + 300 * math.cos(tick / 60), 450 + 250 * math.sin(tick / 60))
+            goal_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            for x, y in points:
+                field.direction(x, y)
+            lookup_time += time.perf_counter() - start
+        print(f"{n:>6} enemies: {field.computed} fields computed, "
+              f"{goal_time * 1000 / ticks:.3f} ms/tick upkeep, "
+              f"{lookup_time * 1e6 / (ticks * n):.3f} us per lookup")
+
+    # Line of sight with every enemy asking every tick, as when all are in range
+    sight = LineOfSight(grid)
+    for n in enemies:
+        points = [(rng.uniform(0, SCREEN_WIDTH), rng.uniform(0, SCREEN_HEIGHT)) for _ in range(n)]
+        sight.queries = sight.walks = 0
+        start = time.perf_counter()
+        for tick in range(ticks):
+            sight.clear()
+            px, py = 600 + 300 * math.cos(tick / 60), 450 + 250 * math.sin(tick / 60)
+            for x, y in points:
+                sight.visible(x, y, px, py)
+        elapsed = time.perf_counter() - start
+        print(f"{n:>6} enemies: {sight.walks / ticks:.0f} of {sight.queries / ticks:.0f} "
+              f"line of sight queries walked per tick, {elapsed * 1000 / ticks:.3f} ms/tick")
+
+
+if __name__ == "__main__":
+    benchmark()
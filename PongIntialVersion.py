@@ -14,9 +14,6 @@ import pygame
 import random
 import sys
 
-# Initialize pygame
-pygame.init()
-
 # Screen dimensions
 SCREEN_WIDTH = 600
 SCREEN_HEIGHT = 400
@@ -29,9 +26,9 @@ PADDLE_SPEED = 7
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 
-# Set up screen
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Single Player Pong")
+# Screen and font, set up by startup()
+screen = None
+font = None
 
 # Ball setup
 ball_x = SCREEN_WIDTH // 2
@@ -48,12 +45,23 @@ clock = pygame.time.Clock()
 
 # Score
 score = 0
-font = pygame.font.Font(None, 36)
+
+def startup():
+    """Initialize pygame and open the window; importing the module does neither, later calls do nothing"""
+    global screen, font
+    if screen is not None:
+        return screen
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Single Player Pong")
+    font = pygame.font.Font(None, 36)
+    return screen
 
 # Main game loop
 def main():
     global ball_x, ball_y, ball_dx, ball_dy, paddle_x, score
 
+    startup()
     running = True
     while running:
         # Handle events
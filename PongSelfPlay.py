@@ -14,9 +14,6 @@ import pygame
 import random
 import sys
 
-# Initialize pygame
-pygame.init()
-
 # Screen dimensions
 SCREEN_WIDTH = 600
 SCREEN_HEIGHT = 400
@@ -30,9 +27,9 @@ COMPUTER_SPEED = 5  # Speed of paddle movement in computer mode
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 
-# Set up screen
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Single Player Pong with Computer Mode")
+# Screen and font, set up by startup()
+screen = None
+font = None
 
 # Ball setup
 ball_x = SCREEN_WIDTH // 2
@@ -49,15 +46,26 @@ clock = pygame.time.Clock()
 
 # Score
 score = 0
-font = pygame.font.Font(None, 36)
 
 # Control mode
 computer_control = False
 
+def startup():
+    """Initialize pygame and open the window; importing the module does neither, later calls do nothing"""
+    global screen, font
+    if screen is not None:
+        return screen
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Single Player Pong with Computer Mode")
+    font = pygame.font.Font(None, 36)
+    return screen
+
 # Main game loop
 def main():
     global ball_x, ball_y, ball_dx, ball_dy, paddle_x, score, computer_control
 
+    startup()
     running = True
     while running:
         # Handle events
@@ -0,0 +1,118 @@
+"""
+Object pools for the Shooter game.
+- Pool keeps the live objects of one kind in a list and the dead ones on a
+  free list, so spawning reinitializes an old object instead of allocating
+- Pooled classes provide reset(...) and an `active` flag
+- Run as a script for a tracemalloc check of steady-state allocations; it
+  fails when live block counts grow past ALLOCATION_TOLERANCE after warmup
+"""
+
+import math
+import sys
+import tracemalloc
+
+# Live blocks the steady game may gain between samples: grid buckets, integer
+# attributes and bounded caches come and go. A per-tick allocation that is kept
+# adds one block per tick, thousands over a check
+ALLOCATION_TOLERANCE = 100
+
+
+class Pool:
+    """Live objects plus a free list; iterate it like the list it replaces"""
+    def __init__(self, factory, capacity=0, **defaults):
+        self.factory = factory
+        self.defaults = defaults  # Extra reset() arguments every object gets
+        self.live = []
+        self.free = [factory() for _ in range(capacity)]
+        for obj in self.free:
+            obj.active = False
+
+    def __iter__(self):
+        return iter(self.live)
+
+    def __len__(self):
+        return len(self.live)
+
+    def spawn(self, *args, **kwargs):
+        obj = self.free.pop() if self.free else self.factory()
+        obj.reset(*args, **self.defaults, **kwargs)
+        self.live.append(obj)
+        return obj
+
+    def sweep(self):
+        """Move inactive objects to the free list, compacting the live list in place"""
+        live, free = self.live, self.free
+        keep = 0
+        for obj in live:
+            if obj.active:
+                live[keep] = obj
+                keep += 1
+            else:
+                free.append(obj)
+        del live[keep:]
+
+    def restore(self, objects):
+        # Replace the live objects, e.g. after loading a snapshot
+        for obj in self.live:
+            obj.active = False
+        self.free.extend(self.live)
+        self.live[:] = objects
+
+    def clear(self):
+        self.restore([])
+
+
+def allocation_check(ticks=3000, warmup=1500, samples=10, seed=1, tolerance=ALLOCATION_TOLERANCE):
+    """Run a steady headless game, report traced memory blocks and per-tick peaks and
+    raise AssertionError unless the block counts stay within tolerance of each other"""
+    from Shooter import Game
+    from Controllers import ScriptedController
+
+    game = Game(controller=ScriptedController.patrol(), headless=True, seed=seed)
+    # Keep one game going; restarts build a new map and would count as allocation,
+    # level-ups add enemies for good. The machine gun keeps plenty of bullets spawning and dying.
+    game.player.health = game.player.max_health = 10**9
+    game.player.weapon = "machine_gun"
+    game.next_level_score = math.inf
+    for _ in range(warmup):
+        game.update()
+
+    tracemalloc.start()
+    interval = ticks // samples
+    # Objects from before tracing started are only counted once they are replaced,
+    # so one more interval runs before the first sample
+    for _ in range(interval):
+        game.update()
+    rows = []
+    # Leave out this check's own bookkeeping
+    ignore = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+    baseline = tracemalloc.take_snapshot().filter_traces(ignore)
+    for sample in range(samples):
+        peak = 0
+        for _ in range(interval):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            game.update()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+        blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+        rows.append((game.sim_clock.tick, blocks, peak, len(game.bullets), len(game.enemies)))
+    growth = tracemalloc.take_snapshot().filter_traces(ignore).compare_to(baseline, "lineno")
+    tracemalloc.stop()
+
+    print(f"{'tick':>6} {'blocks':>8} {'tick peak B':>12} {'bullets':>8} {'enemies':>8}")
+    for row in rows:
+        print(f"{row[0]:>6} {row[1]:>8} {row[2]:>12} {row[3]:>8} {row[4]:>8}")
+    print("largest block count changes since warmup:")
+    for stat in sorted(growth, key=lambda s: -abs(s.count_diff))[:5]:
+        print(f"  {stat.count_diff:+6d} blocks  {stat.traceback}")
+
+    blocks = [row[1] for row in rows]
+    spread = max(blocks) - min(blocks)
+    print(f"block counts vary by {spread} (tolerance {tolerance})")
+    assert spread <= tolerance, f"tick loop keeps allocating: block counts vary by {spread} > {tolerance}"
+    return rows
+
+
+if __name__ == "__main__":
+    allocation_check(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,540 @@
+"""
+NumPy projectile engine for the Shooter game.
+- Struct-of-arrays storage for every live bullet of one side (player or enemies)
+- Movement, bounds and obstacle tests run as a few vectorized passes per tick
+- Drawing drops from trails to sprites to dots to pixels as its measured cost grows
+"""
+
+import math
+import time
+
+import pygame
+
+from SpriteCache import sprite_cache
+from FrameTimer import DetailLevels
+
+# NumPy is optional; Shooter falls back to Bullet objects without it
+try:
+    import numpy as np
+    has_numpy = True
+except ImportError:
+    np = None
+    has_numpy = False
+
+TRAIL_LENGTH = 5      # Same as Bullet.max_trail_length
+ANGLE_STEP = 5        # Degrees between pre-rotated sprites
+GRID_CELL = 64        # Cell size of the per-tick bullet grid used for hit queries
+DIRECT_QUERIES = 8    # colliding() calls per tick that scan the arrays before the grid gets sorted
+OBSTACLE_CELL = 32    # Cell size of the "near an obstacle" prefilter
+DRAW_BUDGET_MS = 3.0  # Drawing time one side's bullets may take before they lose detail
+
+# Detail levels of ProjectileSystem.draw, most detailed first
+TRAILS, SPRITES, DOTS, PIXELS = range(4)
+
+
+def draw_squares(surface, xs, ys, colors, size=3):
+    """Fill a size x size square centered on every point straight into the pixels,
+    in colors (one mapped color, or one per point). Points are clamped inside the surface"""
+    w, h = surface.get_size()
+    half = size // 2
+    xs = np.clip(np.asarray(xs).astype(np.int64), half, w - size + half)
+    ys = np.clip(np.asarray(ys).astype(np.int64), half, h - size + half)
+    pixels = pygame.surfarray.pixels2d(surface)
+    colors = np.asarray(colors, dtype=pixels.dtype)
+    rows = pixels.T
+    if rows.flags.c_contiguous:
+        # Rows without padding: one flat index per point, then an offset per square pixel
+        flat = rows.reshape(-1)
+        index = ys * w + xs
+        for oy in range(-half, size - half):
+            for ox in range(-half, size - half):
+                flat[index + (oy * w + ox)] = colors
+        del flat
+    else:
+        for oy in range(-half, size - half):
+            for ox in range(-half, size - half):
+                pixels[xs + ox, ys + oy] = colors
+    del rows, pixels
+
+
+class ProjectileSystem:
+    """All live bullets of one side, stored as parallel NumPy arrays"""
+    def __init__(self, bounds, obstacles=(), image=None, capacity=256,
+                 trail_limit=300, sprite_limit=3000, dot_limit=30000, draw_budget_ms=DRAW_BUDGET_MS):
+        if not has_numpy:
+            raise RuntimeError("ProjectileSystem requires numpy")
+        self.width, self.height = bounds
+        self.image = image
+        # Trails, then sprites, then 3x3 dots, then single pixels; the limits are
+        # only the starting point, they follow what drawing actually costs
+        self.detail = DetailLevels(draw_budget_ms, (trail_limit, sprite_limit, dot_limit))
+        self.count = 0
+        self.trail_head = 0
+        self._allocate(capacity)
+
+        # Sprite sizes in use and their pre-rotated images
+        self._size_ids = {}
+        self._sizes = []
+        self._sprites = []
+        self._half_w = np.zeros(0, dtype=np.int32)
+        self._half_h = np.zeros(0, dtype=np.int32)
+
+        # Weapons that fired the bullets, by id; id 0 is no weapon (enemy bullets)
+        self._weapon_ids = {None: 0}
+        self._weapons = [None]
+
+        # Bullets [:_grid_count] are the ones hit queries see until the next update
+        self._grid_count = 0
+        self._grid_order = None
+        self._grid_keys = None
+        self._queries = 0
+        self.spent = np.zeros(0, dtype=np.int64)    # Left alive by update(cull=False)
+        self.max_radius = 0
+        self.set_obstacles(obstacles)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.angle = np.zeros(capacity)
+        self.damage = np.zeros(capacity)
+        self.radius = np.zeros(capacity)
+        self.size_id = np.zeros(capacity, dtype=np.int32)
+        self.weapon_id = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.age = np.zeros(capacity, dtype=np.int32)
+        self.trail = np.zeros((capacity, TRAIL_LENGTH, 2))
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        old = {name: getattr(self, name) for name in
+               ("x", "y", "vx", "vy", "angle", "damage", "radius", "size_id", "weapon_id", "alive", "age",
+                "trail")}
+        self._allocate(capacity)
+        for name, array in old.items():
+            getattr(self, name)[:self.count] = array[:self.count]
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive[:self.count]))
+
+    def set_obstacles(self, obstacles, margin=40):
+        rects = [obs.rect for obs in obstacles]
+        # Same geometry as Obstacle.collides: integer center, float half extents
+        self.obs_cx = np.array([r.centerx for r in rects], dtype=float)
+        self.obs_cy = np.array([r.centery for r in rects], dtype=float)
+        self.obs_hw = np.array([r.width / 2 for r in rects], dtype=float)
+        self.obs_hh = np.array([r.height / 2 for r in rects], dtype=float)
+
+        # Coarse mask of the cells where a bullet of up to margin radius could
+        # touch an obstacle; bullets elsewhere skip the exact test entirely
+        self.obstacle_margin = margin
+        cols = int(self.width // OBSTACLE_CELL) + 1
+        rows = int(self.height // OBSTACLE_CELL) + 1
+        self.near_obstacle = np.zeros((cols, rows), dtype=bool)
+        for r in rects:
+            x0 = max(0, int((r.left - margin - 1) // OBSTACLE_CELL))
+            x1 = min(cols - 1, int((r.right + margin + 1) // OBSTACLE_CELL))
+            y0 = max(0, int((r.top - margin - 1) // OBSTACLE_CELL))
+            y1 = min(rows - 1, int((r.bottom + margin + 1) // OBSTACLE_CELL))
+            self.near_obstacle[x0:x1 + 1, y0:y1 + 1] = True
+        self._obstacles = list(obstacles)
+
+    def _size_index(self, size):
+        size_id = self._size_ids.get(size)
+        if size_id is None:
+            size_id = len(self._sizes)
+            self._size_ids[size] = size_id
+            self._sizes.append(size)
+            self._build_sprites(size)
+        return size_id
+
+    def _weapon_index(self, weapon):
+        weapon_id = self._weapon_ids.get(weapon)
+        if weapon_id is None:
+            weapon_id = self._weapon_ids[weapon] = len(self._weapons)
+            self._weapons.append(weapon)
+        return weapon_id
+
+    def _build_sprites(self, size):
+        half_w, half_h = [], []
+        steps = 360 // ANGLE_STEP
+        if self.image:
+            for step in range(steps):
+                rotated = sprite_cache.get(self.image, size, angle=step * ANGLE_STEP)
+                self._sprites.append(rotated)
+                half_w.append(rotated.get_width() // 2)
+                half_h.append(rotated.get_height() // 2)
+        else:
+            self._sprites.extend([None] * steps)
+            half_w.extend([0] * steps)
+            half_h.extend([0] * steps)
+        self._half_w = np.concatenate([self._half_w, np.array(half_w, dtype=np.int32)])
+        self._half_h = np.concatenate([self._half_h, np.array(half_h, dtype=np.int32)])
+
+    def spawn(self, x, y, angle, damage=1, speed=12, size=(60, 60), weapon=None):
+        if self.count >= self.capacity:
+            self._grow(self.count + 1)
+        radius = size[0] // 2
+        if radius > self.obstacle_margin:
+            self.set_obstacles(self._obstacles, margin=radius)
+        i = self.count
+        rad = math.radians(angle)
+        self.x[i] = x
+        self.y[i] = y
+        # Direction is fixed for the bullet's life, so cos/sin run once here
+        self.vx[i] = speed * math.cos(rad)
+        self.vy[i] = speed * math.sin(rad)
+        self.angle[i] = angle
+        self.damage[i] = damage
+        self.radius[i] = radius
+        self.size_id[i] = self._size_index(size)
+        self.weapon_id[i] = self._weapon_index(weapon)
+        self.alive[i] = True
+        self.age[i] = 0
+        # Rows get reused; the previous bullet's trail would otherwise end up in snapshots
+        self.trail[i] = 0.0
+        self.count += 1
+        self.max_radius = max(self.max_radius, radius)
+
+    def spawn_many(self, xs, ys, angles, damage=1, speed=12, size=(60, 60), weapon=None):
+        xs = np.asarray(xs, dtype=float)
+        n = len(xs)
+        if n == 0:
+            return
+        if self.count + n > self.capacity:
+            self._grow(self.count + n)
+        radius = size[0] // 2
+        if radius > self.obstacle_margin:
+            self.set_obstacles(self._obstacles, margin=radius)
+        s = slice(self.count, self.count + n)
+        angles = np.asarray(angles, dtype=float)
+        rad = np.radians(angles)
+        self.x[s] = xs
+        self.y[s] = ys
+        self.vx[s] = speed * np.cos(rad)
+        self.vy[s] = speed * np.sin(rad)
+        self.angle[s] = angles
+        self.damage[s] = damage
+        self.radius[s] = radius
+        self.size_id[s] = self._size_index(size)
+        self.weapon_id[s] = self._weapon_index(weapon)
+        self.alive[s] = True
+        self.age[s] = 0
+        self.trail[s] = 0.0
+        self.count += n
+        self.max_radius = max(self.max_radius, radius)
+
+    def clear(self):
+        self.count = 0
+        self.max_radius = 0
+        self._reset_grid()
+
+    def compact(self):
+        # Move the live bullets to the front so every pass works on [:count]
+        n = self.count
+        alive = self.alive[:n]
+        keep = int(np.count_nonzero(alive))
+        if keep == n:
+            return
+        for array in (self.x, self.y, self.vx, self.vy, self.angle, self.damage,
+                      self.radius, self.size_id, self.weapon_id, self.age, self.trail):
+            array[:keep] = array[:n][alive]
+        self.alive[:keep] = True
+        self.alive[keep:n] = False
+        self.count = keep
+        if keep == 0:
+            self.max_radius = 0
+        self._reset_grid()
+
+    STATE_ARRAYS = ("x", "y", "vx", "vy", "angle", "damage", "radius", "size_id", "weapon_id", "age", "trail")
+
+    def get_state(self):
+        """Copy of the live bullets as plain data (for replay keyframes)"""
+        # Bullets killed since the last update are still in [:count], leave them out
+        live = self.alive[:self.count]
+        state = {name: getattr(self, name)[:self.count][live] for name in self.STATE_ARRAYS}
+        state.update(sizes=list(self._sizes), weapons=list(self._weapons), trail_head=self.trail_head,
+                     max_radius=self.max_radius, obstacle_margin=self.obstacle_margin)
+        return state
+
+    def check_state(self, state, weapons=None):
+        """get_state() data with every array checked for type and shape, and the weapon
+        names against weapons if given; raises ValueError"""
+        fields = set(self.STATE_ARRAYS) | {"sizes", "weapons", "trail_head", "max_radius", "obstacle_margin"}
+        if not isinstance(state, dict) or state.keys() != fields:
+            raise ValueError(f"projectile state should have the fields {', '.join(sorted(fields))}")
+        sizes = state["sizes"]
+        if not isinstance(sizes, (list, tuple)) or not all(
+                isinstance(size, (list, tuple)) and len(size) == 2 and
+                all(isinstance(v, int) and not isinstance(v, bool) and v > 0 for v in size) for size in sizes):
+            raise ValueError("projectile sizes should be pairs of positive integers")
+        names = state["weapons"]
+        if not isinstance(names, (list, tuple)) or not all(
+                name is None or isinstance(name, str) and (weapons is None or name in weapons) for name in names):
+            raise ValueError("projectile weapons should be known weapon names or None")
+        for name in ("trail_head", "max_radius", "obstacle_margin"):
+            value = state[name]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value < 1e6:
+                raise ValueError(f"projectile {name} should be a small number, not {value!r}")
+        if not isinstance(state["trail_head"], int) or state["trail_head"] >= TRAIL_LENGTH:
+            raise ValueError(f"projectile trail_head should be below {TRAIL_LENGTH}")
+
+        checked = dict(state, sizes=[tuple(size) for size in sizes])
+        n = None
+        for name in self.STATE_ARRAYS:
+            template = getattr(self, name)
+            try:
+                array = np.asarray(state[name])
+            except ValueError:
+                raise ValueError(f"projectile {name} is not a regular array") from None
+            if n is None:
+                n = array.shape[0] if array.ndim else -1
+            shape = (n,) + template.shape[1:]
+            if array.size == 0 and n == 0:
+                array = array.reshape(shape)
+            if array.shape != shape or array.dtype.kind not in "iuf":
+                raise ValueError(f"projectile {name} should be numbers of shape {shape}")
+            if not np.isfinite(array).all():
+                raise ValueError(f"projectile {name} holds values that are not finite")
+            checked[name] = array.astype(template.dtype)
+        if n and not ((checked["size_id"] >= 0) & (checked["size_id"] < len(sizes))).all():
+            raise ValueError("projectile size_id refers to a size that is not in sizes")
+        if n and not ((checked["weapon_id"] >= 0) & (checked["weapon_id"] < len(names))).all():
+            raise ValueError("projectile weapon_id refers to a weapon that is not in weapons")
+        return checked
+
+    def set_state(self, state, weapons=None):
+        state = self.check_state(state, weapons)
+        for size in state["sizes"]:
+            self._size_index(tuple(size))
+        if state["obstacle_margin"] > self.obstacle_margin:
+            self.set_obstacles(self._obstacles, margin=state["obstacle_margin"])
+        n = len(state["x"])
+        if n > self.capacity:
+            self._grow(n)
+        # Saved size ids refer to the saved size list, remap them to ours
+        remap = np.array([self._size_ids[tuple(size)] for size in state["sizes"]] or [0], dtype=np.int32)
+        for name in self.STATE_ARRAYS:
+            getattr(self, name)[:n] = state[name]
+        self.size_id[:n] = remap[state["size_id"]]
+        remap = np.array([self._weapon_index(weapon) for weapon in state["weapons"]] or [0], dtype=np.int32)
+        self.weapon_id[:n] = remap[state["weapon_id"]]
+        self.alive[:n] = True
+        self.alive[n:] = False
+        self.count = n
+        self.trail_head = state["trail_head"]
+        self.max_radius = state["max_radius"]
+        self._reset_grid()
+
+    def _hits_obstacles(self, x, y, radius):
+        hit = np.zeros(len(x), dtype=bool)
+        if len(self.obs_cx) == 0 or len(x) == 0:
+            return hit
+        cols, rows = self.near_obstacle.shape
+        cx = np.clip((x // OBSTACLE_CELL).astype(np.int64), 0, cols - 1)
+        cy = np.clip((y // OBSTACLE_CELL).astype(np.int64), 0, rows - 1)
+        candidates = np.nonzero(self.near_obstacle[cx, cy])[0]
+        if len(candidates) == 0:
+            return hit
+
+        # Circle-rectangle test against every obstacle, in chunks to bound memory
+        chunk = max(1, 1_000_000 // len(self.obs_cx))
+        for start in range(0, len(candidates), chunk):
+            idx = candidates[start:start + chunk]
+            px = x[idx, None]
+            py = y[idx, None]
+            r = radius[idx, None]
+            dx = np.abs(px - self.obs_cx)
+            dy = np.abs(py - self.obs_cy)
+            inside = (dx <= self.obs_hw + r) & (dy <= self.obs_hh + r)
+            corner = (dx - self.obs_hw) ** 2 + (dy - self.obs_hh) ** 2 <= r ** 2
+            touching = inside & ((dx <= self.obs_hw) | (dy <= self.obs_hh) | corner)
+            hit[idx] = touching.any(axis=1)
+        return hit
+
+    def update(self, cull=True):
+        """Move every bullet one tick. Bullets that hit an obstacle or leave the map die,
+        unless cull is False: then they stay alive for this tick's hit queries, as Bullet
+        objects do until the sweep, and retire_spent() removes them afterwards"""
+        self.compact()
+        n = self.count
+        if n == 0:
+            self._reset_grid()
+            return
+        x, y = self.x[:n], self.y[:n]
+
+        # Save position for trail (all bullets tick together, so one ring head)
+        self.trail[:n, self.trail_head, 0] = x
+        self.trail[:n, self.trail_head, 1] = y
+        self.trail_head = (self.trail_head + 1) % TRAIL_LENGTH
+        np.minimum(self.age[:n] + 1, TRAIL_LENGTH, out=self.age[:n])
+
+        new_x = x + self.vx[:n]
+        new_y = y + self.vy[:n]
+        blocked = self._hits_obstacles(new_x, new_y, self.radius[:n])
+        moving = ~blocked
+        x[moving] = new_x[moving]
+        y[moving] = new_y[moving]
+        out = (x < 0) | (x > self.width) | (y < 0) | (y > self.height)
+        spent = blocked | out
+        if cull:
+            self.alive[:n] &= ~spent
+            self.compact()
+        else:
+            self.spent = np.nonzero(spent)[0]
+        self._reset_grid()
+
+    def retire_spent(self):
+        """Kill the bullets update(cull=False) left alive"""
+        self.alive[self.spent] = False
+        self.spent = self.spent[:0]
+        self.compact()
+
+    def _reset_grid(self):
+        # The grid is sorted on first need: a few queries a tick (the players against
+        # 100k enemy bullets) cost less as scans of the arrays than one argsort
+        self._grid_count = self.count
+        self._grid_order = None
+        self._queries = 0
+
+    def _build_grid(self):
+        n = self._grid_count
+        gx = (self.x[:n] // GRID_CELL).astype(np.int64)
+        gy = (self.y[:n] // GRID_CELL).astype(np.int64)
+        keys = gx * 100003 + gy
+        self._grid_order = np.argsort(keys, kind="stable")
+        self._grid_keys = keys[self._grid_order]
+
+    def colliding(self, x, y, radius):
+        """Return indices of live bullets whose circle overlaps the circle at (x, y)"""
+        n = self._grid_count
+        if n == 0:
+            return []
+        if self._grid_order is None:
+            self._queries += 1
+            if self._queries <= DIRECT_QUERIES:
+                reach = radius + self.max_radius
+                idx = np.nonzero((np.abs(self.x[:n] - x) < reach) & (np.abs(self.y[:n] - y) < reach) &
+                                 self.alive[:n])[0]
+                dist = np.hypot(self.x[idx] - x, self.y[idx] - y)
+                return idx[dist < self.radius[idx] + radius].tolist()
+            self._build_grid()
+        reach = radius + self.max_radius
+        gx0, gx1 = int((x - reach) // GRID_CELL), int((x + reach) // GRID_CELL)
+        gy0, gy1 = int((y - reach) // GRID_CELL), int((y + reach) // GRID_CELL)
+        wanted = np.array([gx * 100003 + gy for gx in range(gx0, gx1 + 1)
+                           for gy in range(gy0, gy1 + 1)], dtype=np.int64)
+        lo = np.searchsorted(self._grid_keys, wanted, side="left")
+        hi = np.searchsorted(self._grid_keys, wanted, side="right")
+        ranges = [self._grid_order[a:b] for a, b in zip(lo.tolist(), hi.tolist()) if b > a]
+        if not ranges:
+            return []
+        idx = np.concatenate(ranges)
+        idx = idx[self.alive[idx]]
+        dist = np.hypot(self.x[idx] - x, self.y[idx] - y)
+        return np.sort(idx[dist < self.radius[idx] + radius]).tolist()
+
+    def colliding_many(self, xs, ys, radius):
+        """colliding() for many circles in one pass. Returns (circle, bullet) index
+        arrays of every overlapping pair, ordered by circle and then by bullet"""
+        none = np.zeros(0, dtype=np.int64)
+        n = len(xs)
+        if self._grid_count == 0 or n == 0:
+            return none, none
+        if self._grid_order is None:
+            self._build_grid()
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        radius = np.broadcast_to(np.asarray(radius, dtype=float), (n,))
+
+        # The block of grid cells each circle can reach, padded to a common span
+        reach = radius + self.max_radius
+        gx0 = ((xs - reach) // GRID_CELL).astype(np.int64)
+        gx1 = ((xs + reach) // GRID_CELL).astype(np.int64)
+        gy0 = ((ys - reach) // GRID_CELL).astype(np.int64)
+        gy1 = ((ys + reach) // GRID_CELL).astype(np.int64)
+        span = np.arange(int(max((gx1 - gx0).max(), (gy1 - gy0).max())) + 1)
+        cx = gx0[:, None, None] + span[None, :, None]
+        cy = gy0[:, None, None] + span[None, None, :]
+        valid = (cx <= gx1[:, None, None]) & (cy <= gy1[:, None, None])
+        circle = np.broadcast_to(np.arange(n)[:, None, None], valid.shape)[valid]
+        wanted = (cx * 100003 + cy)[valid]
+
+        # Expand every cell's run of bullets in the sorted grid into (circle, bullet) pairs
+        lo = np.searchsorted(self._grid_keys, wanted, side="left")
+        counts = np.searchsorted(self._grid_keys, wanted, side="right") - lo
+        total = int(counts.sum())
+        if total == 0:
+            return none, none
+        circle = np.repeat(circle, counts)
+        run_start = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        bullet = self._grid_order[run_start + np.arange(total)]
+
+        keep = self.alive[bullet]
+        circle, bullet = circle[keep], bullet[keep]
+        dist = np.hypot(self.x[bullet] - xs[circle], self.y[bullet] - ys[circle])
+        hit = dist < self.radius[bullet] + radius[circle]
+        circle, bullet = circle[hit], bullet[hit]
+        order = np.lexsort((bullet, circle))
+        return circle[order], bullet[order]
+
+    def weapon_of(self, index):
+        return self._weapons[self.weapon_id[index]]
+
+    def kill(self, index):
+        self.alive[index] = False
+
+    def draw(self, surface):
+        """Draw every live bullet and return the bounding Rect of what was drawn"""
+        n = self.count
+        live = np.nonzero(self.alive[:n])[0]
+        if len(live) == 0:
+            return pygame.Rect(0, 0, 0, 0)
+
+        # Bounds of everything drawn below; trails reach back TRAIL_LENGTH steps
+        speed = float(np.abs(self.vx[live]).max() + np.abs(self.vy[live]).max())
+        reach = int(self.max_radius * 1.5 + speed * TRAIL_LENGTH) + 2
+        xs, ys = self.x[live], self.y[live]
+        left, top = int(xs.min()) - reach, int(ys.min()) - reach
+        right, bottom = int(xs.max()) + reach, int(ys.max()) + reach
+        dirty = pygame.Rect(left, top, right - left, bottom - top).clip(surface.get_rect())
+
+        count = len(live)
+        level = self.detail.choose(count)
+        started = time.perf_counter()
+        if level >= DOTS:
+            # Level of detail for huge counts: dots written straight into the pixels
+            draw_squares(surface, xs, ys, surface.map_rgb((255, 255, 0)), 3 if level == DOTS else 1)
+            self.detail.measured(level, count, time.perf_counter() - started)
+            return dirty
+
+        # Draw trail, oldest point first like Bullet.draw
+        if level == TRAILS:
+            for i in live.tolist():
+                length = int(self.age[i])
+                radius = self.radius[i]
+                for k in range(length):
+                    slot = (self.trail_head - length + k) % TRAIL_LENGTH
+                    px, py = self.trail[i, slot]
+                    size = int(radius * 0.7 * (k / length))
+                    pygame.draw.circle(surface, (255, 255, 0, int(255 * (k / length))),
+                                       (int(px), int(py)), size)
+
+        if self.image:
+            steps = 360 // ANGLE_STEP
+            step = np.round(self.angle[live] / ANGLE_STEP).astype(np.int64) % steps
+            keys = self.size_id[live] * steps + step
+            left = self.x[live].astype(np.int64) - self._half_w[keys]
+            top = self.y[live].astype(np.int64) - self._half_h[keys]
+            sprites = self._sprites
+            surface.blits([(sprites[k], (lx, ty)) for k, lx, ty in
+                           zip(keys.tolist(), left.tolist(), top.tolist())], doreturn=False)
+        else:
+            for i in live.tolist():
+                pygame.draw.circle(surface, (255, 255, 0), (int(self.x[i]), int(self.y[i])), int(self.radius[i]))
+        self.detail.measured(level, count, time.perf_counter() - started)
+        return dirty
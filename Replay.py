@@ -0,0 +1,295 @@
+"""
+Replay recording and playback for the Shooter game.
+- ReplayRecorder stores one input bitmask per tick, run-length encoded,
+  plus a compressed keyframe of the whole game state every few seconds
+- ReplayPlayer rebuilds the game from the seed and inputs, and seeks by
+  loading the nearest keyframe and simulating forward from there
+- Run as a script to record a headless session, play one back or verify it;
+  `check` records and verifies a fixed set of seeds with both bullet engines
+"""
+
+import bisect
+import json
+import os
+import struct
+import sys
+import zlib
+
+from Controllers import Controller, keys_to_mask, mask_to_keys
+
+MAGIC = b"SHRP"
+VERSION = 7
+KEYFRAME_INTERVAL = 600  # ticks, 10 seconds at 60 ticks/s
+
+# magic, version, seed, flags, keyframe interval, ticks, input runs, keyframes
+HEADER = struct.Struct("<4sHIBHIII")
+RUN = struct.Struct("<HH")             # input mask, ticks it was held
+KEYFRAME = struct.Struct("<IBII")      # tick, flags, blob offset, blob length
+MAX_RUN = 0xFFFF
+
+FLAG_PROJECTILES = 1
+FLAG_BATCH_ENEMIES = 2
+KEYFRAME_RESTART = 1  # Keyframe taken right after a restart, playback loads it
+
+# (seed, ticks) runs `check` verifies; seed 9 restarts and reuses pooled bullets across keyframes
+CHECK_RUNS = ((9, 2500), (4, 3000))
+
+
+def pack_state(state):
+    # Plain JSON, never pickle: replays get shared, and loading one must not run code
+    return zlib.compress(json.dumps(plain(state), separators=(",", ":")).encode())
+
+
+def unpack_state(blob):
+    """Keyframe as plain data; Game.load_state checks every field before using it"""
+    try:
+        return json.loads(zlib.decompress(blob))
+    except (zlib.error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"corrupt replay keyframe: {e}") from None
+
+
+def plain(value):
+    """State with NumPy arrays turned into lists, so it compares and prints by value"""
+    if isinstance(value, dict):
+        return {k: plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain(v) for v in value]
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return value
+
+
+class ReplayRecorder:
+    """Attach to a Game to record every tick it simulates"""
+    def __init__(self, game, path=None, interval=KEYFRAME_INTERVAL):
+        self.path = path
+        self.seed = game.seed
+        self.flags = ((FLAG_PROJECTILES if game.use_projectiles else 0) |
+                      (FLAG_BATCH_ENEMIES if game.batch_enemies else 0))
+        self.interval = interval
+        self.tick = 0
+        self.runs = []          # [mask, length] pairs
+        self.keyframes = []     # (tick, flags, blob)
+        self.restarted = False
+        game.recorder = self
+
+    def record(self, game, keys):
+        # Called by Game.update before the tick is simulated
+        if self.restarted:
+            self.keyframes.append((self.tick, KEYFRAME_RESTART, pack_state(game.save_state())))
+            self.restarted = False
+        elif self.tick % self.interval == 0:
+            self.keyframes.append((self.tick, 0, pack_state(game.save_state())))
+
+        mask = keys_to_mask(keys)
+        if self.runs and self.runs[-1][0] == mask and self.runs[-1][1] < MAX_RUN:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([mask, 1])
+        self.tick += 1
+
+    def restart(self):
+        # Called by Game.restart; restarts are not always caused by input
+        # (run_headless restarts on its own), so the new game is keyframed
+        self.restarted = True
+
+    def to_bytes(self):
+        header = HEADER.pack(MAGIC, VERSION, self.seed, self.flags, self.interval,
+                             self.tick, len(self.runs), len(self.keyframes))
+        runs = b"".join(RUN.pack(mask, length) for mask, length in self.runs)
+        index, blobs, offset = [], [], 0
+        for tick, flags, blob in self.keyframes:
+            index.append(KEYFRAME.pack(tick, flags, offset, len(blob)))
+            blobs.append(blob)
+            offset += len(blob)
+        return header + runs + b"".join(index) + b"".join(blobs)
+
+    def save(self, path=None):
+        path = path or self.path
+        data = self.to_bytes()
+        with open(path, "wb") as f:
+            f.write(data)
+        print(f"Replay saved to {path}: {self.tick} ticks, {len(self.keyframes)} keyframes, "
+              f"{len(data) / 1024:.1f} KiB")
+
+
+class ReplayPlayer(Controller):
+    """Plays a replay file back through a Game, which it drives as its controller"""
+    def __init__(self, path, headless=False):
+        with open(path, "rb") as f:
+            data = f.read()
+        (magic, version, self.seed, self.flags, self.interval,
+         self.length, run_count, keyframe_count) = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} Shooter replay")
+
+        offset = HEADER.size
+        masks = []
+        for mask, length in RUN.iter_unpack(data[offset:offset + run_count * RUN.size]):
+            masks.extend([mask] * length)
+        self.inputs = masks
+        offset += run_count * RUN.size
+
+        blob_start = offset + keyframe_count * KEYFRAME.size
+        self.keyframes = []  # (tick, flags, blob)
+        for tick, flags, blob_offset, length in KEYFRAME.iter_unpack(data[offset:blob_start]):
+            start = blob_start + blob_offset
+            self.keyframes.append((tick, flags, data[start:start + length]))
+        self.keyframe_ticks = [kf[0] for kf in self.keyframes]
+        self.restarts = {tick: blob for tick, flags, blob in self.keyframes if flags & KEYFRAME_RESTART}
+
+        from Shooter import Game
+        # Watching a replay is not playing it; its results stay off the leaderboard
+        self.game = Game(use_projectiles=bool(self.flags & FLAG_PROJECTILES),
+                         controller=self, headless=headless, seed=self.seed,
+                         batch_enemies=bool(self.flags & FLAG_BATCH_ENEMIES), submit_results=False)
+        self.tick = 0
+        if self.keyframes:
+            self.game.load_state(unpack_state(self.keyframes[0][2]))
+
+    def get_keys(self, game):
+        mask = self.inputs[self.tick] if self.tick < self.length else 0
+        self.tick += 1
+        return mask_to_keys(mask)
+
+    def step(self):
+        if self.tick >= self.length:
+            return False
+        self.game.update()
+        # A restart between this tick and the next is replayed from its keyframe
+        blob = self.restarts.get(self.tick)
+        if blob is not None:
+            self.game.load_state(unpack_state(blob))
+        return True
+
+    def seek(self, tick):
+        """Jump to the state right before the given tick is simulated"""
+        tick = max(0, min(tick, self.length))
+        i = bisect.bisect_right(self.keyframe_ticks, tick) - 1
+        if i >= 0 and not (self.keyframe_ticks[i] <= self.tick <= tick):
+            # Loading a keyframe is only worth it if we cannot just step forward
+            self.tick, flags, blob = self.keyframes[i]
+            self.game.load_state(unpack_state(blob))
+        while self.tick < tick:
+            self.step()
+
+    def state_digest(self, state=None):
+        state = self.game.save_state() if state is None else state
+        return zlib.crc32(repr(plain(state)).encode())
+
+
+def record(path, ticks, seed=None, use_projectiles=False, batch_enemies=False):
+    from Shooter import Game
+    from Controllers import ScriptedController
+    game = Game(use_projectiles=use_projectiles, controller=ScriptedController.patrol(),
+                headless=True, seed=seed, batch_enemies=batch_enemies)
+    recorder = ReplayRecorder(game, path)
+    # The same session as `Shooter.py --headless --record`, restarting at once after game over
+    game.run_headless(ticks, report_every=0)
+    recorder.save()
+
+
+def verify(path, samples=20, around_keyframes=(-1, 1, 60)):
+    """Check that keyframes match a straight run and that seeking lands on the same state.
+    Besides evenly spaced samples it seeks to the ticks around_keyframes offsets from every
+    keyframe, where a seek loads the keyframe and plays on with reused pooled bullets"""
+    player = ReplayPlayer(path, headless=True)
+    step = max(1, player.length // samples)
+    keyframes = {tick: blob for tick, flags, blob in player.keyframes}
+    checks = set(range(step // 2, player.length, step))
+    checks.update(tick + offset for tick in keyframes for offset in around_keyframes)
+    checks = sorted(tick for tick in checks if 0 < tick < player.length)
+
+    expected = {}
+    mismatches = 0
+    while True:
+        blob = keyframes.get(player.tick)
+        if blob is not None:
+            if player.state_digest() != player.state_digest(unpack_state(blob)):
+                print(f"tick {player.tick}: simulation differs from keyframe")
+                mismatches += 1
+        if player.tick in checks:
+            expected[player.tick] = player.state_digest()
+        if not player.step():
+            break
+
+    for tick in reversed(checks):
+        player.seek(tick)
+        if player.state_digest() != expected[tick]:
+            print(f"tick {tick}: seek differs from straight playback")
+            mismatches += 1
+
+    print(f"{player.length} ticks, {len(player.keyframes)} keyframes, "
+          f"{len(checks)} seeks checked, {mismatches} mismatch(es)")
+    return mismatches == 0
+
+
+def check(runs=CHECK_RUNS):
+    """Record and verify every run of runs with Bullet objects and with the projectile engine"""
+    import tempfile
+    ok = True
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "check.shrp")
+        for seed, ticks in runs:
+            for use_projectiles in (False, True):
+                record(path, ticks, seed, use_projectiles)
+                print(f"seed {seed}{' --projectiles' if use_projectiles else ''}: ", end="")
+                ok = verify(path) and ok
+    return ok
+
+
+def play(path):
+    import pygame
+    player = ReplayPlayer(path)
+    game = player.game
+    paused = False
+    seek_step = 5 * player.interval // 10  # 5 seconds at the default interval
+
+    while game.running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                game.running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    game.running = False
+                elif event.key == pygame.K_p:
+                    paused = not paused
+                elif event.key == pygame.K_LEFT:
+                    player.seek(player.tick - seek_step)
+                elif event.key == pygame.K_RIGHT:
+                    player.seek(player.tick + seek_step)
+                elif event.key == pygame.K_HOME:
+                    player.seek(0)
+
+        if not paused and not player.step():
+            paused = True
+        state = "paused" if paused else "playing"
+        pygame.display.set_caption(f"Replay {os.path.basename(path)} - tick {player.tick}/{player.length} ({state})")
+        game.draw()
+        game.clock.tick(60)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Record, play back or verify Shooter replays")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="record a headless session with the patrol bot")
+    rec.add_argument("path")
+    rec.add_argument("--ticks", type=int, default=10000)
+    rec.add_argument("--seed", type=int, default=None)
+    rec.add_argument("--projectiles", action="store_true")
+    rec.add_argument("--batch-enemies", action="store_true")
+    sub.add_parser("play", help="watch a replay (P pause, LEFT/RIGHT seek, HOME rewind)").add_argument("path")
+    sub.add_parser("verify", help="check that playback and seeking are deterministic").add_argument("path")
+    sub.add_parser("check", help="record and verify the CHECK_RUNS seeds")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.path, args.ticks, args.seed, args.projectiles, args.batch_enemies)
+    elif args.command == "play":
+        play(args.path)
+    elif args.command == "check":
+        sys.exit(0 if check() else 1)
+    else:
+        sys.exit(0 if verify(args.path) else 1)
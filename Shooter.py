@@ -13,19 +13,29 @@ Created on Thu Oct 24 11:41:14 2024
 
 
 import pygame
+import heapq
 import math
 import random
 import sys
 import os
 import time
 
-# Initialize pygame
-pygame.init()
+from SpatialIndex import SpatialHash, ObstacleIndex, obstacle_index
+from Projectiles import ProjectileSystem, draw_squares, has_numpy
+from EnemyBatch import EnemyBatch
+from NavGrid import NavGrid, FlowField, LineOfSight
+from Pools import Pool
+from MapLibrary import MapLibrary, random_map_rects
+from SpriteCache import sprite_cache
+from TextCache import text_cache, HudText
+from Controllers import KeyboardController, ScriptedController
+from FrameTimer import FrameTimer, DetailLevels
+from Leaderboard import leaderboard
+from AssetPack import assets
+from Audio import audio
 
 # Screen dimensions (larger map)
 SCREEN_WIDTH, SCREEN_HEIGHT = 1200, 900
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Advanced FPS Shooter")
 
 # Colors
 WHITE = (255, 255, 255)
@@ -37,65 +47,94 @@ BLUE = (0, 0, 255)
 PURPLE = (128, 0, 128)
 ORANGE = (255, 165, 0)
 
-# Load sprites
-SPRITES_DIR = os.path.join(os.path.dirname(__file__), 'sprites')
-def load_image(filename, size=None):
-    try:
-        path = os.path.join(SPRITES_DIR, filename)
-        image = pygame.image.load(path).convert_alpha()
-        if size:
-            image = pygame.transform.scale(image, size)
-        return image
-    except Exception as e:
-        print(f"Error loading image {filename}: {e}")
-        return None
-
 # Sizes for our game objects
 PLAYER_SIZE = (40, 40)
 ENEMY_SIZE = (50, 50)
 BULLET_SIZE = (60, 60)  # Store skud for bedre synlighed
 POWERUP_SIZE = (30, 30)
 
-# Load all sprite images
-player_img = load_image('Spiller.png', PLAYER_SIZE)
-enemy_img = load_image('fjende.png', ENEMY_SIZE)
-bullet_img = load_image('skud.png', BULLET_SIZE)
-wall_img = load_image('vaeg.jpg')
-
-# Font
-font = pygame.font.Font(None, 36)
-large_font = pygame.font.Font(None, 72)
-small_font = pygame.font.Font(None, 24)
+# Sprites, loaded on first use from the sprite pack (AssetPack.py build) or the sprites folder
+sprites = assets.sprites(player=('Spiller.png', PLAYER_SIZE), enemy=('fjende.png', ENEMY_SIZE),
+                         bullet=('skud.png', BULLET_SIZE), wall=('vaeg.jpg', None))
+
+# Window and fonts; importing the module leaves them unset until startup()
+screen = None
+font = large_font = small_font = None
+
+def startup(headless=False):
+    """Initialize pygame, open the window and load fonts and sounds; later calls do nothing"""
+    global screen, font, large_font, small_font
+    if screen is not None:
+        return screen
+    if headless:
+        # Headless runs need no window; the SDL dummy driver must be chosen before init
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Advanced FPS Shooter")
+
+    font = pygame.font.Font(None, 36)
+    large_font = pygame.font.Font(None, 72)
+    small_font = pygame.font.Font(None, 24)
+
+    # Sound effects (optional, silent if not found); headless runs stay silent
+    if not headless and audio.init():
+        audio.load("shoot", 'shoot.wav', voices=4)
+        audio.load("hit", 'hit.wav', voices=4)
+        audio.load("gameover", 'gameover.wav', voices=1)
+        audio.load("powerup", 'powerup.wav', voices=1)
+    return screen
+
+# Simulation runs in fixed ticks; every gameplay timer is counted in ticks
+TICK_RATE = 60
+TICK_MS = 1000 / TICK_RATE
+MAX_CATCHUP_TICKS = 5  # Most ticks run per rendered frame when the game falls behind
+
+def ms_to_ticks(ms):
+    return int(round(ms / TICK_MS))
+
+class SimClock:
+    """Fixed-timestep simulation clock, independent of wall-clock time"""
+    def __init__(self):
+        self.tick = 0
 
-# Sound effects (optional, fallback if not found)
-def load_sound(path):
-    try:
-        return pygame.mixer.Sound(path)
-    except:
-        return None
+    def advance(self):
+        self.tick += 1
+        return self.tick
 
-shoot_sound = load_sound('shoot.wav')
-hit_sound = load_sound('hit.wav')
-gameover_sound = load_sound('gameover.wav')
-powerup_sound = load_sound('powerup.wav')
+    @property
+    def seconds(self):
+        return self.tick / TICK_RATE
 
-# Våbentyper
+# Våbentyper (cooldown in ticks)
 WEAPON_TYPES = {
-    "pistol": {"damage": 1, "cooldown": 300, "bullet_speed": 12, "bullet_size": BULLET_SIZE},
-    "shotgun": {"damage": 1, "cooldown": 800, "bullet_speed": 10, "bullet_size": (50, 50), "spread": 3},
-    "machine_gun": {"damage": 0.5, "cooldown": 100, "bullet_speed": 15, "bullet_size": (40, 40)},
-    "sniper": {"damage": 3, "cooldown": 1200, "bullet_speed": 20, "bullet_size": (70, 70)}
+    "pistol": {"damage": 1, "cooldown": ms_to_ticks(300), "bullet_speed": 12, "bullet_size": BULLET_SIZE},
+    "shotgun": {"damage": 1, "cooldown": ms_to_ticks(800), "bullet_speed": 10, "bullet_size": (50, 50), "spread": 3},
+    "machine_gun": {"damage": 0.5, "cooldown": ms_to_ticks(100), "bullet_speed": 15, "bullet_size": (40, 40)},
+    "sniper": {"damage": 3, "cooldown": ms_to_ticks(1200), "bullet_speed": 20, "bullet_size": (70, 70)}
 }
 
+# Difficulty added per level (enemy speed, aggression and fire rate scale with it)
+DIFFICULTY_STEP = 0.2
+
+# Angle offsets of the shots fired at once
+SHOTGUN_SPREAD = (-15, 0, 15)  # 15-degree spread
+NO_SPREAD = (0,)
+
 # Powerup typer
 POWERUP_TYPES = ["health", "speed", "shield", "weapon", "score_multiplier"]
 
+# Minimap redraws per second, independent of the game frame rate (0 = every frame)
+MINIMAP_REFRESH_RATE = 15
+MINIMAP_CIRCLE_LIMIT = 300  # Enemies drawn as circles at first; then dots, see DetailLevels
+
 class Obstacle:
     def __init__(self, x, y, w, h):
         self.rect = pygame.Rect(x, y, w, h)
         # Create a scaled copy of the wall image for this specific obstacle
-        if wall_img:
-            self.image = pygame.transform.scale(wall_img, (w, h))
+        if sprites.wall:
+            self.image = pygame.transform.scale(sprites.wall, (w, h))
         else:
             self.image = None
 
@@ -117,20 +156,25 @@ class Obstacle:
         return corner_dist_sq <= radius**2
 
 class Powerup:
+    colors = {
+        "health": RED,
+        "speed": YELLOW,
+        "shield": BLUE,
+        "weapon": ORANGE,
+        "score_multiplier": PURPLE
+    }
+
     def __init__(self, x, y, type_name):
+        self.radius = POWERUP_SIZE[0] // 2
+        self.reset(x, y, type_name)
+
+    def reset(self, x, y, type_name):
+        # Pooled powerups are reinitialized here instead of reallocated
         self.x = x
         self.y = y
         self.type = type_name
-        self.radius = POWERUP_SIZE[0] // 2
         self.active = True
         self.pulse = 0
-        self.colors = {
-            "health": RED,
-            "speed": YELLOW,
-            "shield": BLUE,
-            "weapon": ORANGE,
-            "score_multiplier": PURPLE
-        }
 
     def update(self):
         self.pulse = (self.pulse + 0.05) % (2 * math.pi)
@@ -138,16 +182,17 @@ class Powerup:
     def draw(self, surface):
         color = self.colors.get(self.type, WHITE)
         size_mod = math.sin(self.pulse) * 3
-        pygame.draw.circle(surface, color, (int(self.x), int(self.y)), int(self.radius + size_mod))
+        dirty = pygame.draw.circle(surface, color, (int(self.x), int(self.y)), int(self.radius + size_mod))
 
         # Draw icon based on type
-        text = small_font.render(self.type[0].upper(), True, WHITE)
+        text = text_cache.render(small_font, self.type[0].upper(), WHITE)
         text_rect = text.get_rect(center=(int(self.x), int(self.y)))
-        surface.blit(text, text_rect)
+        return dirty.union(surface.blit(text, text_rect))
 
 class Player:
-    def __init__(self, obstacles=None):
-        self.obstacles = obstacles or []
+    def __init__(self, obstacles=None, rng=None):
+        self.obstacles = obstacle_index(obstacles)
+        self.rng = rng or random
 
         # Forsøg at finde en sikker spawn position for spilleren
         self.radius = PLAYER_SIZE[0] // 2
@@ -160,18 +205,16 @@ class Player:
         while not safe_spawn and attempts < 20:
             safe_spawn = True
             # Check om positionen kolliderer med nogen forhindringer
-            for obs in self.obstacles:
-                if obs.collides(self.x, self.y, self.radius):
-                    safe_spawn = False
-                    # Prøv en ny position
-                    offset = 100 * (attempts + 1)
-                    self.x = SCREEN_WIDTH // 2 + random.randint(-offset, offset)
-                    self.y = SCREEN_HEIGHT // 2 + random.randint(-offset, offset)
-                    # Hold positionen inden for skærmen
-                    self.x = max(self.radius, min(SCREEN_WIDTH - self.radius, self.x))
-                    self.y = max(self.radius, min(SCREEN_HEIGHT - self.radius, self.y))
-                    attempts += 1
-                    break
+            if self.obstacles.collides(self.x, self.y, self.radius):
+                safe_spawn = False
+                # Prøv en ny position
+                offset = 100 * (attempts + 1)
+                self.x = SCREEN_WIDTH // 2 + self.rng.randint(-offset, offset)
+                self.y = SCREEN_HEIGHT // 2 + self.rng.randint(-offset, offset)
+                # Hold positionen inden for skærmen
+                self.x = max(self.radius, min(SCREEN_WIDTH - self.radius, self.x))
+                self.y = max(self.radius, min(SCREEN_HEIGHT - self.radius, self.y))
+                attempts += 1
 
         self.angle = 0
         self.speed = 5
@@ -180,7 +223,7 @@ class Player:
         self.health = 1000
         self.max_health = 1000
         self.last_shot = 0
-        self.image = player_img
+        self.image = sprites.player
 
         # Nye variabler
         self.shield = 0
@@ -191,12 +234,11 @@ class Player:
         self.score_multiplier_time = 0
         self.speed_boost_time = 0
 
-    def move(self, keys):
+    def move(self, keys, game_time):
         old_x, old_y = self.x, self.y
 
         # Check for speed boost timeout
-        current_time = pygame.time.get_ticks()
-        if current_time > self.speed_boost_time and self.speed > self.base_speed:
+        if game_time > self.speed_boost_time and self.speed > self.base_speed:
             self.speed = self.base_speed
 
         if keys[pygame.K_LEFT]:
@@ -218,21 +260,17 @@ class Player:
         self.x += move_x
         self.x = max(self.radius, min(SCREEN_WIDTH - self.radius, self.x))
         x_collision = False
-        for obs in self.obstacles:
-            if obs.collides(self.x, old_y, self.radius):
-                x_collision = True
-                self.x = old_x  # Gå tilbage til original X position
-                break
+        if self.obstacles.collides(self.x, old_y, self.radius):
+            x_collision = True
+            self.x = old_x  # Gå tilbage til original X position
 
         # Anvend bevægelse i Y-retningen and tjek for kollision
         self.y += move_y
         self.y = max(self.radius, min(SCREEN_HEIGHT - self.radius, self.y))
         y_collision = False
-        for obs in self.obstacles:
-            if obs.collides(self.x, self.y, self.radius):
-                y_collision = True
-                self.y = old_y  # Gå tilbage til original Y position
-                break
+        if self.obstacles.collides(self.x, self.y, self.radius):
+            y_collision = True
+            self.y = old_y  # Gå tilbage til original Y position
 
         # Hvis både X og Y har kollision, så er vi måske fanget i et hjørne - gå helt tilbage
         if x_collision and y_collision:
@@ -252,92 +290,83 @@ class Player:
         self.x = max(self.radius, min(SCREEN_WIDTH - self.radius, self.x))
         self.y = max(self.radius, min(SCREEN_HEIGHT - self.radius, self.y))
         # Prevent moving through obstacles
-        for obs in self.obstacles:
-            if obs.collides(self.x, self.y, self.radius):
-                self.x, self.y = old_x, old_y
-                break
+        if self.obstacles.collides(self.x, self.y, self.radius):
+            self.x, self.y = old_x, old_y
 
-    def draw(self, surface):
+    def draw(self, surface, game_time=0):
         if self.image:
-            # Rotate the player image
-            rotated = pygame.transform.rotate(self.image, -self.angle)
+            # Rotate the player image (pre-rotated copies come from the cache)
+            rotated = sprite_cache.get(self.image, angle=self.angle)
             # Get the rectangle of the rotated image
             rect = rotated.get_rect()
             # Position the rectangle centered on the player's position
             rect.center = (int(self.x), int(self.y))
             # Draw the rotated image
-            surface.blit(rotated, rect.topleft)
+            dirty = surface.blit(rotated, rect.topleft)
         else:
             # Fallback to circle if image loading failed
-            pygame.draw.circle(surface, GREEN, (int(self.x), int(self.y)), self.radius)
+            dirty = pygame.draw.circle(surface, GREEN, (int(self.x), int(self.y)), self.radius)
             end_x = self.x + self.radius * math.cos(math.radians(self.angle))
             end_y = self.y + self.radius * math.sin(math.radians(self.angle))
             pygame.draw.line(surface, WHITE, (self.x, self.y), (end_x, end_y), 4)
 
         # Draw shield if active
         if self.shield > 0:
-            pygame.draw.circle(surface, BLUE, (int(self.x), int(self.y)),
-                              int(self.radius + 5), 2)
+            dirty.union_ip(pygame.draw.circle(surface, BLUE, (int(self.x), int(self.y)),
+                                              int(self.radius + 5), 2))
 
         # Draw current weapon icon
-        weapon_text = small_font.render(self.weapon, True, WHITE)
-        surface.blit(weapon_text, (self.x - 20, self.y - self.radius - 20))
+        weapon_text = text_cache.render(small_font, self.weapon, WHITE)
+        dirty.union_ip(surface.blit(weapon_text, (self.x - 20, self.y - self.radius - 20)))
 
         # Draw multiplier if active
-        if pygame.time.get_ticks() < self.score_multiplier_time:
-            mult_text = small_font.render(f"{self.score_multiplier}x", True, PURPLE)
-            surface.blit(mult_text, (self.x + 20, self.y - self.radius - 20))
+        if game_time < self.score_multiplier_time:
+            mult_text = text_cache.render(small_font, f"{self.score_multiplier}x", PURPLE)
+            dirty.union_ip(surface.blit(mult_text, (self.x + 20, self.y - self.radius - 20)))
 
-    def can_shoot(self):
+        # Area touched this frame, for dirty-rect presentation
+        return dirty
+
+    def can_shoot(self, game_time):
         weapon_cooldown = WEAPON_TYPES[self.weapon]["cooldown"]
-        return pygame.time.get_ticks() - self.last_shot > weapon_cooldown
+        return game_time - self.last_shot > weapon_cooldown
 
-    def shoot(self):
-        self.last_shot = pygame.time.get_ticks()
-        if shoot_sound:
-            shoot_sound.play()
+    def shoot(self, game_time, projectiles):
+        # Shots are spawned into a bullet Pool or a ProjectileSystem
+        self.last_shot = game_time
+        audio.play("shoot")
 
         weapon_data = WEAPON_TYPES[self.weapon]
+        spread = SHOTGUN_SPREAD if self.weapon == "shotgun" else NO_SPREAD
 
-        if self.weapon == "shotgun":
-            bullets = []
-            for i in range(-1, 2):  # -1, 0, 1
-                spread_angle = self.angle + (i * 15)  # 15-degree spread
-                bullets.append(Bullet(
-                    self.x, self.y, spread_angle, self.obstacles,
-                    damage=weapon_data["damage"],
-                    speed=weapon_data["bullet_speed"],
-                    size=weapon_data["bullet_size"]
-                ))
-            return bullets
-        else:
-            return [Bullet(
-                self.x, self.y, self.angle, self.obstacles,
+        for offset in spread:
+            projectiles.spawn(
+                self.x, self.y, self.angle + offset,
                 damage=weapon_data["damage"],
                 speed=weapon_data["bullet_speed"],
-                size=weapon_data["bullet_size"]
-            )]
+                size=weapon_data["bullet_size"],
+                weapon=self.weapon
+            )
 
-    def collect_powerup(self, powerup):
+    def collect_powerup(self, powerup, game_time):
         if powerup.type == "health":
             self.health = min(self.max_health, self.health + 25)
         elif powerup.type == "speed":
             self.speed = self.base_speed * 1.5
-            self.speed_boost_time = pygame.time.get_ticks() + 10000  # 10 seconds
+            self.speed_boost_time = game_time + ms_to_ticks(10000)  # 10 seconds
         elif powerup.type == "shield":
             self.shield = min(self.max_shield, self.shield + 30)
         elif powerup.type == "weapon":
             available_weapons = [w for w in WEAPON_TYPES.keys() if w not in self.weapons_owned]
             if available_weapons:
-                new_weapon = random.choice(available_weapons)
+                new_weapon = self.rng.choice(available_weapons)
                 self.weapons_owned.append(new_weapon)
                 self.weapon = new_weapon
         elif powerup.type == "score_multiplier":
             self.score_multiplier = 2
-            self.score_multiplier_time = pygame.time.get_ticks() + 15000  # 15 seconds
+            self.score_multiplier_time = game_time + ms_to_ticks(15000)  # 15 seconds
 
-        if powerup_sound:
-            powerup_sound.play()
+        audio.play("powerup")
 
     def take_damage(self, amount):
         # First reduce shield, then health
@@ -355,39 +384,38 @@ class Player:
         return self.health <= 0
 
 class Enemy:
-    def __init__(self, obstacles=None, difficulty=1.0):
-        self.obstacles = obstacles or []
+    def __init__(self, obstacles=None, difficulty=1.0, rng=None):
+        self.obstacles = obstacle_index(obstacles)
+        self.rng = rng or random
         self.radius = ENEMY_SIZE[0] // 2
 
         # Forsøg at finde en sikker spawn position for fjenden
         safe_spawn = False
         attempts = 0
-        self.x = random.randint(50, SCREEN_WIDTH-50)
-        self.y = random.randint(50, SCREEN_HEIGHT-50)
+        self.x = self.rng.randint(50, SCREEN_WIDTH-50)
+        self.y = self.rng.randint(50, SCREEN_HEIGHT-50)
 
         # Prøv at finde en sikker position
         while not safe_spawn and attempts < 20:
             safe_spawn = True
             # Check om positionen kolliderer med nogen forhindringer
-            for obs in self.obstacles:
-                if obs.collides(self.x, self.y, self.radius):
-                    safe_spawn = False
-                    # Prøv en ny position
-                    self.x = random.randint(50, SCREEN_WIDTH-50)
-                    self.y = random.randint(50, SCREEN_HEIGHT-50)
-                    attempts += 1
-                    break
+            if self.obstacles.collides(self.x, self.y, self.radius):
+                safe_spawn = False
+                # Prøv en ny position
+                self.x = self.rng.randint(50, SCREEN_WIDTH-50)
+                self.y = self.rng.randint(50, SCREEN_HEIGHT-50)
+                attempts += 1
 
         self.health = 3
-        self.speed = random.uniform(1.5, 2.5) * difficulty
-        self.angle = random.uniform(0, 360)
-        self.image = enemy_img
-        self.aggression = random.uniform(0.5, 1.0) * difficulty
+        self.speed = self.rng.uniform(1.5, 2.5) * difficulty
+        self.angle = self.rng.uniform(0, 360)
+        self.image = sprites.enemy
+        self.aggression = self.rng.uniform(0.5, 1.0) * difficulty
         self.last_shot = 0
-        self.shot_cooldown = random.randint(1500, 3000) // difficulty
+        self.shot_cooldown = self.rng.randint(ms_to_ticks(1500), ms_to_ticks(3000)) // difficulty
 
         # Random behavior traits
-        self.behavior_type = random.choice(["chaser", "flanker", "ambusher"])
+        self.behavior_type = self.rng.choice(["chaser", "flanker", "ambusher"])
 
         # Visual differentiation based on behavior
         self.color_tint = {
@@ -396,7 +424,7 @@ class Enemy:
             "ambusher": (100, 100, 255)  # Bluish
         }.get(self.behavior_type, (255, 255, 255))
 
-    def update(self, player, game_time):
+    def update(self, player, game_time, flow=None, sight=None):
         # Move towards player, avoid obstacles
         dx = player.x - self.x
         dy = player.y - self.y
@@ -417,8 +445,8 @@ class Enemy:
             target_x = player.x + circle_dist * math.cos(perp_angle)
             target_y = player.y + circle_dist * math.sin(perp_angle)
         elif self.behavior_type == "ambusher":
-            # Hide behind obstacles and approach slowly
-            if dist < 300:
+            # Lie in wait behind obstacles; once the player can see it, close in
+            if dist < 300 and not (sight and sight.visible(self.x, self.y, player.x, player.y)):
                 target_x, target_y = self.x, self.y  # Stay in place
             else:
                 target_x, target_y = player.x, player.y
@@ -428,169 +456,279 @@ class Enemy:
         ty = target_y - self.y
         target_dist = math.hypot(tx, ty)
 
-        if target_dist > 0:
-            new_x = self.x + self.speed * tx / target_dist
-            new_y = self.y + self.speed * ty / target_dist
-            blocked = False
-            for obs in self.obstacles:
-                if obs.collides(new_x, new_y, self.radius):
-                    blocked = True
-                    break
-            if not blocked:
-                self.x, self.y = new_x, new_y
+        # Chasers follow the shared flow field around obstacles; flankers
+        # only fall back to it when their own step is blocked
+        field_step = None
+        if flow and self.behavior_type in ("chaser", "flanker"):
+            field_step = flow.direction(self.x, self.y)
+
+        if field_step and self.behavior_type == "chaser":
+            self.step(self.speed * field_step[0], self.speed * field_step[1])
+        elif target_dist > 0:
+            moved = self.step(self.speed * tx / target_dist, self.speed * ty / target_dist)
+            if not moved and field_step:
+                self.step(self.speed * field_step[0], self.speed * field_step[1])
 
-        # Maybe shoot at player
+        # Maybe shoot at player, but not through walls
         can_shoot = game_time - self.last_shot > self.shot_cooldown
-        if can_shoot and dist < 400 and random.random() < self.aggression:
+        if (can_shoot and dist < 400
+                and (sight is None or sight.visible(self.x, self.y, player.x, player.y))
+                and self.rng.random() < self.aggression):
             self.last_shot = game_time
             return True
 
         return False
 
+    def step(self, dx, dy):
+        new_x, new_y = self.x + dx, self.y + dy
+        if self.obstacles.collides(new_x, new_y, self.radius):
+            return False
+        self.x, self.y = new_x, new_y
+        return True
+
     def draw(self, surface):
         if self.image:
-            # Apply color tint to differentiate enemy types
-            tinted_img = self.image.copy()
-            tinted_img.fill(self.color_tint, special_flags=pygame.BLEND_RGBA_MULT)
-
-            # Rotate the enemy image to face player
-            rotated = pygame.transform.rotate(tinted_img, -self.angle)
+            # Color tint differentiates enemy types; rotate to face player
+            rotated = sprite_cache.get(self.image, tint=self.color_tint, angle=self.angle)
             rect = rotated.get_rect()
             rect.center = (int(self.x), int(self.y))
-            surface.blit(rotated, rect.topleft)
+            dirty = surface.blit(rotated, rect.topleft)
         else:
             # Fallback to circle if image loading failed
-            pygame.draw.circle(surface, RED, (int(self.x), int(self.y)), self.radius)
+            dirty = pygame.draw.circle(surface, RED, (int(self.x), int(self.y)), self.radius)
 
         # Health bar
         health_bar_len = int(30 * self.health / 3)
-        pygame.draw.rect(surface, GREEN, (self.x-15, self.y-self.radius-10, health_bar_len, 5))
+        dirty.union_ip(pygame.draw.rect(surface, GREEN, (self.x-15, self.y-self.radius-10, health_bar_len, 5)))
 
         # Behavior type indicator
-        type_text = small_font.render(self.behavior_type[0], True, WHITE)
-        surface.blit(type_text, (self.x-5, self.y-5))
+        type_text = text_cache.render(small_font, self.behavior_type[0], WHITE)
+        return dirty.union(surface.blit(type_text, (self.x-5, self.y-5)))
 
     def hit(self, damage=1):
         self.health -= damage
-        if hit_sound:
-            hit_sound.play()
+        audio.play("hit")
         return self.health <= 0
 
 class Bullet:
-    def __init__(self, x, y, angle, obstacles=None, damage=1, speed=12, size=BULLET_SIZE):
+    def __init__(self, x, y, angle, obstacles=None, damage=1, speed=12, size=BULLET_SIZE, weapon=None):
+        # Trail effect: fixed ring buffers, oldest point at trail_head - trail_length
+        self.max_trail_length = 5
+        self.trail_x = [0.0] * self.max_trail_length
+        self.trail_y = [0.0] * self.max_trail_length
+        self.reset(x, y, angle, obstacles, damage, speed, size, weapon)
+
+    def reset(self, x, y, angle, obstacles=None, damage=1, speed=12, size=BULLET_SIZE, weapon=None):
+        # Pooled bullets are reinitialized here instead of reallocated
         self.x = x
         self.y = y
         self.angle = angle
         self.speed = speed
         self.damage = damage
         self.radius = size[0] // 2
+        self.size = size
+        self.weapon = weapon  # Player weapon that fired it (credited with kills), None for enemies
         self.active = True
-        self.obstacles = obstacles or []
-        self.image = bullet_img
-        if size != BULLET_SIZE and bullet_img:
-            self.image = pygame.transform.scale(bullet_img, size)
-
-        # Trail effect
-        self.trail = []
-        self.max_trail_length = 5
+        self.obstacles = obstacle_index(obstacles)
+        self.image = sprites.bullet
+        if size != BULLET_SIZE and sprites.bullet:
+            self.image = sprite_cache.get(sprites.bullet, size)
+        # Cleared in place: a reused bullet must not carry its last life's trail into snapshots
+        self.trail_x[:] = self.trail_y[:] = [0.0] * self.max_trail_length
+        self.trail_head = 0
+        self.trail_length = 0
 
     def update(self):
         # Save position for trail
-        self.trail.append((self.x, self.y))
-        if len(self.trail) > self.max_trail_length:
-            self.trail.pop(0)
+        self.trail_x[self.trail_head] = self.x
+        self.trail_y[self.trail_head] = self.y
+        self.trail_head = (self.trail_head + 1) % self.max_trail_length
+        if self.trail_length < self.max_trail_length:
+            self.trail_length += 1
 
         new_x = self.x + self.speed * math.cos(math.radians(self.angle))
         new_y = self.y + self.speed * math.sin(math.radians(self.angle))
-        for obs in self.obstacles:
-            if obs.collides(new_x, new_y, self.radius):
-                self.active = False
-                return
+        if self.obstacles.collides(new_x, new_y, self.radius):
+            self.active = False
+            return
         self.x, self.y = new_x, new_y
         if self.x < 0 or self.x > SCREEN_WIDTH or self.y < 0 or self.y > SCREEN_HEIGHT:
             self.active = False
 
     def draw(self, surface):
         # Draw trail
-        for i, pos in enumerate(self.trail):
-            alpha = int(255 * (i / len(self.trail)))
-            size = int(self.radius * 0.7 * (i / len(self.trail)))
-            pygame.draw.circle(surface, (255, 255, 0, alpha),
-                              (int(pos[0]), int(pos[1])), size)
+        dirty = pygame.Rect(int(self.x), int(self.y), 0, 0)
+        n = self.trail_length
+        for i in range(n):
+            j = (self.trail_head - n + i) % self.max_trail_length
+            alpha = int(255 * (i / n))
+            size = int(self.radius * 0.7 * (i / n))
+            dirty.union_ip(pygame.draw.circle(surface, (255, 255, 0, alpha),
+                                              (int(self.trail_x[j]), int(self.trail_y[j])), size))
 
         if self.image:
             # Rotate the bullet image
-            rotated = pygame.transform.rotate(self.image, -self.angle)
+            rotated = sprite_cache.get(self.image, angle=self.angle)
             rect = rotated.get_rect()
             rect.center = (int(self.x), int(self.y))
-            surface.blit(rotated, rect.topleft)
+            dirty.union_ip(surface.blit(rotated, rect.topleft))
         else:
             # Fallback to circle if image loading failed
-            pygame.draw.circle(surface, YELLOW, (int(self.x), int(self.y)), self.radius)
-
-def generate_random_map(min_obstacles=5, max_obstacles=10, min_size=50, max_size=250):
-    """Genererer en tilfældig bane med forhindringer"""
-    obstacles = []
-    num_obstacles = random.randint(min_obstacles, max_obstacles)
-
-    # Grid-based placement to avoid complete overlap
-    grid_size = 200
-    grid_cols = SCREEN_WIDTH // grid_size
-    grid_rows = SCREEN_HEIGHT // grid_size
-
-    # Create a grid to track used cells
-    used_cells = set()
-
-    # Ensure center area is clear for player spawn
-    center_x = SCREEN_WIDTH // 2
-    center_y = SCREEN_HEIGHT // 2
-    center_cell_x = center_x // grid_size
-    center_cell_y = center_y // grid_size
-    used_cells.add((center_cell_x, center_cell_y))
-
-    for _ in range(num_obstacles):
-        attempts = 0
-        while attempts < 10:  # Prøv 10 gange at placere en forhindring
-            cell_x = random.randint(0, grid_cols-1)
-            cell_y = random.randint(0, grid_rows-1)
-
-            # Skip if cell is already used
-            if (cell_x, cell_y) in used_cells:
-                attempts += 1
-                continue
-
-            # Randomize obstacle properties
-            w = random.randint(min_size, max_size)
-            h = random.randint(min_size, max_size)
-            x = cell_x * grid_size + random.randint(0, grid_size - min_size)
-            y = cell_y * grid_size + random.randint(0, grid_size - min_size)
+            dirty.union_ip(pygame.draw.circle(surface, YELLOW, (int(self.x), int(self.y)), self.radius))
+        return dirty
+
+# Attributes that are reattached from the game instead of saved in snapshots
+UNSAVED_ATTRIBUTES = ("image", "obstacles", "rng")
+
+def entity_state(entity):
+    return {k: v for k, v in vars(entity).items() if k not in UNSAVED_ATTRIBUTES}
+
+def restore_entity(cls, state, **attributes):
+    entity = cls.__new__(cls)
+    entity.__dict__.update(check_fields(state, ENTITY_FIELDS[cls], cls.__name__))
+    entity.__dict__.update(attributes)
+    return entity
+
+# Snapshots may come from shared replay files, so every field is checked on load.
+# A checker takes (value, name) and returns the value, raising ValueError if it is malformed
+def number(value, name):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"snapshot field {name} should be a number, not {value!r}")
+    return value
+
+def integer(value, name):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"snapshot field {name} should be an integer, not {value!r}")
+    return value
+
+def flag(value, name):
+    if not isinstance(value, bool):
+        raise ValueError(f"snapshot field {name} should be true or false, not {value!r}")
+    return value
+
+def text(value, name):
+    if not isinstance(value, str):
+        raise ValueError(f"snapshot field {name} should be a string, not {value!r}")
+    return value
+
+def optional(check):
+    return lambda value, name: None if value is None else check(value, name)
+
+def one_of(choices):
+    def check(value, name):
+        if value not in choices:
+            raise ValueError(f"snapshot field {name} should be one of {', '.join(map(str, choices))}, not {value!r}")
+        return value
+    return check
+
+def bounded(low, high):
+    def check(value, name):
+        if integer(value, name) < low or value > high:
+            raise ValueError(f"snapshot field {name} should be from {low} to {high}, not {value!r}")
+        return value
+    return check
+
+def list_of(check, length=None, kind=list):
+    # JSON has no tuples, so fields the game keeps as tuples are rebuilt with kind=tuple
+    def check_list(value, name):
+        if not isinstance(value, (list, tuple)) or (length is not None and len(value) != length):
+            raise ValueError(f"snapshot field {name} should be a list of {length or 'any number of'} items")
+        return kind(check(item, f"{name}[{i}]") for i, item in enumerate(value))
+    return check_list
+
+def check_fields(state, fields, name):
+    """Check a snapshot dict has exactly the given fields, in its own order"""
+    if not isinstance(state, dict) or state.keys() != fields.keys():
+        raise ValueError(f"snapshot {name} should have the fields {', '.join(fields)}")
+    return {key: fields[key](value, f"{name}.{key}") for key, value in state.items()}
+
+def rng_state(value, name):
+    # random.Random.getstate(): (version, 625 ints, gauss_next)
+    version, internal, gauss_next = list_of(lambda v, n: v, 3)(value, name)
+    state = (integer(version, name), list_of(integer, 625, tuple)(internal, name),
+             optional(number)(gauss_next, name))
+    try:
+        random.Random().setstate(state)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"snapshot field {name} is not a random generator state") from None
+    return state
+
+def kill_counts(value, name):
+    if not isinstance(value, dict):
+        raise ValueError(f"snapshot field {name} should map weapons to kills")
+    return {one_of(WEAPON_TYPES)(weapon, name): integer(kills, name) for weapon, kills in value.items()}
+
+ENTITY_FIELDS = {
+    Player: {
+        "radius": number, "x": number, "y": number, "angle": number, "speed": number,
+        "base_speed": number, "turn_speed": number, "health": number, "max_health": number,
+        "last_shot": number, "shield": number, "max_shield": number, "weapon": one_of(WEAPON_TYPES),
+        "weapons_owned": list_of(one_of(WEAPON_TYPES)), "score_multiplier": number,
+        "score_multiplier_time": number, "speed_boost_time": number,
+    },
+    Enemy: {
+        "radius": number, "x": number, "y": number, "health": number, "speed": number, "angle": number,
+        "aggression": number, "last_shot": number, "shot_cooldown": number,
+        "behavior_type": one_of(("chaser", "flanker", "ambusher")), "color_tint": list_of(number, 3, tuple),
+    },
+    Powerup: {
+        "radius": number, "x": number, "y": number, "type": one_of(POWERUP_TYPES), "active": flag,
+        "pulse": number,
+    },
+    Bullet: {
+        "max_trail_length": bounded(5, 5), "trail_x": list_of(number, 5), "trail_y": list_of(number, 5),
+        "x": number, "y": number, "angle": number, "speed": number, "damage": number, "radius": number,
+        "size": list_of(integer, 2, tuple), "weapon": optional(one_of(WEAPON_TYPES)), "active": flag, "trail_head": bounded(0, 4),
+        "trail_length": bounded(0, 5),
+    },
+}
 
-            # Constrain to screen
-            x = min(max(0, x), SCREEN_WIDTH - w)
-            y = min(max(0, y), SCREEN_HEIGHT - h)
+def unchecked(value, name):
+    # Nested entities and bullets are checked when they are restored
+    return value
 
-            # Add obstacle and mark cell as used
-            obstacles.append(Obstacle(x, y, w, h))
-            used_cells.add((cell_x, cell_y))
-            break
+GAME_FIELDS = {
+    "seed": integer, "rng": rng_state, "tick": integer, "map_index": optional(integer),
+    "obstacles": list_of(list_of(integer, 4, tuple)), "players": list_of(unchecked), "enemies": list_of(unchecked),
+    "powerups": list_of(unchecked), "bullets": unchecked, "enemy_bullets": unchecked, "score": number,
+    "kills": kill_counts, "high_score": number, "game_over": flag, "level": integer,
+    "next_level_score": number, "difficulty": number, "last_powerup_time": number,
+}
 
-        attempts += 1
+def nearest(entity, players):
+    # The player an enemy goes for
+    if len(players) == 1:
+        return players[0]
+    return min(players, key=lambda player: math.hypot(player.x - entity.x, player.y - entity.y))
 
-    return obstacles
+def generate_random_map(min_obstacles=5, max_obstacles=10, min_size=50, max_size=250, rng=None):
+    """Genererer en tilfældig bane med forhindringer"""
+    rects = random_map_rects(SCREEN_WIDTH, SCREEN_HEIGHT, min_obstacles, max_obstacles,
+                             min_size, max_size, rng)
+    return [Obstacle(*rect) for rect in rects]
 
 class Minimap:
-    def __init__(self, width=200, height=150):
+    def __init__(self, width=200, height=150, refresh_rate=MINIMAP_REFRESH_RATE):
         self.width = width
         self.height = height
         self.surface = pygame.Surface((width, height))
         self.scale_x = width / SCREEN_WIDTH
         self.scale_y = height / SCREEN_HEIGHT
 
-    def update(self, player, obstacles, enemies):
-        self.surface.fill((0, 0, 0))
+        # Obstacles are baked into a static layer once per map
+        self.static_layer = None
+        self.static_obstacles = None
+        self.refresh_interval = 1000 / refresh_rate if refresh_rate else 0
+        self.last_refresh = None
+        # Enemy markers are circles until drawing them costs more than a millisecond
+        self.detail = DetailLevels(1.0, (MINIMAP_CIRCLE_LIMIT,))
+
+    def build_static_layer(self, obstacles):
+        layer = pygame.Surface((self.width, self.height))
+        layer.fill((0, 0, 0))
 
         # Draw border
-        pygame.draw.rect(self.surface, (100, 100, 100), (0, 0, self.width, self.height), 2)
+        pygame.draw.rect(layer, (100, 100, 100), (0, 0, self.width, self.height), 2)
 
         # Draw obstacles
         for obs in obstacles:
@@ -598,13 +736,36 @@ class Minimap:
             y = obs.rect.y * self.scale_y
             w = obs.rect.width * self.scale_x
             h = obs.rect.height * self.scale_y
-            pygame.draw.rect(self.surface, (150, 150, 150), (x, y, w, h))
+            pygame.draw.rect(layer, (150, 150, 150), (x, y, w, h))
+
+        self.static_layer = layer
+        self.static_obstacles = obstacles
+
+    def update(self, player, obstacles, enemies, now=None):
+        if obstacles is not self.static_obstacles:
+            self.build_static_layer(obstacles)
+
+        # Skip the redraw until the refresh interval has passed
+        if now is None:
+            now = pygame.time.get_ticks()
+        if self.last_refresh is not None and now - self.last_refresh < self.refresh_interval:
+            return
+        self.last_refresh = now
+
+        self.surface.blit(self.static_layer, (0, 0))
 
         # Draw enemies
-        for enemy in enemies:
-            x = enemy.x * self.scale_x
-            y = enemy.y * self.scale_y
-            pygame.draw.circle(self.surface, (255, 0, 0), (int(x), int(y)), 3)
+        level = self.detail.choose(len(enemies)) if has_numpy else 0
+        started = time.perf_counter()
+        if level == 0:
+            for enemy in enemies:
+                x = enemy.x * self.scale_x
+                y = enemy.y * self.scale_y
+                pygame.draw.circle(self.surface, (255, 0, 0), (int(x), int(y)), 3)
+        elif enemies:
+            draw_squares(self.surface, [e.x * self.scale_x for e in enemies], [e.y * self.scale_y for e in enemies],
+                         self.surface.map_rgb((255, 0, 0)), 3)
+        self.detail.measured(level, len(enemies), time.perf_counter() - started)
 
         # Draw player
         px = player.x * self.scale_x
@@ -612,19 +773,100 @@ class Minimap:
         pygame.draw.circle(self.surface, (0, 255, 0), (int(px), int(py)), 4)
 
     def draw(self, surface, x, y):
-        surface.blit(self.surface, (x, y))
+        return surface.blit(self.surface, (x, y))
+
+# Crowds drop from full detail to bare sprites in one batch, to squares, to dots
+# written into the pixels. The limits are where that happens at first; after
+# that they follow the measured drawing cost against ENEMY_DRAW_BUDGET_MS
+ENEMY_DETAIL_LIMIT = 300
+ENEMY_SPRITE_LIMIT = 1000
+ENEMY_SQUARE_LIMIT = 3000
+ENEMY_DRAW_BUDGET_MS = 4.0
+ENEMY_DETAIL, ENEMY_SPRITES, ENEMY_SQUARES, ENEMY_DOTS = range(4)
+
+# Phases timed by Game.timer, in the order they run each frame
+UPDATE_PHASES = ("player", "bullets", "enemy_bullets", "powerups", "enemy_ai", "collisions")
+DRAW_PHASES = ("obstacles", "entities", "hud", "minimap", "flip")
 
 class Game:
-    def __init__(self):
-        # Dynamisk banegenerering ved hver ny spil
-        self.obstacles = generate_random_map()
-
-        self.player = Player(self.obstacles)
-        self.bullets = []
-        self.enemy_bullets = []
-        self.enemies = [Enemy(self.obstacles) for _ in range(5)]
-        self.powerups = []
+    def __init__(self, use_projectiles=False, dirty_rects=False, controller=None, headless=False,
+                 seed=None, batch_enemies=False, maps=None, map_index=None, submit_results=True):
+        startup(headless)
+        # One seeded RNG per game: the seed plus the input stream reproduce a game exactly
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.rng = random.Random(self.seed)
+        self.sim_clock = SimClock()
+
+        # Maps come from a pregenerated library when there is one (a random
+        # entry unless map_index picks one); otherwise each game generates its own
+        if isinstance(maps, str):
+            maps = MapLibrary(maps)
+        if maps is not None and (maps.width, maps.height) != (SCREEN_WIDTH, SCREEN_HEIGHT):
+            raise ValueError(f"{maps.path} holds {maps.width}x{maps.height} maps, "
+                             f"the screen is {SCREEN_WIDTH}x{SCREEN_HEIGHT}")
+        self.maps = maps
+        if maps is not None:
+            self.map_index = map_index if map_index is not None else self.rng.randrange(len(maps))
+            self.obstacles = [Obstacle(*rect) for rect in maps.get(self.map_index)]
+        else:
+            # Dynamisk banegenerering ved hver ny spil
+            self.map_index = None
+            self.obstacles = generate_random_map(rng=self.rng)
+        # Obstacles never move, so the collision index is built once per map
+        self.obstacle_index = ObstacleIndex(self.obstacles)
+        self.build_navigation()
+
+        # Input comes from a controller; headless games never render
+        self.controller = controller or KeyboardController()
+        self.headless = headless
+        self.background = None if headless else self.build_background()
+
+        # Dirty-rect mode only presents the regions entities moved through
+        self.dirty_rects = dirty_rects
+        self.last_dirty = [screen.get_rect()]
+
+        # HUD labels re-render only when their value changes
+        self.health_label = HudText(font, "Health: {}", WHITE)
+        self.score_label = HudText(font, "Score: {}", WHITE)
+        self.high_score_label = HudText(font, "High Score: {}", WHITE)
+        self.level_label = HudText(font, "Level: {}", YELLOW)
+        self.weapon_label = HudText(font, "Weapon: {}", ORANGE)
+        self.fps_label = HudText(small_font, "FPS: {}", WHITE)
+        self.overlay = None
+
+        # Everyone in this world and the controller driving each of them; the
+        # first player is the one the HUD, the minimap and bot controllers follow
+        self.player = Player(self.obstacle_index, self.rng)
+        self.players = [self.player]
+        self.controllers = [self.controller]
+
+        # Bullets live either in Bullet lists or in the NumPy projectile engine
+        if use_projectiles and not has_numpy:
+            print("WARNING: numpy not available. Using Bullet objects.")
+        self.use_projectiles = use_projectiles and has_numpy
+        if self.use_projectiles:
+            bounds = (SCREEN_WIDTH, SCREEN_HEIGHT)
+            self.bullets = ProjectileSystem(bounds, self.obstacles, sprites.bullet)
+            self.enemy_bullets = ProjectileSystem(bounds, self.obstacles, sprites.bullet)
+        else:
+            # Bullet and powerup objects are pooled and reused
+            self.bullets = Pool(self.new_bullet, 64, obstacles=self.obstacle_index)
+            self.enemy_bullets = Pool(self.new_bullet, 64, obstacles=self.obstacle_index)
+        self.enemies = [Enemy(self.obstacle_index, rng=self.rng) for _ in range(5)]
+        self.killed_enemies = []
+
+        # Enemy AI runs either per Enemy or as one vectorized batch
+        if batch_enemies and not has_numpy:
+            print("WARNING: numpy not available. Updating enemies one by one.")
+        self.batch_enemies = batch_enemies and has_numpy
+        self.enemy_batch = EnemyBatch(self.obstacle_index) if self.batch_enemies else None
+        self.powerups = Pool(self.new_powerup, 8)
         self.score = 0
+        self.kills = {}  # Weapon name -> enemies it killed
+        # Headless runs (tests) and replays being watched never touch the leaderboard unless given one
+        self.submit_results = submit_results
+        self.leaderboard = leaderboard() if submit_results and not headless else None
+        self.result_saved = False
         self.high_score = self.load_high_score()
         self.running = True
         self.game_over = False
@@ -634,24 +876,69 @@ class Game:
         self.next_level_score = 10
         self.difficulty = 1.0
         self.last_powerup_time = 0
-        self.powerup_interval = 10000  # 10 seconds between powerups
+        self.powerup_interval = ms_to_ticks(10000)  # 10 seconds between powerups
+
+        # Replay recorder, if this session is being recorded
+        self.recorder = None
+        # Spectator feed, if this session is being broadcast
+        self.feed = None
+
+        # Per-phase frame times; F3 shows them as a bar chart
+        self.timer = FrameTimer(UPDATE_PHASES + DRAW_PHASES)
+        self.enemy_detail = DetailLevels(ENEMY_DRAW_BUDGET_MS,
+                                         (ENEMY_DETAIL_LIMIT, ENEMY_SPRITE_LIMIT, ENEMY_SQUARE_LIMIT))
+
+        # Broadphase grids for the entity pair tests, rebuilt every tick
+        self.enemy_grid = SpatialHash()
+        self.enemy_bullet_grid = SpatialHash()
+        self.powerup_grid = SpatialHash()
+
+    def map_name(self):
+        # Library maps have their own boards; generated maps are all "random"
+        return f"library:{self.map_index}" if self.map_index is not None else "random"
 
     def load_high_score(self):
-        try:
-            with open("highscore.txt", "r") as f:
-                return int(f.read().strip())
-        except:
+        if self.leaderboard is None:
             return 0
+        return self.leaderboard.best("shooter")
 
     def save_high_score(self):
-        try:
-            with open("highscore.txt", "w") as f:
-                f.write(str(max(self.high_score, self.score)))
-        except:
-            pass
+        # Records this game's result once, when it ends or the window is closed
+        if self.leaderboard is None or self.result_saved:
+            return
+        self.result_saved = True
+        self.leaderboard.submit("shooter", self.score, map=self.map_name(), level=self.level,
+                                ticks=self.sim_clock.tick, seed=self.seed)
+
+    def add_player(self, controller):
+        """Put another player, driven by its own controller (e.g. a network client), in this world"""
+        if self.recorder:
+            raise ValueError("replays record a single player")
+        player = Player(self.obstacle_index, self.rng)
+        self.players.append(player)
+        self.controllers.append(controller)
+        return player
+
+    def remove_player(self, controller):
+        i = self.controllers.index(controller)
+        if len(self.players) == 1:
+            raise ValueError("the last player cannot leave the game")
+        del self.players[i], self.controllers[i]
+        self.player, self.controller = self.players[0], self.controllers[0]
+
+    def player_of(self, controller):
+        return self.players[self.controllers.index(controller)]
 
     def spawn_enemy(self):
-        self.enemies.append(Enemy(self.obstacles, self.difficulty))
+        self.spawn_enemies(1)
+
+    def spawn_enemies(self, count):
+        enemies = [Enemy(self.obstacle_index, self.difficulty, self.rng) for _ in range(count)]
+        self.enemies.extend(enemies)
+        # Keep the grid current so bullets later in this tick can hit them
+        insert = self.enemy_grid.insert
+        for enemy in enemies:
+            insert(enemy, enemy.x, enemy.y, enemy.radius)
 
     def spawn_powerup(self):
         # Don't spawn too many powerups
@@ -662,241 +949,605 @@ class Game:
         valid_pos = False
         tries = 0
         while not valid_pos and tries < 20:
-            x = random.randint(50, SCREEN_WIDTH - 50)
-            y = random.randint(50, SCREEN_HEIGHT - 50)
+            x = self.rng.randint(50, SCREEN_WIDTH - 50)
+            y = self.rng.randint(50, SCREEN_HEIGHT - 50)
 
             # Check if position is clear of obstacles
-            clear = True
-            for obs in self.obstacles:
-                if obs.collides(x, y, 20):
-                    clear = False
-                    break
-
-            if clear:
-                powerup_type = random.choice(POWERUP_TYPES)
-                self.powerups.append(Powerup(x, y, powerup_type))
+            if not self.obstacle_index.collides(x, y, 20):
+                powerup_type = self.rng.choice(POWERUP_TYPES)
+                self.powerups.spawn(x, y, powerup_type)
                 valid_pos = True
 
             tries += 1
 
+    @staticmethod
+    def new_bullet():
+        # Blank pool entry, reset() fills it in when it is spawned
+        return Bullet(0, 0, 0)
+
+    @staticmethod
+    def new_powerup():
+        return Powerup(0, 0, POWERUP_TYPES[0])
+
+    def kill_enemy(self, enemy, weapon=None):
+        if weapon:
+            self.kills[weapon] = self.kills.get(weapon, 0) + 1
+        # The enemy leaves self.enemies in remove_killed_enemies at the end of the
+        # collision pass, so list indices stay valid while hits are resolved
+        self.killed_enemies.append(enemy)
+        self.enemy_grid.remove(enemy, enemy.x, enemy.y)
+        # The score is shared, and so is the best multiplier anyone holds
+        score_gain = int(10 * max(player.score_multiplier for player in self.players))
+        self.score += score_gain
+        self.check_level_up()
+
+        # Update high score
+        if self.score > self.high_score:
+            self.high_score = self.score
+
+        # Chance to spawn powerup
+        if self.rng.random() < 0.2:
+            self.powerups.spawn(enemy.x, enemy.y, self.rng.choice(POWERUP_TYPES))
+
+        self.spawn_enemy()
+
+    def remove_killed_enemies(self):
+        # One pass over the list instead of a list.remove() per kill
+        if self.killed_enemies:
+            killed = set(self.killed_enemies)
+            self.enemies[:] = [e for e in self.enemies if e not in killed]
+            self.killed_enemies.clear()
+
+    def player_hit(self, damage, player=None):
+        # The game is over once every player is down
+        game_over = (player or self.player).take_damage(damage) and all(p.health <= 0 for p in self.players)
+        if game_over:
+            self.game_over = True
+            audio.play("gameover")
+            self.save_high_score()
+        return game_over
+
     def check_level_up(self):
         if self.score >= self.next_level_score:
             self.level += 1
-            self.difficulty += 0.2
+            self.difficulty += DIFFICULTY_STEP
             self.next_level_score = self.next_level_score * 2
 
             # Spawn additional enemies
-            for _ in range(2):
-                self.spawn_enemy()
+            self.spawn_enemies(2)
 
             # Increase player max health
-            self.player.max_health += 20
-            self.player.health = self.player.max_health
+            for player in self.players:
+                player.max_health += 20
+                player.health = player.max_health
 
     def update(self):
-        game_time = pygame.time.get_ticks()
+        audio.new_tick()
+        keys = self.controller.get_keys(self)
+        if self.recorder:
+            self.recorder.record(self, keys)
+        inputs = [keys] + [controller.get_keys(self) for controller in self.controllers[1:]]
+        if self.feed:
+            self.feed.publish(self)
+        game_time = self.sim_clock.advance()
+        timer = self.timer
+        timer.start()
 
         # Check for powerup spawn
         if game_time - self.last_powerup_time > self.powerup_interval:
             self.spawn_powerup()
             self.last_powerup_time = game_time
+        timer.lap("powerups")
 
-        keys = pygame.key.get_pressed()
         if not self.game_over:
-            self.player.move(keys)
-
-            # Shooting
-            if keys[pygame.K_SPACE] and self.player.can_shoot():
-                new_bullets = self.player.shoot()
-                self.bullets.extend(new_bullets)
-
-            # Update bullets
-            for bullet in self.bullets:
-                bullet.update()
-            self.bullets = [b for b in self.bullets if b.active]
-
-            # Update enemy bullets
-            for bullet in self.enemy_bullets:
-                bullet.update()
-
-                # Check for collision with player
-                if math.hypot(bullet.x - self.player.x, bullet.y - self.player.y) < self.player.radius + bullet.radius:
-                    bullet.active = False
-                    game_over = self.player.take_damage(1)
-                    if game_over:
-                        self.game_over = True
-                        if gameover_sound:
-                            gameover_sound.play()
-
-            self.enemy_bullets = [b for b in self.enemy_bullets if b.active]
+            # Players who are down sit out until the next level or restart
+            live = [player for player in self.players if player.health > 0]
+            for player, player_keys in zip(self.players, inputs):
+                if player.health > 0:
+                    player.move(player_keys, game_time)
+
+                    # Shooting
+                    if player_keys[pygame.K_SPACE] and player.can_shoot(game_time):
+                        player.shoot(game_time, self.bullets)
+            timer.lap("player")
+
+            if self.use_projectiles:
+                self.update_projectiles(live)
+            else:
+                # Update bullets
+                for bullet in self.bullets:
+                    bullet.update()
+                self.bullets.sweep()
+                timer.lap("bullets")
+
+                # Update enemy bullets
+                for bullet in self.enemy_bullets:
+                    bullet.update()
+
+                # Check for collision with players; a bullet only hits one of them
+                self.enemy_bullet_grid.rebuild(self.enemy_bullets)
+                spent = set()
+                for player in live:
+                    for bullet in self.enemy_bullet_grid.colliding(player.x, player.y, player.radius):
+                        if bullet not in spent:
+                            spent.add(bullet)
+                            bullet.active = False
+                            self.player_hit(1, player)
+
+                self.enemy_bullets.sweep()
+                timer.lap("enemy_bullets")
 
             # Update powerups
             for powerup in self.powerups:
                 powerup.update()
 
-                # Check if player collected powerup
-                if math.hypot(powerup.x - self.player.x, powerup.y - self.player.y) < self.player.radius + powerup.radius:
-                    self.player.collect_powerup(powerup)
-                    powerup.active = False
-
-            self.powerups = [p for p in self.powerups if p.active]
-
-            # Update enemies
-            for enemy in self.enemies:
-                should_shoot = enemy.update(self.player, game_time)
-
-                # Enemy may shoot at player
-                if should_shoot:
-                    enemy_bullet = Bullet(
-                        enemy.x, enemy.y, enemy.angle, self.obstacles,
-                        damage=1, speed=8, size=(40, 40)
-                    )
-                    self.enemy_bullets.append(enemy_bullet)
+            # Check if a player collected powerup
+            self.powerup_grid.rebuild(self.powerups)
+            for player in live:
+                for powerup in self.powerup_grid.colliding(player.x, player.y, player.radius):
+                    if powerup.active:
+                        player.collect_powerup(powerup, game_time)
+                        powerup.active = False
+
+            self.powerups.sweep()
+            timer.lap("powerups")
+
+            # Update enemies, each going for the nearest player; the flow field is only
+            # recomputed when a player changes cell, line of sight answers are only kept for this tick
+            self.flow_field.set_goals([(player.x, player.y) for player in live])
+            self.sight.clear()
+            if self.enemy_batch:
+                shooters = self.enemy_batch.update(self.enemies, live, game_time, self.rng,
+                                                   self.flow_field, self.sight)
+            else:
+                shooters = [enemy for enemy in self.enemies
+                            if enemy.update(nearest(enemy, live), game_time, self.flow_field, self.sight)]
+
+            # Enemies may shoot at player
+            if self.use_projectiles:
+                if shooters:
+                    self.enemy_bullets.spawn_many([e.x for e in shooters], [e.y for e in shooters],
+                                                  [e.angle for e in shooters],
+                                                  damage=1, speed=8, size=(40, 40))
+            else:
+                for enemy in shooters:
+                    self.enemy_bullets.spawn(enemy.x, enemy.y, enemy.angle,
+                                             damage=1, speed=8, size=(40, 40))
+            timer.lap("enemy_ai")
 
             # Bullet-enemy collision
-            for bullet in self.bullets:
-                for enemy in self.enemies:
-                    if math.hypot(bullet.x - enemy.x, bullet.y - enemy.y) < enemy.radius + bullet.radius:
+            self.enemy_grid.rebuild(self.enemies)
+            if self.use_projectiles:
+                self.hit_enemies_with_projectiles()
+            else:
+                for bullet in self.bullets:
+                    for enemy in self.enemy_grid.colliding(bullet.x, bullet.y, bullet.radius):
                         bullet.active = False
                         if enemy.hit(bullet.damage):
-                            self.enemies.remove(enemy)
-                            score_gain = int(10 * self.player.score_multiplier)
-                            self.score += score_gain
-                            self.check_level_up()
-
-                            # Update high score
-                            if self.score > self.high_score:
-                                self.high_score = self.score
-
-                            # Chance to spawn powerup
-                            if random.random() < 0.2:
-                                self.powerups.append(Powerup(enemy.x, enemy.y,
-                                                     random.choice(POWERUP_TYPES)))
-
-                            self.spawn_enemy()
+                            self.kill_enemy(enemy, bullet.weapon)
                         break
+            self.remove_killed_enemies()
 
             # Enemy-player collision
-            for enemy in self.enemies:
-                if math.hypot(self.player.x - enemy.x, self.player.y - enemy.y) < enemy.radius + self.player.radius:
-                    game_over = self.player.take_damage(5)  # Reduced damage
-                    if game_over:
-                        self.game_over = True
-                        if gameover_sound:
-                            gameover_sound.play()
-                        self.save_high_score()
+            for player in live:
+                for enemy in self.enemy_grid.colliding(player.x, player.y, player.radius):
+                    self.player_hit(5, player)  # Reduced damage
+            timer.lap("collisions")
 
-            # Update minimap
-            self.minimap.update(self.player, self.obstacles, self.enemies)
+        else:
+            # Restart on Enter, from any player
+            if any(player_keys[pygame.K_RETURN] for player_keys in inputs):
+                self.restart()
+
+    def restart(self):
+        # New map and a fresh game with the same settings
+        recorder, timer, feed, board = self.recorder, self.timer, self.feed, self.leaderboard
+        others = self.controllers[1:]
+        high_score = max(self.high_score, self.score)
+        # The next seed comes from this game's RNG, so restarts stay reproducible
+        self.__init__(use_projectiles=self.use_projectiles, dirty_rects=self.dirty_rects,
+                      controller=self.controller, headless=self.headless,
+                      seed=self.rng.randrange(2**32), batch_enemies=self.batch_enemies,
+                      maps=self.maps, submit_results=self.submit_results)
+        self.high_score = max(self.high_score, high_score)
+        self.recorder, self.timer, self.feed, self.leaderboard = recorder, timer, feed, board
+        # Everyone plays on in the new world
+        for controller in others:
+            self.add_player(controller)
+        if recorder:
+            recorder.restart()
+
+    def save_state(self):
+        """Snapshot of the whole simulation as plain data (for replay keyframes)"""
+        if self.use_projectiles:
+            bullets = self.bullets.get_state()
+            enemy_bullets = self.enemy_bullets.get_state()
+        else:
+            bullets = [entity_state(b) for b in self.bullets]
+            enemy_bullets = [entity_state(b) for b in self.enemy_bullets]
+        return {
+            "seed": self.seed,
+            "rng": self.rng.getstate(),
+            "tick": self.sim_clock.tick,
+            "map_index": self.map_index,
+            "obstacles": [tuple(obs.rect) for obs in self.obstacles],
+            "players": [entity_state(player) for player in self.players],
+            "enemies": [entity_state(e) for e in self.enemies],
+            "powerups": [entity_state(p) for p in self.powerups],
+            "bullets": bullets,
+            "enemy_bullets": enemy_bullets,
+            "score": self.score,
+            "kills": dict(self.kills),
+            "high_score": self.high_score,
+            "game_over": self.game_over,
+            "level": self.level,
+            "next_level_score": self.next_level_score,
+            "difficulty": self.difficulty,
+            "last_powerup_time": self.last_powerup_time,
+        }
 
+    def load_state(self, state):
+        """Restore a save_state() snapshot; a malformed one raises ValueError and changes nothing"""
+        state = check_fields(state, GAME_FIELDS, "game")
+        obstacles = [Obstacle(*rect) for rect in state["obstacles"]]
+        index, rng = ObstacleIndex(obstacles), self.rng
+        if len(state["players"]) != len(self.controllers):
+            raise ValueError(f"snapshot has {len(state['players'])} players, the game has "
+                             f"{len(self.controllers)} controllers")
+        players = [restore_entity(Player, p, image=sprites.player, obstacles=index, rng=rng)
+                   for p in state["players"]]
+        enemies = [restore_entity(Enemy, e, image=sprites.enemy, obstacles=index, rng=rng)
+                   for e in state["enemies"]]
+        powerups = Pool(self.new_powerup, 8)
+        powerups.restore([restore_entity(Powerup, p) for p in state["powerups"]])
+        if self.use_projectiles:
+            bounds = (SCREEN_WIDTH, SCREEN_HEIGHT)
+            bullets = ProjectileSystem(bounds, obstacles, sprites.bullet)
+            bullets.set_state(state["bullets"], WEAPON_TYPES)
+            enemy_bullets = ProjectileSystem(bounds, obstacles, sprites.bullet)
+            enemy_bullets.set_state(state["enemy_bullets"], WEAPON_TYPES)
         else:
-            # Restart on Enter
-            if keys[pygame.K_RETURN]:
-                self.__init__()
+            bullets = Pool(self.new_bullet, 64, obstacles=index)
+            bullets.restore([self.restore_bullet(b, index) for b in list_of(unchecked)(state["bullets"], "game.bullets")])
+            enemy_bullets = Pool(self.new_bullet, 64, obstacles=index)
+            enemy_bullets.restore([self.restore_bullet(b, index)
+                                   for b in list_of(unchecked)(state["enemy_bullets"], "game.enemy_bullets")])
+
+        # Everything checked out; only now does the game change
+        self.seed = state["seed"]
+        self.rng.setstate(state["rng"])
+        self.sim_clock.tick = state["tick"]
+        self.map_index = state["map_index"]
+        self.obstacles, self.obstacle_index = obstacles, index
+        self.build_navigation()
+        if self.background is not None:
+            self.background = self.build_background()
+        self.players, self.player = players, players[0]
+        self.enemies, self.powerups = enemies, powerups
+        self.bullets, self.enemy_bullets = bullets, enemy_bullets
+        self.killed_enemies = []
+        if self.batch_enemies:
+            self.enemy_batch = EnemyBatch(self.obstacle_index)
+        self.kills = state["kills"]
+        for name in ("score", "high_score", "game_over", "level", "next_level_score",
+                     "difficulty", "last_powerup_time"):
+            setattr(self, name, state[name])
+        self.last_dirty = [screen.get_rect()]
+
+    def restore_bullet(self, state, obstacles):
+        bullet = restore_entity(Bullet, state, obstacles=obstacles)
+        bullet.image = sprite_cache.get(sprites.bullet, bullet.size) if sprites.bullet else None
+        return bullet
+
+    def update_projectiles(self, players):
+        # Move every bullet of both sides in a handful of array passes
+        self.bullets.update()
+        self.timer.lap("bullets")
+        # Like the object path, bullets that hit a wall or left the map this tick
+        # can still hit a player; they are removed after the check
+        self.enemy_bullets.update(cull=False)
+
+        # Check for collision with players; killed bullets drop out of later queries
+        for player in players:
+            for i in self.enemy_bullets.colliding(player.x, player.y, player.radius):
+                self.enemy_bullets.kill(i)
+                self.player_hit(1, player)
+        self.enemy_bullets.retire_spent()
+        self.timer.lap("enemy_bullets")
+
+    def hit_enemies_with_projectiles(self):
+        # One array pass finds the bullets touching an enemy; they are then resolved like
+        # Bullet objects: in bullet order, each on the first enemy the grid returns, and
+        # enemies spawned by kills can be hit by later bullets of the same tick
+        bullets = self.bullets
+        x, y, radius, damage = bullets.x, bullets.y, bullets.radius, bullets.damage
+        enemies = self.enemies
+        pending = self.bullets_touching(enemies)
+        queue = sorted(pending)
+        while queue:
+            b = heapq.heappop(queue)
+            count = len(enemies)
+            for enemy in self.enemy_grid.colliding(float(x[b]), float(y[b]), float(radius[b])):
+                bullets.kill(b)
+                if enemy.hit(float(damage[b])):
+                    self.kill_enemy(enemy, bullets.weapon_of(b))
+                break
+            if len(enemies) > count:
+                for later in self.bullets_touching(enemies[count:]) - pending:
+                    if later > b:
+                        pending.add(later)
+                        heapq.heappush(queue, later)
+
+    def bullets_touching(self, enemies):
+        # Broadphase with a pixel of slack; the grid check decides, with math.hypot rather than NumPy's
+        _, hit_bullets = self.bullets.colliding_many([e.x for e in enemies], [e.y for e in enemies],
+                                                     [e.radius + 1 for e in enemies])
+        return set(hit_bullets.tolist())
+
+    def build_navigation(self):
+        # Enemies path towards the player over a grid that keeps them clear of
+        # walls, and check line of sight on the same grid
+        self.nav_grid = NavGrid(self.obstacles, SCREEN_WIDTH, SCREEN_HEIGHT, clearance=ENEMY_SIZE[0] // 2)
+        self.flow_field = FlowField(self.nav_grid)
+        self.sight = LineOfSight(self.nav_grid)
+
+    def build_background(self):
+        # The map is static for the whole session, so obstacles are composited once
+        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        background.fill(BLACK)
+        for obs in self.obstacles:
+            obs.draw(background)
+        return background
 
     def draw(self):
-        screen.fill(BLACK)
-
-        # Draw obstacles
-        for obs in self.obstacles:
-            obs.draw(screen)
+        timer = self.timer
+        timer.start()
+        if self.background is None:
+            # Headless games (e.g. replays) build it the first time they are drawn
+            self.background = self.build_background()
+        if self.dirty_rects:
+            # Only restore what was drawn over last frame
+            for rect in self.last_dirty:
+                screen.blit(self.background, rect, rect)
+        else:
+            screen.blit(self.background, (0, 0))
+        dirty = []
+        timer.lap("obstacles")
 
         # Draw powerups
         for powerup in self.powerups:
-            powerup.draw(screen)
+            dirty.append(powerup.draw(screen))
 
         # Draw enemy bullets
-        for bullet in self.enemy_bullets:
-            bullet.draw(screen)
+        if self.use_projectiles:
+            dirty.append(self.enemy_bullets.draw(screen))
+        else:
+            for bullet in self.enemy_bullets:
+                dirty.append(bullet.draw(screen))
 
-        # Draw player
-        self.player.draw(screen)
+        # Draw players
+        for player in self.players:
+            dirty.append(player.draw(screen, self.sim_clock.tick))
 
         # Draw bullets
-        for bullet in self.bullets:
-            bullet.draw(screen)
+        if self.use_projectiles:
+            dirty.append(self.bullets.draw(screen))
+        else:
+            for bullet in self.bullets:
+                dirty.append(bullet.draw(screen))
 
-        # Draw enemies
-        for enemy in self.enemies:
-            enemy.draw(screen)
+        # Draw enemies; crowds lose detail as drawing them gets expensive
+        count = len(self.enemies)
+        level = self.enemy_detail.choose(count)
+        started = time.perf_counter()
+        if level == ENEMY_DETAIL:
+            for enemy in self.enemies:
+                dirty.append(enemy.draw(screen))
+        else:
+            dirty.extend(self.draw_enemy_crowd(screen, level))
+        self.enemy_detail.measured(level, count, time.perf_counter() - started)
+        timer.lap("entities")
 
         # Draw UI
         # Health bar
         health_pct = max(0, self.player.health / self.player.max_health)
         health_width = 200 * health_pct
-        pygame.draw.rect(screen, (50, 50, 50), (10, 10, 200, 20))
+        dirty.append(pygame.draw.rect(screen, (50, 50, 50), (10, 10, 200, 20)))
         pygame.draw.rect(screen, (255, 0, 0), (10, 10, health_width, 20))
-        health_text = font.render(f"Health: {self.player.health}", True, WHITE)
-        screen.blit(health_text, (220, 10))
+        dirty.append(self.health_label.draw(screen, (220, 10), self.player.health))
 
         # Shield bar
         if self.player.shield > 0:
             shield_pct = self.player.shield / self.player.max_shield
             shield_width = 200 * shield_pct
-            pygame.draw.rect(screen, (0, 0, 255), (10, 40, shield_width, 10))
+            dirty.append(pygame.draw.rect(screen, (0, 0, 255), (10, 40, shield_width, 10)))
 
         # Score & level
-        score_text = font.render(f"Score: {self.score}", True, WHITE)
-        screen.blit(score_text, (10, 40))
-        high_score_text = font.render(f"High Score: {self.high_score}", True, WHITE)
-        screen.blit(high_score_text, (10, 70))
-        level_text = font.render(f"Level: {self.level}", True, YELLOW)
-        screen.blit(level_text, (220, 40))
+        dirty.append(self.score_label.draw(screen, (10, 40), self.score))
+        dirty.append(self.high_score_label.draw(screen, (10, 70), self.high_score))
+        dirty.append(self.level_label.draw(screen, (220, 40), self.level))
 
         # Weapons
-        weapon_text = font.render(f"Weapon: {self.player.weapon}", True, ORANGE)
-        screen.blit(weapon_text, (220, 70))
+        dirty.append(self.weapon_label.draw(screen, (220, 70), self.player.weapon))
 
         # Weapons owned
         y_offset = 100
-        weapons_text = font.render("Weapons:", True, WHITE)
-        screen.blit(weapons_text, (10, y_offset))
+        weapons_text = text_cache.render(font, "Weapons:", WHITE)
+        dirty.append(screen.blit(weapons_text, (10, y_offset)))
         for i, weapon in enumerate(self.player.weapons_owned):
             key_num = i + 1
-            w_text = small_font.render(f"{key_num}-{weapon}", True,
+            w_text = text_cache.render(small_font, f"{key_num}-{weapon}",
                          YELLOW if weapon == self.player.weapon else WHITE)
-            screen.blit(w_text, (10, y_offset + 30 + i * 20))
+            dirty.append(screen.blit(w_text, (10, y_offset + 30 + i * 20)))
+        timer.lap("hud")
 
-        # Minimap
-        self.minimap.draw(screen, SCREEN_WIDTH - 220, 20)
+        # Minimap (refreshes on its own wall-clock rate)
+        self.minimap.update(self.player, self.obstacles, self.enemies)
+        dirty.append(self.minimap.draw(screen, SCREEN_WIDTH - 220, 20))
+        timer.lap("minimap")
 
         # Game over screen
         if self.game_over:
             # Semi-transparent overlay
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 150))
-            screen.blit(overlay, (0, 0))
+            if self.overlay is None:
+                self.overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+                self.overlay.fill((0, 0, 0, 150))
+            dirty.append(screen.blit(self.overlay, (0, 0)))
 
-            over_text = large_font.render("GAME OVER", True, RED)
+            over_text = text_cache.render(large_font, "GAME OVER", RED)
             screen.blit(over_text, (SCREEN_WIDTH//2 - 180, SCREEN_HEIGHT//2 - 60))
 
-            score_text = font.render(f"Final Score: {self.score}", True, WHITE)
+            score_text = text_cache.render(font, f"Final Score: {self.score}", WHITE)
             screen.blit(score_text, (SCREEN_WIDTH//2 - 100, SCREEN_HEIGHT//2))
 
             if self.score >= self.high_score:
-                new_high_text = font.render("NEW HIGH SCORE!", True, YELLOW)
+                new_high_text = text_cache.render(font, "NEW HIGH SCORE!", YELLOW)
                 screen.blit(new_high_text, (SCREEN_WIDTH//2 - 120, SCREEN_HEIGHT//2 + 40))
 
-            restart_text = font.render("Press Enter to Restart", True, WHITE)
+            restart_text = text_cache.render(font, "Press Enter to Restart", WHITE)
             screen.blit(restart_text, (SCREEN_WIDTH//2 - 120, SCREEN_HEIGHT//2 + 80))
 
         # Draw frames per second
-        fps_text = small_font.render(f"FPS: {int(self.clock.get_fps())}", True, WHITE)
-        screen.blit(fps_text, (SCREEN_WIDTH - 100, SCREEN_HEIGHT - 30))
-
-        pygame.display.flip()
+        dirty.append(self.fps_label.draw(screen, (SCREEN_WIDTH - 100, SCREEN_HEIGHT - 30),
+                                         int(self.clock.get_fps())))
+
+        # Frame timing chart (F3)
+        dirty.append(timer.draw(screen, (10, SCREEN_HEIGHT - 260), small_font))
+        timer.lap("hud")
+
+        if self.dirty_rects:
+            # Present both where things were and where they are now
+            dirty = [rect for rect in dirty if rect]
+            pygame.display.update(self.last_dirty + dirty)
+            self.last_dirty = dirty
+        else:
+            pygame.display.flip()
+        timer.lap("flip")
+
+    def draw_enemy_crowd(self, surface, level=ENEMY_SPRITES):
+        # Level of detail for big crowds: no health bars or type letters, and
+        # further down just a square or a dot in the behavior color
+        enemies = self.enemies
+        if level == ENEMY_DOTS and has_numpy and enemies:
+            mapped = {tint: surface.map_rgb(tint) for tint in {e.color_tint for e in enemies}}
+            xs, ys = [e.x for e in enemies], [e.y for e in enemies]
+            draw_squares(surface, xs, ys, [mapped[e.color_tint] for e in enemies], 5)
+            left, top = int(min(xs)) - 3, int(min(ys)) - 3
+            return [pygame.Rect(left, top, int(max(xs)) + 4 - left, int(max(ys)) + 4 - top).clip(surface.get_rect())]
+        if level >= ENEMY_SQUARES:
+            fill = surface.fill
+            return [fill(e.color_tint, (int(e.x) - 5, int(e.y) - 5, 10, 10)) for e in enemies]
+        if not sprites.enemy:
+            return [pygame.draw.circle(surface, RED, (int(e.x), int(e.y)), e.radius) for e in enemies]
+        get = sprite_cache.get
+        # Rotation grows the sprite, so center each one on its own size
+        images = [get(sprites.enemy, tint=e.color_tint, angle=e.angle) for e in enemies]
+        return surface.blits([(sprite, (int(e.x) - sprite.get_width() // 2, int(e.y) - sprite.get_height() // 2))
+                              for sprite, e in zip(images, enemies)], doreturn=self.dirty_rects) or []
 
     def run(self):
+        # Fixed timestep: update() advances TICK_RATE ticks per second of real
+        # time however long frames take, draw() runs once per frame
+        lag = 0.0
         while self.running:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
                     self.save_high_score()
+                    if self.recorder:
+                        self.recorder.save()
+                    self.timer.close()
+                    if self.feed:
+                        self.feed.close()
                     pygame.quit()
                     sys.exit()
-            self.update()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.timer.toggle()
+            lag += self.clock.tick(60)
+            self.timer.begin_frame()
+            steps = 0
+            while lag >= TICK_MS and steps < MAX_CATCHUP_TICKS:
+                self.update()
+                lag -= TICK_MS
+                steps += 1
+            if steps == MAX_CATCHUP_TICKS:
+                lag = 0.0  # Too far behind; drop the time rather than spiral
             self.draw()
-            self.clock.tick(60)
+            self.timer.end_frame()
+
+    def run_headless(self, ticks=None, report_every=1000, restart_on_game_over=True):
+        """Run update() as fast as possible without rendering and report ticks per second"""
+        start = time.perf_counter()
+        last_report, last_tick = start, 0
+        tick = 0
+        games = 1
+        while self.running and (ticks is None or tick < ticks):
+            self.timer.begin_frame()
+            self.update()
+            self.timer.end_frame()
+            tick += 1
+
+            if self.game_over:
+                if not restart_on_game_over:
+                    break
+                self.restart()
+                games += 1
+
+            if report_every and tick % report_every == 0:
+                now = time.perf_counter()
+                print(f"tick {tick}: {(tick - last_tick) / (now - last_report):.0f} ticks/s, "
+                      f"score {self.score}, level {self.level}, enemies {len(self.enemies)}")
+                last_report, last_tick = now, tick
+
+        elapsed = time.perf_counter() - start
+        stats = {"ticks": tick, "seconds": elapsed, "games": games,
+                 "ticks_per_second": tick / elapsed if elapsed > 0 else 0.0}
+        print(f"{tick} ticks in {elapsed:.2f}s ({stats['ticks_per_second']:.0f} ticks/s), {games} game(s)")
+        return stats
 
 if __name__ == "__main__":
-    Game().run()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Advanced FPS Shooter")
+    parser.add_argument("--projectiles", action="store_true",
+                        help="use the NumPy projectile engine; plays the same as Bullet objects")
+    parser.add_argument("--dirty-rects", action="store_true", help="only present changed screen regions")
+    parser.add_argument("--headless", action="store_true", help="simulate without rendering, as fast as possible")
+    parser.add_argument("--ticks", type=int, default=10000, help="ticks to simulate in headless mode")
+    parser.add_argument("--batch-enemies", action="store_true", help="update enemy AI as one NumPy batch")
+    parser.add_argument("--seed", type=int, default=None, help="seed for a reproducible game")
+    parser.add_argument("--maps", metavar="PATH", help="play maps from a library built by MapLibrary.py")
+    parser.add_argument("--map-index", type=int, default=None, help="first map to play from the library")
+    parser.add_argument("--record", metavar="PATH", help="record the session to a replay file")
+    parser.add_argument("--broadcast", metavar="HOST:PORT", help="stream the game to a spectator relay (Spectator.py)")
+    parser.add_argument("--timings-csv", metavar="PATH", help="write per-phase frame times to a CSV file")
+    parser.add_argument("--show-timings", action="store_true", help="start with the frame timing chart shown (F3)")
+    args = parser.parse_args()
+
+    startup(args.headless)
+    if args.headless:
+        game = Game(use_projectiles=args.projectiles, controller=ScriptedController.patrol(),
+                    headless=True, seed=args.seed, batch_enemies=args.batch_enemies,
+                    maps=args.maps, map_index=args.map_index)
+    else:
+        game = Game(use_projectiles=args.projectiles, dirty_rects=args.dirty_rects, seed=args.seed,
+                    batch_enemies=args.batch_enemies, maps=args.maps, map_index=args.map_index)
+    if args.record:
+        from Replay import ReplayRecorder
+        ReplayRecorder(game, args.record)
+    if args.broadcast:
+        from Spectator import SpectatorFeed
+        host, _, port = args.broadcast.rpartition(":")
+        SpectatorFeed(game, host or "127.0.0.1", int(port))
+    if args.timings_csv:
+        game.timer.open_csv(args.timings_csv)
+    game.timer.visible = args.show_timings
+
+    if args.headless:
+        game.run_headless(args.ticks)
+        if game.recorder:
+            game.recorder.save()
+        game.timer.close()
+        if game.feed:
+            game.feed.close()
+    else:
+        game.run()
@@ -10,40 +10,26 @@ from pygame.locals import *
 import sys
 import math
 import random
-import os
 
-print("Initializing game...")
+from TextCache import text_cache, HudText
+from AssetPack import assets
+from Audio import audio
+from Leaderboard import leaderboard
 
-# Initialize pygame first before doing anything else
-pygame.init()
-print("Pygame initialized")
-
-# Set up display early
+# Screen dimensions
 SCREEN_WIDTH = 1200
 SCREEN_HEIGHT = 900
-print(f"Setting up display: {SCREEN_WIDTH}x{SCREEN_HEIGHT}")
 
 # Try to import OpenGL (use module aliases to avoid wildcard unresolved references)
 try:
     import OpenGL.GL as gl
     import OpenGL.GLU as glu
     has_opengl = True
-    print("OpenGL support enabled")
 except Exception:
-    print("WARNING: PyOpenGL not available. Running in compatibility mode.")
     gl = None
     glu = None
     has_opengl = False
 
-# Set up screen (needs to be done before any texture loading)
-if has_opengl:
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), DOUBLEBUF | OPENGL)
-else:
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    
-pygame.display.set_caption("3D FPS Shooter")
-print("Display initialized")
-
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -64,42 +50,35 @@ CEILING_Y = 5.0
 WALL_HEIGHT = CEILING_Y - FLOOR_Y
 FOV = 60  # Field of view in degrees
 
-# Textures and resources
-SPRITES_DIR = os.path.join(os.path.dirname(__file__), 'sprites')
-
-def load_image(filename, size=None):
-    try:
-        path = os.path.join(SPRITES_DIR, filename)
-        print(f"Loading image: {path}")
-        image = pygame.image.load(path)
-        image = image.convert_alpha() if image.get_flags() & pygame.SRCALPHA else image.convert()
-        if size:
-            image = pygame.transform.scale(image, size)
-        print(f"Image loaded successfully: {filename}")
-        return image
-    except Exception as e:
-        print(f"Error loading image {filename}: {e}")
-        return None
-
-print("Loading textures...")
-# Load textures (display is initialized so convert_alpha works)
-wall_texture = load_image('vaeg.jpg', (256, 256))
-weapon_texture = load_image('skud.png', (128, 128))
-enemy_texture = load_image('fjende.png', (128, 128))
-player_texture = load_image('Spiller.png', (128, 128))
-print("Textures loaded")
-
-# Sound effects
-def load_sound(path):
-    try:
-        return pygame.mixer.Sound(path)
-    except Exception as e:
-        print(f"Error loading sound {path}: {e}")
-        return None
-
-shoot_sound = load_sound('shoot.wav')
-hit_sound = load_sound('hit.wav')
-gameover_sound = load_sound('gameover.wav')
+# Minimap redraws per second, independent of the game frame rate (0 = every frame)
+MINIMAP_REFRESH_RATE = 15
+
+# Textures, loaded on first use from the sprite pack (AssetPack.py build) or the sprites folder
+textures = assets.sprites(wall=('vaeg.jpg', (256, 256)), weapon=('skud.png', (128, 128)),
+                          enemy=('fjende.png', (128, 128)), player=('Spiller.png', (128, 128)))
+
+# Window; importing the module leaves it unset until startup()
+screen = None
+
+def startup():
+    """Initialize pygame, open the window (an OpenGL one when available) and load sounds"""
+    global screen
+    if screen is not None:
+        return screen
+    pygame.init()
+    if has_opengl:
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), DOUBLEBUF | OPENGL)
+    else:
+        print("WARNING: PyOpenGL not available. Running in compatibility mode.")
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("3D FPS Shooter")
+
+    # Sound effects (optional, silent if not found)
+    if audio.init():
+        audio.load("shoot", 'shoot.wav', voices=4)
+        audio.load("hit", 'hit.wav', voices=4)
+        audio.load("gameover", 'gameover.wav', voices=1)
+    return screen
 
 class Vector3:
     """Simple 3D vector class"""
@@ -204,7 +183,7 @@ class Wall:
         self.start = start_pos  # Vector3 for start position
         self.end = end_pos  # Vector3 for end position
         self.height = height
-        self.texture = texture or wall_texture
+        self.texture = texture or textures.wall
         # Calculate wall normal (perpendicular to wall)
         wall_vector = Vector3(end_pos.x - start_pos.x, 0, end_pos.z - start_pos.z)
         self.normal = Vector3(-wall_vector.z, 0, wall_vector.x).normalize()
@@ -324,7 +303,7 @@ class Enemy:
         self.speed = speed
         self.radius = 0.5
         self.height = 1.8
-        self.texture = enemy_texture
+        self.texture = textures.enemy
         self.last_attack_time = 0
         self.attack_cooldown = 1000  # ms
         self.behavior_type = random.choice(["chaser", "flanker", "ambusher"])
@@ -476,8 +455,7 @@ class Enemy:
 
     def hit(self):
         self.health -= 1
-        if hit_sound:
-            hit_sound.play()
+        audio.play("hit")
         return self.health <= 0
 
 class Bullet:
@@ -533,7 +511,7 @@ class Bullet:
 class WeaponViewModel:
     """First-person weapon view"""
     def __init__(self):
-        self.texture = weapon_texture
+        self.texture = textures.weapon
         self.weapon_type = "pistol"
         self.last_shot_time = 0
         self.cooldown = 300  # ms
@@ -557,8 +535,7 @@ class WeaponViewModel:
         self.last_shot_time = current_time
         self.is_shooting = True
         self.shoot_animation = 1.0
-        if shoot_sound:
-            shoot_sound.play()
+        audio.play("shoot")
 
     def draw(self, screen_width, screen_height):
         if self.texture is None:
@@ -583,23 +560,12 @@ class WeaponViewModel:
 class Shooter3D:
     """Main 3D shooter game class"""
     def __init__(self):
-        # Initialize Pygame
-        pygame.init()
-
-        # Set up display
+        # Initialize Pygame and set up the display
         self.screen_width = SCREEN_WIDTH
         self.screen_height = SCREEN_HEIGHT
-        if has_opengl:
-            self.screen = pygame.display.set_mode((self.screen_width, self.screen_height), DOUBLEBUF | OPENGL)
-        else:
-            self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
-
-        pygame.display.set_caption("3D FPS Shooter")
+        self.screen = startup()
 
         # Set up OpenGL if available
-        # Now that display is initialized, load textures
-        self.load_textures()
-
         if has_opengl:
             self.setup_opengl()
 
@@ -611,6 +577,8 @@ class Shooter3D:
         self.running = True
         self.game_over = False
         self.score = 0
+        self.leaderboard = leaderboard()
+        self.result_saved = False
         self.high_score = self.load_high_score()
 
         # Camera and player
@@ -635,10 +603,22 @@ class Shooter3D:
         # UI font
         self.font = pygame.font.Font(None, 36)
         self.small_font = pygame.font.Font(None, 24)
+        self.large_font = pygame.font.Font(None, 72)
+
+        # HUD labels re-render only when their value changes
+        self.health_label = HudText(self.font, "Health: {}", WHITE)
+        self.score_label = HudText(self.font, "Score: {}", WHITE)
+        self.high_score_label = HudText(self.font, "High Score: {}", WHITE)
+        self.level_label = HudText(self.font, "Level: {}", YELLOW)
+        self.fps_label = HudText(self.small_font, "FPS: {}", WHITE)
+        self.overlay = None
 
-        # Initialize minimap
+        # Initialize minimap; walls are baked into a static layer once per level
         self.minimap_size = 150
         self.minimap_surface = pygame.Surface((self.minimap_size, self.minimap_size))
+        self.minimap_layer = None
+        self.minimap_refresh_interval = 1000 / MINIMAP_REFRESH_RATE if MINIMAP_REFRESH_RATE else 0
+        self.last_minimap_update = None
 
         # Game difficulty settings
         self.difficulty = 1.0
@@ -646,13 +626,6 @@ class Shooter3D:
         self.next_level_score = 10
 
 
-    def load_textures(self):
-        # Load game textures after display is initialized
-        global wall_texture, weapon_texture, enemy_texture, player_texture
-        wall_texture = load_image('vaeg.jpg', (256, 256))
-        weapon_texture = load_image('skud.png', (128, 128))
-        enemy_texture = load_image('fjende.png', (128, 128))
-        player_texture = load_image('Spiller.png', (128, 128))
     def setup_opengl(self):
         # Set up the projection matrix
         gl.glMatrixMode(gl.GL_PROJECTION)
@@ -711,18 +684,14 @@ class Shooter3D:
         return walls
 
     def load_high_score(self):
-        try:
-            with open("highscore.txt", "r") as f:
-                return int(f.read().strip())
-        except:
-            return 0
+        return self.leaderboard.best("shooter3d")
 
     def save_high_score(self):
-        try:
-            with open("highscore.txt", "w") as f:
-                f.write(str(max(self.high_score, self.score)))
-        except:
-            pass
+        # Records this game's result once, when it ends or the window is closed
+        if self.result_saved:
+            return
+        self.result_saved = True
+        self.leaderboard.submit("shooter3d", self.score, level=self.level)
 
     def handle_events(self):
         # Mouse movement for looking around
@@ -821,8 +790,7 @@ class Shooter3D:
             if self.health <= 0:
                 self.health = 0
                 self.game_over = True
-                if gameover_sound:
-                    gameover_sound.play()
+                audio.play("gameover")
                 self.save_high_score()
 
     def check_level_up(self):
@@ -841,6 +809,7 @@ class Shooter3D:
 
     def reset_game(self):
         self.game_over = False
+        self.result_saved = False
         self.score = 0
         self.health = 100
         self.max_health = 100
@@ -918,8 +887,7 @@ class Shooter3D:
         health_width = 200 * health_pct
         pygame.draw.rect(self.screen, (50, 50, 50), (10, 10, 200, 20))
         pygame.draw.rect(self.screen, (255, 0, 0), (10, 10, health_width, 20))
-        health_text = self.font.render(f"Health: {int(self.health)}", True, WHITE)
-        self.screen.blit(health_text, (220, 10))
+        self.health_label.draw(self.screen, (220, 10), int(self.health))
 
         # Shield bar
         if self.shield > 0:
@@ -928,12 +896,9 @@ class Shooter3D:
             pygame.draw.rect(self.screen, (0, 0, 255), (10, 40, shield_width, 10))
 
         # Score & level
-        score_text = self.font.render(f"Score: {self.score}", True, WHITE)
-        self.screen.blit(score_text, (10, 50))
-        high_score_text = self.font.render(f"High Score: {self.high_score}", True, WHITE)
-        self.screen.blit(high_score_text, (10, 80))
-        level_text = self.font.render(f"Level: {self.level}", True, YELLOW)
-        self.screen.blit(level_text, (220, 50))
+        self.score_label.draw(self.screen, (10, 50), self.score)
+        self.high_score_label.draw(self.screen, (10, 80), self.high_score)
+        self.level_label.draw(self.screen, (220, 50), self.level)
 
         # Draw weapon view
         self.weapon.draw(self.screen_width, self.screen_height)
@@ -945,31 +910,32 @@ class Shooter3D:
         # Game over screen
         if self.game_over:
             # Create a semi-transparent overlay
-            overlay = pygame.Surface((self.screen_width, self.screen_height), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 150))  # Black with 60% opacity
-            self.screen.blit(overlay, (0, 0))
+            if self.overlay is None:
+                self.overlay = pygame.Surface((self.screen_width, self.screen_height), pygame.SRCALPHA)
+                self.overlay.fill((0, 0, 0, 150))  # Black with 60% opacity
+            self.screen.blit(self.overlay, (0, 0))
 
             # Game over text
-            game_over_text = pygame.font.Font(None, 72).render("GAME OVER", True, RED)
+            game_over_text = text_cache.render(self.large_font, "GAME OVER", RED)
             self.screen.blit(game_over_text,
                 (self.screen_width//2 - game_over_text.get_width()//2,
                 self.screen_height//2 - 60))
 
             # Score text
-            score_text = self.font.render(f"Final Score: {self.score}", True, WHITE)
+            score_text = text_cache.render(self.font, f"Final Score: {self.score}", WHITE)
             self.screen.blit(score_text,
                 (self.screen_width//2 - score_text.get_width()//2,
                 self.screen_height//2))
 
             # High score text
             if self.score >= self.high_score:
-                high_text = self.font.render("NEW HIGH SCORE!", True, YELLOW)
+                high_text = text_cache.render(self.font, "NEW HIGH SCORE!", YELLOW)
                 self.screen.blit(high_text,
                     (self.screen_width//2 - high_text.get_width()//2,
                     self.screen_height//2 + 40))
 
             # Restart text
-            restart_text = self.font.render("Press R to Restart", True, WHITE)
+            restart_text = text_cache.render(self.font, "Press R to Restart", WHITE)
             self.screen.blit(restart_text,
                 (self.screen_width//2 - restart_text.get_width()//2,
                 self.screen_height//2 + 80))
@@ -983,49 +949,55 @@ class Shooter3D:
                         (self.screen_width//2, self.screen_height//2 + 10), 2)
 
         # FPS counter
-        fps_text = self.small_font.render(f"FPS: {int(self.clock.get_fps())}", True, WHITE)
-        self.screen.blit(fps_text, (self.screen_width - 100, self.screen_height - 30))
+        self.fps_label.draw(self.screen, (self.screen_width - 100, self.screen_height - 30),
+                            int(self.clock.get_fps()))
 
-    def update_minimap(self):
-        # Clear minimap
-        self.minimap_surface.fill((0, 0, 0))
+    def build_minimap_layer(self):
+        layer = pygame.Surface((self.minimap_size, self.minimap_size))
+        layer.fill((0, 0, 0))
 
         # Draw border
-        pygame.draw.rect(self.minimap_surface, (100, 100, 100),
+        pygame.draw.rect(layer, (100, 100, 100),
                         (0, 0, self.minimap_size, self.minimap_size), 2)
 
-        # Calculate scale factors
-        scale_x = self.minimap_size / WORLD_SIZE
-        scale_z = self.minimap_size / WORLD_SIZE
-
-        # Calculate offset to center map
-        offset_x = self.minimap_size / 2
-        offset_z = self.minimap_size / 2
-
         # Draw walls
         for wall in self.walls:
             # Convert 3D coordinates to 2D minimap coordinates
-            start_x = int(wall.start.x * scale_x + offset_x)
-            start_z = int(wall.start.z * scale_z + offset_z)
-            end_x = int(wall.end.x * scale_x + offset_x)
-            end_z = int(wall.end.z * scale_z + offset_z)
+            start_x, start_z = self.minimap_point(wall.start)
+            end_x, end_z = self.minimap_point(wall.end)
 
             # Draw line representing wall
-            pygame.draw.line(self.minimap_surface, (150, 150, 150),
+            pygame.draw.line(layer, (150, 150, 150),
                             (start_x, start_z), (end_x, end_z), 2)
 
+        return layer
+
+    def minimap_point(self, position):
+        # Scale world coordinates and offset to center the map
+        scale = self.minimap_size / WORLD_SIZE
+        offset = self.minimap_size / 2
+        return int(position.x * scale + offset), int(position.z * scale + offset)
+
+    def update_minimap(self):
+        if self.minimap_layer is None:
+            self.minimap_layer = self.build_minimap_layer()
+
+        # Skip the redraw until the refresh interval has passed
+        current_time = pygame.time.get_ticks()
+        if (self.last_minimap_update is not None and
+                current_time - self.last_minimap_update < self.minimap_refresh_interval):
+            return
+        self.last_minimap_update = current_time
+
+        self.minimap_surface.blit(self.minimap_layer, (0, 0))
+
         # Draw enemies
         for enemy in self.enemies:
-            # Convert 3D coordinates to 2D minimap coordinates
-            x = int(enemy.position.x * scale_x + offset_x)
-            z = int(enemy.position.z * scale_z + offset_z)
-
             # Draw dot representing enemy
-            pygame.draw.circle(self.minimap_surface, RED, (x, z), 3)
+            pygame.draw.circle(self.minimap_surface, RED, self.minimap_point(enemy.position), 3)
 
         # Draw player
-        player_x = int(self.camera.position.x * scale_x + offset_x)
-        player_z = int(self.camera.position.z * scale_z + offset_z)
+        player_x, player_z = self.minimap_point(self.camera.position)
         pygame.draw.circle(self.minimap_surface, GREEN, (player_x, player_z), 4)
 
         # Draw player direction
@@ -1037,6 +1009,9 @@ class Shooter3D:
     def run(self):
         # Main game loop
         while self.running:
+            # Each frame is one tick for sound coalescing
+            audio.new_tick()
+
             # Process events and input
             self.handle_events()
 
@@ -1053,6 +1028,7 @@ class Shooter3D:
             self.clock.tick(self.fps)
 
         # Clean up
+        self.save_high_score()
         pygame.quit()
         sys.exit()
 
@@ -0,0 +1,139 @@
+"""
+Shooter self play. Batch runner for the scripted bot.
+- Plays many seeded headless games with BotController across a process pool
+- Aggregates score, survival time, level reached and kills per weapon
+- --set patches WEAPON_TYPES or Shooter constants in every worker, for tuning runs
+"""
+
+import ast
+import json
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import Shooter
+from Controllers import BotController
+from Leaderboard import leaderboard
+
+
+def apply_overrides(overrides):
+    """Apply "weapon.key=value" (WEAPON_TYPES) or "NAME=value" (Shooter constant) settings"""
+    for setting in overrides:
+        name, _, value = setting.partition("=")
+        value = ast.literal_eval(value)
+        if "." in name:
+            weapon, key = name.split(".", 1)
+            if weapon not in Shooter.WEAPON_TYPES:
+                raise ValueError(f"unknown weapon {weapon!r} in {setting!r}")
+            Shooter.WEAPON_TYPES[weapon][key] = value
+        elif hasattr(Shooter, name):
+            setattr(Shooter, name, value)
+        else:
+            raise ValueError(f"Shooter has no setting {name!r}")
+
+
+def play_game(seed, max_ticks=36000, use_projectiles=False, batch_enemies=False, board=None):
+    """One bot game until game over or max_ticks; returns its statistics"""
+    game = Shooter.Game(controller=BotController(), headless=True, seed=seed,
+                        use_projectiles=use_projectiles, batch_enemies=batch_enemies)
+    if board:
+        game.leaderboard = leaderboard(board)
+    while not game.game_over and game.sim_clock.tick < max_ticks:
+        game.update()
+    # Games cut off at max_ticks are recorded too
+    game.save_high_score()
+    return {
+        "seed": seed,
+        "score": game.score,
+        "seconds": game.sim_clock.seconds,
+        "died": game.game_over,
+        "level": game.level,
+        "kills": dict(game.kills),
+        "weapons": list(game.player.weapons_owned),
+    }
+
+
+def _play(args):
+    return play_game(*args)
+
+
+def summarize(results):
+    scores = [r["score"] for r in results]
+    seconds = [r["seconds"] for r in results]
+    levels = {}
+    kills, owned = {}, {}
+    for r in results:
+        levels[r["level"]] = levels.get(r["level"], 0) + 1
+        for weapon, count in r["kills"].items():
+            kills[weapon] = kills.get(weapon, 0) + count
+        for weapon in r["weapons"]:
+            owned[weapon] = owned.get(weapon, 0) + 1
+    quantiles = statistics.quantiles(scores, n=10) if len(scores) > 1 else scores * 9
+    return {
+        "games": len(results),
+        "died": sum(r["died"] for r in results),
+        "score_mean": statistics.fmean(scores),
+        "score_median": statistics.median(scores),
+        "score_p10": quantiles[0],
+        "score_p90": quantiles[-1],
+        "survival_mean_s": statistics.fmean(seconds),
+        "survival_median_s": statistics.median(seconds),
+        "levels": dict(sorted(levels.items())),
+        "kills_per_weapon": kills,
+        # Kills per game in which the weapon was owned, so late pickups are not penalized
+        "kills_per_game_owned": {w: kills.get(w, 0) / owned[w] for w in owned},
+    }
+
+
+def run(games, first_seed=0, workers=None, max_ticks=36000, use_projectiles=False,
+        batch_enemies=False, overrides=(), chunksize=4, board=None):
+    apply_overrides(overrides)
+    jobs = [(seed, max_ticks, use_projectiles, batch_enemies, board)
+            for seed in range(first_seed, first_seed + games)]
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=apply_overrides,
+                             initargs=(list(overrides),)) as pool:
+        for i, result in enumerate(pool.map(_play, jobs, chunksize=chunksize), 1):
+            results.append(result)
+            if i % 100 == 0:
+                print(f"{i}/{games} games, {time.perf_counter() - start:.0f}s")
+    summary = summarize(results)
+    summary["wall_seconds"] = time.perf_counter() - start
+    summary["settings"] = list(overrides)
+    return summary, results
+
+
+def report(summary):
+    print(f"{summary['games']} games in {summary['wall_seconds']:.1f}s, {summary['died']} ended in death")
+    print(f"score: mean {summary['score_mean']:.1f}, median {summary['score_median']:.0f}, "
+          f"p10 {summary['score_p10']:.0f}, p90 {summary['score_p90']:.0f}")
+    print(f"survival: mean {summary['survival_mean_s']:.1f}s, median {summary['survival_median_s']:.1f}s")
+    print("levels reached: " + ", ".join(f"{level}: {n}" for level, n in summary["levels"].items()))
+    print("kills per weapon: " + ", ".join(
+        f"{w} {n} ({summary['kills_per_game_owned'].get(w, 0):.1f}/game owned)"
+        for w, n in sorted(summary["kills_per_weapon"].items(), key=lambda item: -item[1])))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run seeded headless bot games in parallel")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-ticks", type=int, default=36000, help="cut games off after this many ticks")
+    parser.add_argument("--projectiles", action="store_true", help="use the NumPy projectile engine")
+    parser.add_argument("--batch-enemies", action="store_true", help="update enemy AI as one NumPy batch")
+    parser.add_argument("--set", action="append", default=[], metavar="SETTING",
+                        help='override for every game, e.g. "machine_gun.damage=0.75" or "DIFFICULTY_STEP=0.3"')
+    parser.add_argument("--json", metavar="PATH", help="write the summary and every game's result")
+    parser.add_argument("--leaderboard", metavar="PATH", help="record every game in this leaderboard database")
+    args = parser.parse_args()
+
+    summary, results = run(args.games, args.seed, args.workers, args.max_ticks, args.projectiles,
+                           args.batch_enemies, args.set, board=args.leaderboard)
+    report(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "games": results}, f, indent=2)
+        print(f"results written to {args.json}")
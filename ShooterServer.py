@@ -0,0 +1,549 @@
+"""
+Authoritative network server for the Shooter game.
+- asyncio UDP server; every client that joins gets a player in one shared Game,
+  ticked at a fixed rate on the server from the input masks the clients send
+- At most MAX_SESSIONS players; malformed, conflicting or surplus JOINs get a REJECT
+- Snapshots are quantized and XOR-delta encoded against the last snapshot the
+  client acknowledged, then compressed
+- A pygame client to play on it, and a loopback load generator that reports
+  bandwidth and server tick time per player
+"""
+
+import asyncio
+import math
+import struct
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+
+import pygame
+
+from Controllers import RemoteController, ScriptedController, keys_to_mask
+
+# Message types
+JOIN, INPUT, LEAVE = 1, 2, 3
+WELCOME, SNAPSHOT, MAP, REJECT = 10, 11, 12, 13
+
+# Why a JOIN was turned down
+REJECT_MALFORMED, REJECT_FULL, REJECT_SEED, REJECT_DUPLICATE = 1, 2, 3, 4
+REJECT_REASONS = {REJECT_MALFORMED: "malformed join", REJECT_FULL: "server full",
+                  REJECT_SEED: "the world runs another seed", REJECT_DUPLICATE: "already joined with another seed"}
+
+JOIN_MSG = struct.Struct("<BI")         # type, seed (RANDOM_SEED for any)
+INPUT_MSG = struct.Struct("<BIIHH")     # type, input seq, acked snapshot, key mask, map version
+WELCOME_MSG = struct.Struct("<BIIHH")   # type, client id, seed, map width, map height
+SNAPSHOT_MSG = struct.Struct("<BIII")   # type, seq, base seq (0 = full), raw length
+MAP_MSG = struct.Struct("<BHH")         # type, map version, rect count
+REJECT_MSG = struct.Struct("<BB")       # type, reason
+RECT = struct.Struct("<4H")
+RANDOM_SEED = 0xFFFFFFFF
+
+# tick, score, level, game over, player x, y, angle, health, shield, weapon,
+# enemy, bullet, enemy bullet, powerup and other player counts
+SNAP_HEADER = struct.Struct("<IiBBHHBhBBHHHBB")
+POS_SCALE = 16          # Positions travel as 1/16 pixel in 16 bits
+HISTORY = 64            # Sent snapshots kept per client as delta bases
+CLIENT_TIMEOUT = 5.0    # Seconds without a packet before a client is dropped
+MAX_SESSIONS = 16       # Players in the shared world
+
+WEAPONS = ("pistol", "shotgun", "machine_gun", "sniper")
+BEHAVIORS = ("chaser", "flanker", "ambusher")
+POWERUPS = ("health", "speed", "shield", "weapon", "score_multiplier")
+
+
+def qpos(value):
+    return min(max(int(round(value * POS_SCALE)), 0), 0xFFFF)
+
+
+def qangle(angle):
+    return int(round((angle % 360) * 256 / 360)) & 0xFF
+
+
+def bullet_columns(bullets):
+    """x, y and angle lists of the live bullets of a Pool or a ProjectileSystem"""
+    if hasattr(bullets, "vx"):
+        live = bullets.alive[:bullets.count]
+        return (bullets.x[:bullets.count][live].tolist(), bullets.y[:bullets.count][live].tolist(),
+                bullets.angle[:bullets.count][live].tolist())
+    return [b.x for b in bullets], [b.y for b in bullets], [b.angle for b in bullets]
+
+
+def encode_snapshot(game, player=None):
+    """Quantized game state as column arrays, so unchanged fields line up between snapshots.
+    The header describes player (the first one by default), the others follow as columns"""
+    player = player or game.player
+    others = [p for p in game.players if p is not player]
+    enemies = game.enemies
+    bullets = bullet_columns(game.bullets)
+    enemy_bullets = bullet_columns(game.enemy_bullets)
+    powerups = list(game.powerups)
+    parts = [SNAP_HEADER.pack(
+        game.sim_clock.tick, game.score, min(game.level, 255), game.game_over,
+        qpos(player.x), qpos(player.y), qangle(player.angle),
+        max(-32768, min(32767, int(player.health))), min(int(player.shield), 255),
+        WEAPONS.index(player.weapon), len(enemies), len(bullets[0]), len(enemy_bullets[0]), len(powerups),
+        len(others))]
+    parts.append(array("H", [qpos(e.x) for e in enemies]).tobytes())
+    parts.append(array("H", [qpos(e.y) for e in enemies]).tobytes())
+    parts.append(bytes(qangle(e.angle) for e in enemies))
+    # Half-point health, since machine gun bullets do 0.5 damage
+    parts.append(bytes(min(max(int(e.health * 2), 0), 255) for e in enemies))
+    parts.append(bytes(BEHAVIORS.index(e.behavior_type) for e in enemies))
+    for xs, ys, angles in (bullets, enemy_bullets):
+        parts.append(array("H", [qpos(x) for x in xs]).tobytes())
+        parts.append(array("H", [qpos(y) for y in ys]).tobytes())
+        parts.append(bytes(qangle(a) for a in angles))
+    parts.append(array("H", [qpos(p.x) for p in powerups]).tobytes())
+    parts.append(array("H", [qpos(p.y) for p in powerups]).tobytes())
+    parts.append(bytes(POWERUPS.index(p.type) for p in powerups))
+    parts.append(array("H", [qpos(p.x) for p in others]).tobytes())
+    parts.append(array("H", [qpos(p.y) for p in others]).tobytes())
+    parts.append(bytes(qangle(p.angle) for p in others))
+    # Other players' health as a percentage, enough to draw them up or down
+    parts.append(bytes(min(max(math.ceil(p.health * 100 / p.max_health), 0), 100) for p in others))
+    return b"".join(parts)
+
+
+def decode_snapshot(raw):
+    """Inverse of encode_snapshot, as a dict of plain values and lists"""
+    (tick, score, level, game_over, px, py, pangle, health, shield, weapon,
+     n_enemies, n_bullets, n_enemy_bullets, n_powerups, n_others) = SNAP_HEADER.unpack_from(raw)
+    offset = SNAP_HEADER.size
+
+    def positions(n):
+        nonlocal offset
+        values = array("H")
+        values.frombytes(raw[offset:offset + 2 * n])
+        offset += 2 * n
+        return [v / POS_SCALE for v in values]
+
+    def small(n):
+        nonlocal offset
+        values = raw[offset:offset + n]
+        offset += n
+        return list(values)
+
+    def angles(n):
+        return [a * 360 / 256 for a in small(n)]
+
+    snapshot = {
+        "tick": tick, "score": score, "level": level, "game_over": bool(game_over),
+        "player": {"x": px / POS_SCALE, "y": py / POS_SCALE, "angle": pangle * 360 / 256,
+                   "health": health, "shield": shield, "weapon": WEAPONS[weapon]},
+    }
+    snapshot["enemies"] = list(zip(positions(n_enemies), positions(n_enemies), angles(n_enemies),
+                                   [h / 2 for h in small(n_enemies)],
+                                   [BEHAVIORS[b] for b in small(n_enemies)]))
+    snapshot["bullets"] = list(zip(positions(n_bullets), positions(n_bullets), angles(n_bullets)))
+    snapshot["enemy_bullets"] = list(zip(positions(n_enemy_bullets), positions(n_enemy_bullets),
+                                         angles(n_enemy_bullets)))
+    snapshot["powerups"] = list(zip(positions(n_powerups), positions(n_powerups),
+                                    [POWERUPS[t] for t in small(n_powerups)]))
+    snapshot["others"] = list(zip(positions(n_others), positions(n_others), angles(n_others), small(n_others)))
+    return snapshot
+
+
+def xor_bytes(data, base):
+    # XOR against the base, zero-padded or cut to this length; unchanged bytes become zeros
+    n = len(data)
+    base = base[:n].ljust(n, b"\0")
+    return (int.from_bytes(data, "little") ^ int.from_bytes(base, "little")).to_bytes(n, "little")
+
+
+def delta_encode(raw, base=None):
+    return zlib.compress(raw if base is None else xor_bytes(raw, base), 1)
+
+
+def delta_decode(payload, base=None):
+    data = zlib.decompress(payload)
+    return data if base is None else xor_bytes(data, base)
+
+
+class ClientSession:
+    """One connected client and the player it controls in the shared world"""
+    def __init__(self, client_id, addr, seed):
+        self.id = client_id
+        self.addr = addr
+        self.seed = seed            # As asked for in the JOIN, to tell a resend from a conflicting one
+        self.controller = RemoteController()
+        self.input_seq = 0
+        self.acked = 0
+        self.sent = OrderedDict()   # snapshot seq -> raw snapshot, the possible delta bases
+        self.next_seq = 1
+        self.client_map_version = 0
+        self.last_heard = time.monotonic()
+        self.bytes_sent = 0
+        self.snapshots = 0
+        self.full_snapshots = 0
+        self.encode_time = 0.0
+
+
+class ShooterServer(asyncio.DatagramProtocol):
+    """Authoritative simulation: clients only send input, the server owns the one Game they share"""
+    def __init__(self, snapshot_every=2, use_projectiles=False, batch_enemies=False, timeout=CLIENT_TIMEOUT,
+                 max_sessions=MAX_SESSIONS):
+        from Shooter import TICK_RATE
+        self.tick_rate = TICK_RATE
+        self.snapshot_every = snapshot_every    # Ticks between snapshots (2 = 30 per second)
+        self.use_projectiles = use_projectiles
+        self.batch_enemies = batch_enemies
+        self.timeout = timeout
+        self.max_sessions = max_sessions
+        self.sessions = {}                      # addr -> ClientSession
+        self.game = None                        # Created by the first JOIN, dropped when the last player leaves
+        self.seed = None                        # The world's first seed; restarts move on from it
+        self.obstacles = None
+        self.map_version = 0
+        self.next_id = 1
+        self.transport = None
+        self.running = False
+        self.ticks = 0
+        self.tick_time = 0.0
+        self.update_time = 0.0
+        self.dropped = 0
+        self.rejected = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if not data:
+            return
+        kind = data[0]
+        session = self.sessions.get(addr)
+        if kind == JOIN:
+            self.handle_join(data, addr, session)
+        elif kind == INPUT and session and len(data) == INPUT_MSG.size:
+            _, seq, acked, mask, map_version = INPUT_MSG.unpack(data)
+            session.last_heard = time.monotonic()
+            # Datagrams may arrive out of order; only newer input counts
+            if seq > session.input_seq:
+                session.input_seq = seq
+                session.controller.set_mask(mask)
+            if acked > session.acked:
+                session.acked = acked
+            session.client_map_version = map_version
+        elif kind == LEAVE and session:
+            self.leave(addr)
+
+    def handle_join(self, data, addr, session):
+        if len(data) != JOIN_MSG.size:
+            return self.reject(addr, REJECT_MALFORMED)
+        seed = JOIN_MSG.unpack(data)[1]
+        if session is not None:
+            # The same JOIN again means our WELCOME was lost; anything else is a second join
+            if seed != session.seed:
+                return self.reject(addr, REJECT_DUPLICATE)
+        elif len(self.sessions) >= self.max_sessions:
+            return self.reject(addr, REJECT_FULL)
+        elif self.game is not None and seed not in (RANDOM_SEED, self.seed):
+            return self.reject(addr, REJECT_SEED)
+        else:
+            session = self.join(addr, seed)
+        from Shooter import SCREEN_WIDTH, SCREEN_HEIGHT
+        self.transport.sendto(WELCOME_MSG.pack(WELCOME, session.id, self.game.seed,
+                                               SCREEN_WIDTH, SCREEN_HEIGHT), addr)
+
+    def reject(self, addr, reason):
+        self.rejected += 1
+        self.transport.sendto(REJECT_MSG.pack(REJECT, reason), addr)
+
+    def join(self, addr, seed):
+        session = self.sessions[addr] = ClientSession(self.next_id, addr, seed)
+        self.next_id += 1
+        if self.game is None:
+            # The first player picks the seed of the world everyone after joins
+            from Shooter import Game
+            self.game = Game(controller=session.controller, headless=True,
+                             seed=None if seed == RANDOM_SEED else seed,
+                             use_projectiles=self.use_projectiles, batch_enemies=self.batch_enemies)
+            self.seed = self.game.seed
+        else:
+            self.game.add_player(session.controller)
+        return session
+
+    def leave(self, addr):
+        session = self.sessions.pop(addr)
+        if not self.sessions:
+            self.game = None
+            self.obstacles = None
+        else:
+            self.game.remove_player(session.controller)
+
+    def tick(self):
+        """Advance the shared world one tick and send the snapshots that are due"""
+        start = time.perf_counter()
+        self.ticks += 1
+        send = self.ticks % self.snapshot_every == 0
+        now = time.monotonic()
+        for addr, session in list(self.sessions.items()):
+            if now - session.last_heard > self.timeout:
+                self.leave(addr)
+                self.dropped += 1
+        game = self.game
+        if game is not None:
+            game.update()
+            self.update_time += time.perf_counter() - start
+            if game.obstacles is not self.obstacles:
+                # First tick, or restarted on a new map
+                self.obstacles = game.obstacles
+                self.map_version = self.map_version % 0xFFFF + 1
+            if send:
+                for session in self.sessions.values():
+                    t0 = time.perf_counter()
+                    self.send_snapshot(session)
+                    session.encode_time += time.perf_counter() - t0
+        self.tick_time += time.perf_counter() - start
+
+    def send_snapshot(self, session):
+        raw = encode_snapshot(self.game, self.game.player_of(session.controller))
+        # Delta against the newest snapshot the client has confirmed, if still kept
+        base = session.sent.get(session.acked)
+        base_seq = session.acked if base is not None else 0
+        seq = session.next_seq
+        session.next_seq += 1
+        session.sent[seq] = raw
+        if len(session.sent) > HISTORY:
+            session.sent.popitem(last=False)
+        packet = SNAPSHOT_MSG.pack(SNAPSHOT, seq, base_seq, len(raw)) + delta_encode(raw, base)
+        self.transport.sendto(packet, session.addr)
+        session.bytes_sent += len(packet)
+        session.snapshots += 1
+        session.full_snapshots += base is None
+        if session.client_map_version != self.map_version:
+            # Repeated with every snapshot until the client reports this version
+            rects = [tuple(obs.rect) for obs in self.obstacles]
+            packet = MAP_MSG.pack(MAP, self.map_version, len(rects)) + b"".join(
+                RECT.pack(*rect) for rect in rects)
+            self.transport.sendto(packet, session.addr)
+            session.bytes_sent += len(packet)
+
+    async def run(self):
+        """Tick at the game's fixed rate; a late tick is caught up, a long stall is skipped"""
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.tick_rate
+        next_tick = loop.time()
+        self.running = True
+        while self.running:
+            self.tick()
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < -5 * interval:
+                next_tick = loop.time()
+            await asyncio.sleep(max(0.0, delay))
+
+    def stop(self):
+        self.running = False
+
+
+class ShooterClient(asyncio.DatagramProtocol):
+    """Client side: joins, sends input masks, reassembles snapshots from deltas"""
+    def __init__(self, seed=None):
+        self.seed = RANDOM_SEED if seed is None else seed
+        self.transport = None
+        self.id = None
+        self.size = None
+        self.input_seq = 0
+        self.received = OrderedDict()   # seq -> raw snapshot, bases for later deltas
+        self.latest = 0
+        self.snapshot = None
+        self.map_version = 0
+        self.obstacles = []
+        self.bytes_received = 0
+        self.missing_base = 0
+        self.rejected = None            # Reason code once the server turned the JOIN down
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.join()
+
+    def join(self):
+        self.transport.sendto(JOIN_MSG.pack(JOIN, self.seed))
+
+    def datagram_received(self, data, addr):
+        self.bytes_received += len(data)
+        kind = data[0]
+        if kind == WELCOME:
+            _, self.id, self.seed, width, height = WELCOME_MSG.unpack(data)
+            self.size = (width, height)
+        elif kind == REJECT and self.id is None:
+            self.rejected = REJECT_MSG.unpack(data)[1]
+        elif kind == SNAPSHOT:
+            _, seq, base_seq, length = SNAPSHOT_MSG.unpack_from(data)
+            if seq <= self.latest:
+                return
+            base = None
+            if base_seq:
+                base = self.received.get(base_seq)
+                if base is None:
+                    # Base already dropped here; the server falls back once our ack moves on
+                    self.missing_base += 1
+                    return
+            raw = delta_decode(data[SNAPSHOT_MSG.size:], base)
+            self.received[seq] = raw
+            if len(self.received) > HISTORY:
+                self.received.popitem(last=False)
+            self.latest = seq
+            self.snapshot = raw
+        elif kind == MAP:
+            _, version, count = MAP_MSG.unpack_from(data)
+            if version != self.map_version:
+                self.map_version = version
+                self.obstacles = [RECT.unpack_from(data, MAP_MSG.size + RECT.size * i) for i in range(count)]
+
+    def send_input(self, mask):
+        if self.rejected:
+            return
+        if self.id is None:
+            self.join()
+            return
+        self.input_seq += 1
+        self.transport.sendto(INPUT_MSG.pack(INPUT, self.input_seq, self.latest, mask, self.map_version))
+
+    def leave(self):
+        self.transport.sendto(bytes([LEAVE]))
+
+
+def draw_snapshot(surface, font, client):
+    """Minimal renderer for a decoded snapshot: shapes instead of sprites"""
+    surface.fill((0, 0, 0))
+    for rect in client.obstacles:
+        pygame.draw.rect(surface, (100, 100, 100), rect)
+    if client.snapshot is None:
+        return
+    state = decode_snapshot(client.snapshot)
+    colors = {"chaser": (255, 100, 100), "flanker": (100, 255, 100), "ambusher": (100, 100, 255)}
+    for x, y, kind in state["powerups"]:
+        pygame.draw.rect(surface, (255, 165, 0), (x - 10, y - 10, 20, 20))
+    for x, y, _ in state["bullets"] + state["enemy_bullets"]:
+        pygame.draw.circle(surface, (255, 255, 0), (int(x), int(y)), 4)
+    for x, y, angle, health, behavior in state["enemies"]:
+        pygame.draw.circle(surface, colors[behavior], (int(x), int(y)), 25)
+    for x, y, angle, health in state["others"]:
+        pygame.draw.circle(surface, (0, 160, 255) if health > 0 else (80, 80, 80), (int(x), int(y)), 20)
+    player = state["player"]
+    px, py = player["x"], player["y"]
+    pygame.draw.circle(surface, (0, 255, 0), (int(px), int(py)), 20)
+    pygame.draw.line(surface, (255, 255, 255), (px, py), (px + 25 * math.cos(math.radians(player["angle"])),
+                                                        py + 25 * math.sin(math.radians(player["angle"]))), 3)
+    hud = (f"Health: {player['health']}  Score: {state['score']}  Level: {state['level']}  "
+           f"Weapon: {player['weapon']}" + ("  GAME OVER - Enter to restart" if state["game_over"] else ""))
+    surface.blit(font.render(hud, True, (255, 255, 255)), (10, 10))
+
+
+async def play(host, port, seed=None):
+    """Join a server and play with the keyboard"""
+    pygame.init()
+    loop = asyncio.get_running_loop()
+    transport, client = await loop.create_datagram_endpoint(lambda: ShooterClient(seed), remote_addr=(host, port))
+    screen = None
+    font = pygame.font.Font(None, 28)
+    clock = pygame.time.Clock()
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+        if client.rejected:
+            print(f"server rejected the join: {REJECT_REASONS.get(client.rejected, client.rejected)}")
+            running = False
+        if screen is None and client.size:
+            screen = pygame.display.set_mode(client.size)
+            pygame.display.set_caption(f"Shooter client {client.id}")
+        client.send_input(keys_to_mask(pygame.key.get_pressed()) if screen else 0)
+        if screen:
+            draw_snapshot(screen, font, client)
+            pygame.display.flip()
+        clock.tick(60)
+        await asyncio.sleep(0)
+    client.leave()
+    transport.close()
+    pygame.quit()
+
+
+async def load_test(clients=MAX_SESSIONS, seconds=10.0, snapshot_every=2, use_projectiles=False,
+                    batch_enemies=False, seed=1):
+    """Run a server and clients on loopback in one process and report cost per player"""
+    loop = asyncio.get_running_loop()
+    server = ShooterServer(snapshot_every, use_projectiles, batch_enemies, max_sessions=clients)
+    server_transport, _ = await loop.create_datagram_endpoint(lambda: server, local_addr=("127.0.0.1", 0))
+    address = server_transport.get_extra_info("sockname")
+    # Everyone joins the same world
+    endpoints = [await loop.create_datagram_endpoint(lambda: ShooterClient(seed), remote_addr=address)
+                 for _ in range(clients)]
+    # Every simulated player plays the patrol script, restarting after game over
+    script = [keys_to_mask(keys) for keys in ScriptedController.patrol().frames]
+    server_task = asyncio.ensure_future(server.run())
+
+    start = time.perf_counter()
+    frame = 0
+    while time.perf_counter() - start < seconds:
+        for i, (_, client) in enumerate(endpoints):
+            client.send_input(script[(frame + i * 7) % len(script)])
+        frame += 1
+        await asyncio.sleep(1 / 60)
+    elapsed = time.perf_counter() - start
+    server.stop()
+    await server_task
+
+    sessions = list(server.sessions.values())
+    players = max(1, len(sessions))
+    ticks = max(1, server.ticks)
+    sent = sum(s.bytes_sent for s in sessions)
+    snapshots = sum(s.snapshots for s in sessions)
+    full = sum(s.full_snapshots for s in sessions)
+    raw_sizes = [len(encode_snapshot(server.game, server.game.player_of(s.controller))) for s in sessions]
+    print(f"{len(sessions)} players, {server.ticks} ticks in {elapsed:.1f}s "
+          f"({server.ticks / elapsed:.1f} ticks/s, target {server.tick_rate})")
+    print(f"server tick: {server.tick_time * 1000 / ticks:.2f} ms, "
+          f"{server.tick_time * 1000 / ticks / players:.3f} ms per player "
+          f"(update {server.update_time * 1000 / ticks / players:.3f}, "
+          f"encode+send {sum(s.encode_time for s in sessions) * 1000 / ticks / players:.3f})")
+    print(f"downstream: {sent / elapsed / players / 1024:.2f} KiB/s per player, "
+          f"{sent / max(1, snapshots):.0f} B per snapshot ({full} of {snapshots} full), "
+          f"raw snapshot {sum(raw_sizes) / players:.0f} B")
+    print(f"clients: {sum(c.missing_base for _, c in endpoints)} deltas without a base, "
+          f"{sum(c.snapshot is not None for _, c in endpoints)} of {clients} receiving, "
+          f"{server.rejected} joins rejected")
+    for transport, client in endpoints:
+        client.leave()
+        transport.close()
+    server_transport.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Shooter authoritative server")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="run the server")
+    serve.add_argument("--host", default="127.0.0.1", help="address to listen on; 0.0.0.0 for other machines")
+    serve.add_argument("--port", type=int, default=47800)
+    serve.add_argument("--max-sessions", type=int, default=MAX_SESSIONS, help="players allowed in the world")
+    client = sub.add_parser("play", help="join a server with a window and the keyboard")
+    client.add_argument("--host", default="127.0.0.1")
+    client.add_argument("--port", type=int, default=47800)
+    client.add_argument("--seed", type=int, default=None)
+    load = sub.add_parser("load", help="loopback load test with simulated clients")
+    load.add_argument("--clients", type=int, default=MAX_SESSIONS)
+    load.add_argument("--seconds", type=float, default=10.0)
+    for command in (serve, load):
+        command.add_argument("--snapshot-every", type=int, default=2, help="ticks between snapshots")
+        command.add_argument("--projectiles", action="store_true", help="use the NumPy projectile engine")
+        command.add_argument("--batch-enemies", action="store_true", help="update enemy AI as one NumPy batch")
+    args = parser.parse_args()
+
+    if args.command == "play":
+        asyncio.run(play(args.host, args.port, args.seed))
+    elif args.command == "load":
+        asyncio.run(load_test(args.clients, args.seconds, args.snapshot_every,
+                              args.projectiles, args.batch_enemies))
+    else:
+        async def main():
+            server = ShooterServer(args.snapshot_every, args.projectiles, args.batch_enemies,
+                                   max_sessions=args.max_sessions)
+            await asyncio.get_running_loop().create_datagram_endpoint(
+                lambda: server, local_addr=(args.host, args.port))
+            print(f"serving on {args.host}:{args.port}")
+            await server.run()
+        asyncio.run(main())
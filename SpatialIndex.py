@@ -0,0 +1,231 @@
+"""
+Spatial indexing for the Shooter game.
+- SpatialHash: uniform grid for moving entities, rebuilt every tick
+- ObstacleIndex: static grid over the obstacles, built once per map
+"""
+
+import math
+import random
+import time
+
+
+class SpatialHash:
+    """Uniform grid hash for broadphase queries on moving entities"""
+    def __init__(self, cell_size=100):
+        self.cell_size = cell_size
+        self.cells = {}
+        # Entities are stored by their center only, so queries are widened
+        # by the largest radius inserted since the last clear.
+        self.max_radius = 0
+
+    def clear(self):
+        # Buckets are emptied rather than dropped, so rebuilding every tick reuses them
+        for bucket in self.cells.values():
+            bucket.clear()
+        self.max_radius = 0
+
+    def cell_of(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, obj, x, y, radius=0):
+        key = self.cell_of(x, y)
+        bucket = self.cells.get(key)
+        if bucket is None:
+            self.cells[key] = [obj]
+        else:
+            bucket.append(obj)
+        if radius > self.max_radius:
+            self.max_radius = radius
+
+    def remove(self, obj, x, y):
+        bucket = self.cells.get(self.cell_of(x, y))
+        if bucket and obj in bucket:
+            bucket.remove(obj)
+
+    def rebuild(self, entities):
+        # Entities need x, y and radius attributes (Enemy, Bullet, Powerup, Player)
+        self.clear()
+        # insert() inlined; this runs over every enemy every tick
+        cells, size = self.cells, self.cell_size
+        max_radius = 0
+        for entity in entities:
+            key = (int(entity.x // size), int(entity.y // size))
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [entity]
+            else:
+                bucket.append(entity)
+            if entity.radius > max_radius:
+                max_radius = entity.radius
+        self.max_radius = max_radius
+
+    def query(self, x, y, radius=0):
+        """Return every entity whose cell lies within radius (+ max radius) of (x, y)"""
+        reach = radius + self.max_radius
+        size = self.cell_size
+        min_cx = int((x - reach) // size)
+        max_cx = int((x + reach) // size)
+        min_cy = int((y - reach) // size)
+        max_cy = int((y + reach) // size)
+
+        cells = self.cells
+        found = []
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+    def colliding(self, x, y, radius):
+        """Return the entities whose circle overlaps the circle at (x, y)"""
+        return [e for e in self.query(x, y, radius)
+                if math.hypot(e.x - x, e.y - y) < e.radius + radius]
+
+
+class ObstacleIndex:
+    """Static uniform grid over the map obstacles, built once per map"""
+    def __init__(self, obstacles, cell_size=100):
+        self.obstacles = list(obstacles)
+        self.cell_size = cell_size
+        self.cells = {}
+        for obs in self.obstacles:
+            rect = obs.rect
+            # One pixel of slack since Obstacle.collides works from the integer rect center
+            for key in self._cell_range(rect.left - 1, rect.top - 1, rect.right + 1, rect.bottom + 1):
+                self.cells.setdefault(key, []).append(obs)
+
+    def __iter__(self):
+        return iter(self.obstacles)
+
+    def __len__(self):
+        return len(self.obstacles)
+
+    def _cell_range(self, left, top, right, bottom):
+        size = self.cell_size
+        for cx in range(int(left // size), int(right // size) + 1):
+            for cy in range(int(top // size), int(bottom // size) + 1):
+                yield cx, cy
+
+    def collides(self, x, y, radius):
+        cells = self.cells
+        for key in self._cell_range(x - radius, y - radius, x + radius, y + radius):
+            bucket = cells.get(key)
+            if bucket:
+                for obs in bucket:
+                    if obs.collides(x, y, radius):
+                        return True
+        return False
+
+
+def obstacle_index(obstacles):
+    """Return obstacles as an ObstacleIndex, indexing plain lists on the fly"""
+    if isinstance(obstacles, ObstacleIndex):
+        return obstacles
+    return ObstacleIndex(obstacles or [])
+
+
+class _Dot:
+    # Lightweight stand-in for game entities in the benchmark
+    __slots__ = ("x", "y", "radius")
+
+    def __init__(self, x, y, radius):
+        self.x = x
+        self.y = y
+        self.radius = radius
+
+
+def _naive_pairs(bullets, enemies):
+    hits = 0
+    for b in bullets:
+        for e in enemies:
+            if math.hypot(b.x - e.x, b.y - e.y) < e.radius + b.radius:
+                hits += 1
+                break
+    return hits
+
+
+def _hashed_pairs(bullets, enemies, grid):
+    grid.rebuild(enemies)
+    hits = 0
+    for b in bullets:
+        if grid.colliding(b.x, b.y, b.radius):
+            hits += 1
+    return hits
+
+
+class _Box:
+    # Stand-in for Shooter.Obstacle with the same circle-rectangle test
+    def __init__(self, x, y, w, h):
+        import pygame
+        self.rect = pygame.Rect(x, y, w, h)
+
+    def collides(self, x, y, radius):
+        circle_dist_x = abs(x - self.rect.centerx)
+        circle_dist_y = abs(y - self.rect.centery)
+        if circle_dist_x > (self.rect.width/2 + radius): return False
+        if circle_dist_y > (self.rect.height/2 + radius): return False
+        if circle_dist_x <= (self.rect.width/2): return True
+        if circle_dist_y <= (self.rect.height/2): return True
+        corner_dist_sq = (circle_dist_x - self.rect.width/2)**2 + (circle_dist_y - self.rect.height/2)**2
+        return corner_dist_sq <= radius**2
+
+
+def benchmark(counts=(50, 100, 500, 1000, 2000, 5000, 10000), width=1200, height=900, seed=1):
+    """Compare the nested bullet x enemy loop with the spatial hash"""
+    rng = random.Random(seed)
+    grid = SpatialHash()
+    print(f"{'entities':>9} {'naive ms':>10} {'hash ms':>10} {'hash us/entity':>15}")
+    for n in counts:
+        # Grow the map with the entity count so the density stays that of
+        # a crowded 100 enemy level on the normal 1200x900 screen
+        scale = max(1.0, math.sqrt(n / 100))
+        map_w, map_h = width * scale, height * scale
+        enemies = [_Dot(rng.uniform(0, map_w), rng.uniform(0, map_h), 25) for _ in range(n)]
+        bullets = [_Dot(rng.uniform(0, map_w), rng.uniform(0, map_h), 20) for _ in range(n)]
+
+        start = time.perf_counter()
+        hashed = _hashed_pairs(bullets, enemies, grid)
+        hash_ms = (time.perf_counter() - start) * 1000
+
+        # The quadratic loop gets too slow to be worth waiting for
+        if n <= 2000:
+            start = time.perf_counter()
+            naive = _naive_pairs(bullets, enemies)
+            naive_ms = (time.perf_counter() - start) * 1000
+            assert naive == hashed, "spatial hash disagrees with brute force"
+            naive_col = f"{naive_ms:10.2f}"
+        else:
+            naive_col = f"{'-':>10}"
+
+        print(f"{n:>9} {naive_col} {hash_ms:10.2f} {hash_ms * 1000 / (2 * n):15.2f}")
+
+
+def benchmark_obstacles(counts=(10, 50, 100, 250, 500, 1000), queries=20000,
+                        width=1200, height=900, seed=1):
+    """Compare the linear obstacle scan with ObstacleIndex.collides"""
+    rng = random.Random(seed)
+    print(f"{'obstacles':>9} {'linear ms':>10} {'index ms':>10}")
+    for n in counts:
+        boxes = [_Box(rng.randint(0, width - 40), rng.randint(0, height - 40),
+                      rng.randint(10, 40), rng.randint(10, 40)) for _ in range(n)]
+        index = ObstacleIndex(boxes)
+        points = [(rng.uniform(0, width), rng.uniform(0, height), rng.choice((20, 25, 30)))
+                  for _ in range(queries)]
+
+        start = time.perf_counter()
+        linear = [any(b.collides(x, y, r) for b in boxes) for x, y, r in points]
+        linear_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        indexed = [index.collides(x, y, r) for x, y, r in points]
+        index_ms = (time.perf_counter() - start) * 1000
+
+        assert linear == indexed, "obstacle index disagrees with linear scan"
+        print(f"{n:>9} {linear_ms:10.2f} {index_ms:10.2f}")
+
+
+if __name__ == "__main__":
+    benchmark()
+    print()
+    benchmark_obstacles()
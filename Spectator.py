@@ -0,0 +1,454 @@
+"""
+Spectator broadcasting for the Shooter game.
+- SpectatorFeed: attach to a running Game; sends one delta-encoded state stream
+  to a relay without ever blocking the game loop
+- SpectatorRelay: asyncio server that fans the stream out to any number of
+  viewers, each with a bounded queue; a viewer that falls behind has its queue
+  replaced by a keyframe of the current state
+- watch() shows a relayed match, load_test() measures relay CPU and memory per viewer
+"""
+
+import asyncio
+import os
+import socket
+import struct
+import time
+import zlib
+from collections import deque
+
+import pygame
+
+from ShooterServer import encode_snapshot, delta_encode, delta_decode, draw_snapshot, RECT
+
+# Stream frames: payload length, kind, sequence number, then the payload
+FRAME = struct.Struct("<IBI")
+KEY, DELTA, MAP = 1, 2, 3           # full snapshot, XOR delta against the previous frame, obstacles
+MAP_HEADER = struct.Struct("<HHH")  # map width, map height, rect count
+
+QUEUE_LIMIT = 32            # Frames a viewer may be behind before it is resynced with a keyframe
+WRITE_BUFFER = 16 * 1024    # Socket write buffer per viewer before the relay stops writing to it
+FEED_BUFFER = 256 * 1024    # Unsent bytes the game side keeps before dropping to a keyframe
+
+
+def frame(kind, seq, payload):
+    return FRAME.pack(len(payload), kind, seq) + payload
+
+
+def map_frame(seq, width, height, obstacles):
+    rects = [tuple(obs.rect) for obs in obstacles]
+    return frame(MAP, seq, MAP_HEADER.pack(width, height, len(rects)) +
+                 b"".join(RECT.pack(*rect) for rect in rects))
+
+
+class SpectatorFeed:
+    """Attach to a Game to publish its state every few ticks to a relay"""
+    def __init__(self, game, host, port, every=2):
+        self.every = every          # Ticks between frames (2 = 30 per second)
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setblocking(False)
+        self.pending = deque()      # Encoded frames not yet fully sent
+        self.offset = 0             # Bytes of pending[0] already sent
+        self.buffered = 0
+        self.seq = 0
+        self.ticks = 0
+        self.prev = None            # Last snapshot sent, the base of the next delta
+        self.obstacles = None
+        self.dropped = 0
+        game.feed = self
+
+    def publish(self, game):
+        # Called by Game.update every tick
+        self.ticks += 1
+        if self.sock is None or self.ticks % self.every:
+            return
+        self.seq += 1
+        if game.obstacles is not self.obstacles:
+            from Shooter import SCREEN_WIDTH, SCREEN_HEIGHT
+            self.obstacles = game.obstacles
+            self.queue(map_frame(self.seq, SCREEN_WIDTH, SCREEN_HEIGHT, game.obstacles))
+        raw = encode_snapshot(game)
+        if self.prev is None:
+            self.queue(frame(KEY, self.seq, zlib.compress(raw, 1)))
+        else:
+            self.queue(frame(DELTA, self.seq, delta_encode(raw, self.prev)))
+        self.prev = raw
+        self.flush()
+
+    def queue(self, data):
+        self.pending.append(data)
+        self.buffered += len(data)
+
+    def flush(self):
+        try:
+            while self.pending:
+                head = self.pending[0]
+                sent = self.sock.send(memoryview(head)[self.offset:])
+                self.offset += sent
+                self.buffered -= sent
+                if self.offset < len(head):
+                    break
+                self.pending.popleft()
+                self.offset = 0
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            print(f"Spectator feed closed: {e}")
+            self.close()
+            return
+        if self.buffered > FEED_BUFFER:
+            # The relay is not keeping up; keep only the frame already half sent
+            # and start over from a keyframe and the map
+            while len(self.pending) > (1 if self.offset else 0):
+                self.buffered -= len(self.pending.pop())
+            self.prev = self.obstacles = None
+            self.dropped += 1
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class Viewer:
+    """One subscriber of the relay, with its own bounded queue of frames"""
+    def __init__(self, relay, writer):
+        self.relay = relay
+        self.writer = writer
+        self.transport = writer.transport
+        self.queue = deque()
+        self.wake = asyncio.Event()
+        self.bytes_sent = 0
+        self.resyncs = 0
+
+    def push(self, data):
+        queue = self.queue
+        if not queue and not self.transport.get_write_buffer_size():
+            # The socket takes everything so far: write straight away, no task switch
+            self.transport.write(data)
+            self.bytes_sent += len(data)
+        elif len(queue) >= QUEUE_LIMIT:
+            # Too far behind to catch up frame by frame: skip to the current state
+            queue.clear()
+            queue.extend(self.relay.resync_frames())
+            self.resyncs += 1
+        else:
+            queue.append(data)
+            self.wake.set()
+
+    async def run(self):
+        # Writes the queue out as the socket drains
+        queue, writer = self.queue, self.writer
+        try:
+            while True:
+                await self.wake.wait()
+                self.wake.clear()
+                while queue:
+                    await writer.drain()
+                    data = queue.popleft()
+                    writer.write(data)
+                    self.bytes_sent += len(data)
+        except ConnectionError:
+            pass
+
+
+class SpectatorRelay:
+    """Fans one game's stream out to every connected viewer; frames are forwarded as received"""
+    def __init__(self):
+        self.viewers = set()
+        self.state = None       # Current snapshot, for keyframes on demand
+        self.seq = 0
+        self.map = None         # Last map frame, every viewer needs it first
+        self.keyframe = None    # Keyframe of the current state, built at most once per frame
+        self.frames = 0
+        self.resyncs = 0
+        self.bytes_sent = 0
+
+    async def handle_source(self, reader, writer):
+        self.state = self.map = self.keyframe = None
+        try:
+            while True:
+                header = await reader.readexactly(FRAME.size)
+                length, kind, seq = FRAME.unpack(header)
+                payload = await reader.readexactly(length)
+                self.ingest(kind, seq, header + payload, payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def ingest(self, kind, seq, data, payload):
+        if kind == MAP:
+            # Comes right before the snapshot of the same seq, the state is unchanged
+            self.map = data
+        else:
+            if kind == KEY:
+                self.state = delta_decode(payload)
+            elif self.state is None:
+                return  # A delta without its base; wait for the next keyframe
+            else:
+                self.state = delta_decode(payload, self.state)
+            self.seq = seq
+            self.keyframe = None
+            self.frames += 1
+        for viewer in self.viewers:
+            viewer.push(data)
+
+    def resync_frames(self):
+        if self.state is None:
+            return [self.map] if self.map else []
+        if self.keyframe is None:
+            self.keyframe = frame(KEY, self.seq, zlib.compress(self.state, 1))
+        return [self.map, self.keyframe] if self.map else [self.keyframe]
+
+    async def handle_viewer(self, reader, writer):
+        # Bound what a stalled viewer holds in the kernel as well as in the queue
+        writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, WRITE_BUFFER)
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER)
+        viewer = Viewer(self, writer)
+        viewer.queue.extend(self.resync_frames())
+        viewer.wake.set()
+        self.viewers.add(viewer)
+        task = asyncio.ensure_future(viewer.run())
+        try:
+            # Viewers send nothing; this returns when they disconnect
+            await reader.read()
+        except ConnectionError:
+            pass
+        finally:
+            self.viewers.discard(viewer)
+            task.cancel()
+            self.resyncs += viewer.resyncs
+            self.bytes_sent += viewer.bytes_sent
+            writer.close()
+
+    def stats(self):
+        return {
+            "viewers": len(self.viewers),
+            "frames": self.frames,
+            "resyncs": self.resyncs + sum(v.resyncs for v in self.viewers),
+            "bytes_sent": self.bytes_sent + sum(v.bytes_sent for v in self.viewers),
+            "cpu": time.process_time(),
+            "rss": resident_memory(),
+        }
+
+    async def serve(self, host, source_port, port):
+        sources = await asyncio.start_server(self.handle_source, host, source_port)
+        viewers = await asyncio.start_server(self.handle_viewer, host, port, backlog=1024)
+        return sources, viewers
+
+
+def resident_memory():
+    # Current resident set size in bytes
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StreamReader:
+    """Viewer side: rebuilds snapshots and the map from the relayed frames"""
+    def __init__(self):
+        self.buffer = bytearray()
+        self.snapshot = None
+        self.seq = 0
+        self.size = None
+        self.obstacles = []
+        self.frames = 0
+        self.keyframes = 0
+
+    def feed(self, data):
+        buffer = self.buffer
+        buffer += data
+        while len(buffer) >= FRAME.size:
+            length, kind, seq = FRAME.unpack_from(buffer)
+            end = FRAME.size + length
+            if len(buffer) < end:
+                break
+            payload = bytes(buffer[FRAME.size:end])
+            del buffer[:end]
+            self.frames += 1
+            if kind == MAP:
+                width, height, count = MAP_HEADER.unpack_from(payload)
+                self.size = (width, height)
+                self.obstacles = [RECT.unpack_from(payload, MAP_HEADER.size + RECT.size * i) for i in range(count)]
+            elif kind == KEY:
+                self.snapshot, self.seq = delta_decode(payload), seq
+                self.keyframes += 1
+            elif self.snapshot is not None and seq == self.seq + 1:
+                self.snapshot, self.seq = delta_decode(payload, self.snapshot), seq
+
+
+async def watch(host, port):
+    """Show a relayed match in a window"""
+    pygame.init()
+    reader, writer = await asyncio.open_connection(host, port)
+    stream = StreamReader()
+
+    async def receive():
+        while data := await reader.read(65536):
+            stream.feed(data)
+
+    task = asyncio.ensure_future(receive())
+    screen = None
+    font = pygame.font.Font(None, 28)
+    clock = pygame.time.Clock()
+    running = True
+    while running and not task.done():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+        if screen is None and stream.size:
+            screen = pygame.display.set_mode(stream.size)
+            pygame.display.set_caption("Shooter spectator")
+        if screen:
+            draw_snapshot(screen, font, stream)
+            pygame.display.flip()
+        clock.tick(60)
+        await asyncio.sleep(0)
+    task.cancel()
+    writer.close()
+    pygame.quit()
+
+
+def _relay_process(conn, host):
+    # Load test relay, alone in its process so its CPU time and memory are its own
+    async def main():
+        relay = SpectatorRelay()
+        sources, viewers = await relay.serve(host, 0, 0)
+        conn.send((sources.sockets[0].getsockname()[1], viewers.sockets[0].getsockname()[1]))
+        done = asyncio.get_running_loop().create_future()
+
+        def request():
+            if conn.recv() == "stats":
+                conn.send(relay.stats())
+            else:
+                done.set_result(None)
+
+        asyncio.get_running_loop().add_reader(conn.fileno(), request)
+        await done
+
+    asyncio.run(main())
+
+
+class _Subscriber(asyncio.Protocol):
+    # Load test viewer: parses the stream, and can stall to simulate a slow client
+    def __init__(self):
+        self.stream = StreamReader()
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.stream.feed(data)
+
+
+async def load_test(counts=(100, 250, 500), seconds=5.0, slow=0.1, crowd=200, host="127.0.0.1"):
+    """Relay one headless game to growing numbers of viewers and report the relay's cost per viewer"""
+    import multiprocessing
+    from Shooter import Game, TICK_RATE
+    from Controllers import ScriptedController
+
+    conn, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_relay_process, args=(child, host), daemon=True)
+    process.start()
+    source_port, port = conn.recv()
+    loop = asyncio.get_running_loop()
+
+    async def relay_stats():
+        conn.send("stats")
+        return await loop.run_in_executor(None, conn.recv)
+
+    game = Game(controller=ScriptedController.patrol(), headless=True, seed=1)
+    # A crowded, invulnerable game so frames are the size of a busy match
+    game.player.health = game.player.max_health = 10**9
+    game.spawn_enemies(crowd)
+    feed = SpectatorFeed(game, host, source_port)
+    running = True
+
+    async def play():
+        next_tick = loop.time()
+        while running:
+            game.update()
+            next_tick += 1 / TICK_RATE
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+    game_task = asyncio.ensure_future(play())
+    await asyncio.sleep(0.5)
+    base = await relay_stats()
+    subscribers = []
+    print(f"relay idle: {base['rss'] / 2**20:.1f} MiB resident, {crowd} enemies in the game")
+    print(f"{'viewers':>8} {'relay CPU':>10} {'us/viewer/frame':>16} {'RSS MiB':>8} {'KiB/viewer':>11} "
+          f"{'out KiB/s':>10} {'resyncs':>8}")
+    for count in counts:
+        while len(subscribers) < count:
+            # Small receive buffers, so stalled viewers back up into the relay quickly
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+            sock.setblocking(False)
+            await loop.sock_connect(sock, (host, port))
+            _, protocol = await loop.create_connection(_Subscriber, sock=sock)
+            subscribers.append(protocol)
+        # A share of the viewers stop reading for a while, to force queue overflows
+        stalled = subscribers[:int(count * slow)]
+        for protocol in stalled:
+            protocol.transport.pause_reading()
+        await asyncio.sleep(1.0)
+        start = await relay_stats()
+        await asyncio.sleep(seconds)
+        for protocol in stalled:
+            protocol.transport.resume_reading()
+        end = await relay_stats()
+        frames = max(1, end["frames"] - start["frames"])
+        cpu = end["cpu"] - start["cpu"]
+        print(f"{end['viewers']:>8} {cpu / seconds * 100:9.1f}% {cpu * 1e6 / frames / count:16.2f} "
+              f"{end['rss'] / 2**20:8.1f} {(end['rss'] - base['rss']) / 1024 / count:11.1f} "
+              f"{(end['bytes_sent'] - start['bytes_sent']) / seconds / 1024:10.0f} "
+              f"{end['resyncs'] - start['resyncs']:>8}")
+    await asyncio.sleep(0.5)
+    behind = sum(p.stream.seq < feed.seq - 2 * QUEUE_LIMIT for p in subscribers)
+    keyframes = sum(p.stream.keyframes for p in subscribers)
+    print(f"{len(subscribers)} viewers received {keyframes} keyframes; {behind} still behind after resuming")
+
+    running = False
+    await game_task
+    feed.close()
+    for protocol in subscribers:
+        protocol.transport.close()
+    # Let the relay see every disconnect before it shuts down
+    await asyncio.sleep(0.5)
+    conn.send("stop")
+    process.join(5)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Shooter spectator relay")
+    sub = parser.add_subparsers(dest="command", required=True)
+    relay = sub.add_parser("relay", help="relay a game started with Shooter.py --broadcast to viewers")
+    relay.add_argument("--host", default="127.0.0.1")
+    relay.add_argument("--source-port", type=int, default=47900, help="port the game connects to")
+    relay.add_argument("--port", type=int, default=47901, help="port viewers connect to")
+    watcher = sub.add_parser("watch", help="watch a relayed game")
+    watcher.add_argument("--host", default="127.0.0.1")
+    watcher.add_argument("--port", type=int, default=47901)
+    load = sub.add_parser("load", help="measure relay CPU and memory per viewer")
+    load.add_argument("--viewers", type=int, nargs="+", default=[100, 250, 500])
+    load.add_argument("--seconds", type=float, default=5.0)
+    load.add_argument("--slow", type=float, default=0.1, help="share of viewers that stall")
+    load.add_argument("--crowd", type=int, default=200, help="enemies in the broadcast game")
+    args = parser.parse_args()
+
+    if args.command == "relay":
+        async def main():
+            await SpectatorRelay().serve(args.host, args.source_port, args.port)
+            print(f"game stream on {args.host}:{args.source_port}, viewers on {args.host}:{args.port}")
+            await asyncio.Event().wait()
+        asyncio.run(main())
+    elif args.command == "watch":
+        asyncio.run(watch(args.host, args.port))
+    else:
+        asyncio.run(load_test(args.viewers, args.seconds, args.slow, args.crowd))
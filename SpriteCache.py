@@ -0,0 +1,73 @@
+"""
+Sprite transform cache for the Shooter game.
+- Scaled, tinted and rotated copies of a sprite are built once and reused
+- Angles are quantized and the cache is bounded with LRU eviction
+"""
+
+from collections import OrderedDict
+
+import pygame
+
+
+class SpriteCache:
+    """Bounded LRU cache of transformed sprite surfaces"""
+    def __init__(self, max_entries=2048, angle_step=5):
+        self.max_entries = max_entries
+        self.angle_step = angle_step
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def quantize(self, angle):
+        steps = 360 // self.angle_step
+        return int(round(angle / self.angle_step)) % steps
+
+    def get(self, image, size=None, tint=None, angle=None):
+        """Return image scaled to size, multiplied by tint and rotated like
+        pygame.transform.rotate(image, -angle), the convention the draw code uses"""
+        if size is not None:
+            size = tuple(size)
+            if size == image.get_size():
+                size = None
+        step = None if angle is None else self.quantize(angle)
+        if size is None and tint is None and step is None:
+            return image
+
+        # The entry keeps a reference to the source image so its id stays unique
+        key = (id(image), size, tint, step)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        if step is not None:
+            base = self.get(image, size, tint)
+            surface = pygame.transform.rotate(base, -step * self.angle_step)
+        else:
+            surface = image
+            if size is not None:
+                surface = pygame.transform.scale(surface, size)
+            if tint is not None:
+                if surface is image:
+                    surface = image.copy()
+                surface.fill(tint, special_flags=pygame.BLEND_RGBA_MULT)
+
+        self.entries[key] = (image, surface)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {"entries": len(self.entries), "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+
+# Shared by every draw path in the game
+sprite_cache = SpriteCache()
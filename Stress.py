@@ -0,0 +1,170 @@
+"""
+Stress mode for the Shooter game.
+- Fills a game with a configurable crowd of enemies and keeps their bullets topped
+  up to a configurable count; the player sprays the machine gun, so kills,
+  respawns and removal run against the whole crowd
+- ramp() steps the crowd size up to 10k enemies and 100k bullets, reports where a
+  frame no longer fits the budget and whether the target crowd runs at 60 FPS
+  (exit status 1 when it does not)
+- play() shows the crowd in a window (F3 for the frame timing chart)
+"""
+
+import sys
+import time
+
+import pygame
+
+from Controllers import KeyboardController, ScriptedController
+from FrameTimer import FrameTimer
+from Projectiles import has_numpy
+
+if has_numpy:
+    import numpy as np
+
+LEVELS = ((1000, 10000), (2500, 25000), (5000, 50000), (10000, 100000))
+# Largest crowd that fits 60 FPS on one core; 10k/100k takes 60-90 ms a frame,
+# with drawing the dots and pixels alone near the whole 16.7 ms budget
+TARGET = (1000, 10000)
+FRAME_BUDGET_MS = 1000 / 60
+
+
+def build(enemies, bullets, seed=1, headless=True):
+    """A game with the NumPy engines, an invulnerable player and the given crowds"""
+    from Shooter import Game
+    if not has_numpy:
+        raise SystemExit("stress mode needs numpy for the projectile and enemy batch engines")
+    game = Game(use_projectiles=True, batch_enemies=True, controller=ScriptedController.patrol(),
+                headless=headless, seed=seed)
+    game.player.health = game.player.max_health = 10**9
+    game.player.weapons_owned.append("machine_gun")
+    game.player.weapon = "machine_gun"
+    game.spawn_enemies(max(0, enemies - len(game.enemies)))
+    # Stray bullets get their own generator so the game's RNG stream is untouched
+    game.stress_rng = np.random.default_rng(seed)
+    refill(game, bullets)
+    return game
+
+
+def refill(game, bullets):
+    """Top the enemy bullets up to the target count, scattered over the map in every direction"""
+    from Shooter import SCREEN_WIDTH, SCREEN_HEIGHT
+    missing = bullets - len(game.enemy_bullets)
+    if missing > 0:
+        rng = game.stress_rng
+        # Same damage, speed and size as the shots enemies fire
+        game.enemy_bullets.spawn_many(rng.uniform(0, SCREEN_WIDTH, missing), rng.uniform(0, SCREEN_HEIGHT, missing),
+                                      rng.uniform(0, 360, missing), damage=1, speed=8, size=(40, 40))
+
+
+ENEMY_LEVELS = ("full", "sprites", "squares", "dots")
+BULLET_LEVELS = ("trails", "sprites", "dots", "pixels")
+
+
+def measure(enemies, bullets, ticks=60, warmup=10, seed=1):
+    """Per-phase p50 times in ms of ticks full frames (update, refill and draw),
+    plus the p50 of the update and draw halves and the detail levels drawn at"""
+    from Shooter import UPDATE_PHASES, DRAW_PHASES
+    game = build(enemies, bullets, seed)
+    update_ms, draw_ms = [], []
+    for tick in range(warmup + ticks):
+        if tick == warmup:
+            timer = game.timer = FrameTimer(UPDATE_PHASES + DRAW_PHASES, window=ticks)
+            update_ms, draw_ms = [], []
+        timer = game.timer
+        timer.begin_frame()
+        start = time.perf_counter()
+        game.update()
+        refill(game, bullets)
+        middle = time.perf_counter()
+        game.draw()
+        update_ms.append((middle - start) * 1000)
+        draw_ms.append((time.perf_counter() - middle) * 1000)
+        timer.end_frame()
+    summary = timer.summary()
+    summary["enemies"] = len(game.enemies)
+    summary["bullets"] = len(game.bullets) + len(game.enemy_bullets)
+    summary["update"] = sorted(update_ms)[len(update_ms) // 2]
+    summary["draw"] = sorted(draw_ms)[len(draw_ms) // 2]
+    summary["detail"] = (ENEMY_LEVELS[game.enemy_detail.choose(len(game.enemies))] + " enemies, " +
+                         BULLET_LEVELS[game.enemy_bullets.detail.choose(len(game.enemy_bullets))] + " bullets")
+    return summary
+
+
+def ramp(levels=LEVELS, target=TARGET, ticks=60, seed=1, budget_ms=FRAME_BUDGET_MS):
+    """Run each crowd size and report frame time, the phases that dominate it and
+    whether it fits the frame budget; returns True if the target level (one of levels) does"""
+    print(f"{'enemies':>8} {'bullets':>8} {'p50 ms':>8} {'p99 ms':>8} {'update':>7} {'draw':>6}  budget  "
+          f"slowest phases (p50 ms)")
+    falls_over = None
+    for enemies, bullets in levels:
+        start = time.perf_counter()
+        summary = measure(enemies, bullets, ticks, seed=seed)
+        p50, p99 = summary["total"]
+        phases = sorted(((name, times[0]) for name, times in summary.items() if isinstance(times, tuple)
+                         and name != "total"), key=lambda item: -item[1])
+        slowest = ", ".join(f"{name} {ms:.1f}" for name, ms in phases[:3])
+        fits = p50 <= budget_ms
+        print(f"{summary['enemies']:>8} {summary['bullets']:>8} {p50:8.1f} {p99:8.1f} {summary['update']:7.1f} "
+              f"{summary['draw']:6.1f}  {'ok    ' if fits else 'MISSED'}  {slowest}; drawn as {summary['detail']}"
+              f"  ({time.perf_counter() - start:.1f}s)")
+        if falls_over is None and not fits:
+            falls_over = (enemies, bullets, phases[0][0])
+        if (enemies, bullets) == target:
+            target_fits, target_summary = fits, summary
+    if falls_over:
+        print(f"frames exceed the {budget_ms:.1f} ms budget from {falls_over[0]} enemies and "
+              f"{falls_over[1]} bullets on; slowest phase there: {falls_over[2]}")
+    else:
+        print(f"every level fits the {budget_ms:.1f} ms frame budget")
+
+    enemies, bullets = target
+    fits, summary = target_fits, target_summary
+    p50 = summary["total"][0]
+    if fits:
+        print(f"target met: {enemies} enemies and {bullets} bullets run at {1000 / budget_ms:.0f} FPS")
+    else:
+        half = "the simulation alone" if summary["update"] > budget_ms else "drawing"
+        print(f"TARGET MISSED: {enemies} enemies and {bullets} bullets take {p50:.1f} ms a frame, "
+              f"{p50 / budget_ms:.1f}x the {budget_ms:.1f} ms budget ({half} does not fit: "
+              f"update {summary['update']:.1f} ms, draw {summary['draw']:.1f} ms)")
+    return fits
+
+
+def play(enemies, bullets, seed=1):
+    """Interactive stress view: one update per frame, as fast as the machine manages"""
+    game = build(enemies, bullets, seed, headless=False)
+    game.controller = KeyboardController()
+    game.timer.visible = True
+    while game.running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                game.running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                game.timer.toggle()
+        game.timer.begin_frame()
+        game.update()
+        refill(game, bullets)
+        game.draw()
+        game.timer.end_frame()
+        game.clock.tick()
+        pygame.display.set_caption(f"Stress: {len(game.enemies)} enemies, {len(game.enemy_bullets)} bullets, "
+                                   f"{game.clock.get_fps():.0f} FPS")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Shooter stress mode")
+    parser.add_argument("--enemies", type=int, default=TARGET[0], help="target crowd (default %(default)s)")
+    parser.add_argument("--bullets", type=int, default=TARGET[1])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--ticks", type=int, default=60, help="frames measured per ramp level")
+    parser.add_argument("--play", action="store_true", help="show the crowd in a window instead of ramping")
+    args = parser.parse_args()
+
+    if args.play:
+        play(args.enemies, args.bullets, args.seed)
+    else:
+        target = (args.enemies, args.bullets)
+        levels = sorted(set(LEVELS) | {target})
+        sys.exit(0 if ramp(levels, target, args.ticks, args.seed) else 1)
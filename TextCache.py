@@ -0,0 +1,60 @@
+"""
+Text rendering cache shared by Shooter.py and Shooter3D.py.
+- TextCache: LRU cache of rendered text surfaces keyed by (font, text, color)
+- HudText: HUD label that only re-renders when its value changes
+"""
+
+from collections import OrderedDict
+
+
+class TextCache:
+    """Bounded LRU cache of font.render results"""
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.entries.clear()
+
+
+class HudText:
+    """A HUD label such as "Score: {}" that keeps its last rendered surface"""
+    def __init__(self, font, template="{}", color=(255, 255, 255)):
+        self.font = font
+        self.template = template
+        self.color = color
+        self.surface = None
+        self._value = None
+        self._color = None
+
+    def render(self, value="", color=None):
+        color = color or self.color
+        if self.surface is None or value != self._value or color != self._color:
+            self.surface = self.font.render(self.template.format(value), True, color)
+            self._value = value
+            self._color = color
+        return self.surface
+
+    def draw(self, surface, pos, value="", color=None):
+        return surface.blit(self.render(value, color), pos)
+
+
+# Shared by every draw path in both games
+text_cache = TextCache()